@@ -17,12 +17,14 @@ const NumberUnderstanding = () => {
   const [loadingSummary, setLoadingSummary] = useState(false);
 
   const printRef = useRef<HTMLDivElement>(null);
+  // One id per test run: the server then won't repeat a question until all have been asked
+  const sessionId = useRef(`${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`);
   const router = useRouter();
   const { data: session, status } = useSession();
 
  
   const fetchQuestion = async () => {
-    const res = await fetch("http://127.0.0.1:8000/numberunderstanding_test/getQuestions");
+    const res = await fetch(`http://127.0.0.1:8000/numberunderstanding_test/getQuestions?session_id=${sessionId.current}`);
     const data = await res.json();
     setCurrentQuestion(data);
     setStartTime(Date.now());
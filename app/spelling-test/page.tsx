@@ -1,5 +1,5 @@
 "use client";
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 
 import { useRouter } from "next/navigation";
 
@@ -27,10 +27,12 @@ const SpellingTask = () => {
   const [successMessage, setSuccessMessage] = useState<boolean>(false);
   const [currentAttempt, setCurrentAttempt] = useState(1);
   const [showSummary, setShowSummary] = useState(false);
+  // One id per test run: the server then won't repeat a word until all have been played
+  const sessionId = useRef(`${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`);
 
   const fetchNewAudio = async () => {
     try {
-      const res = await fetch("http://127.0.0.1:8000/spelling_test/get-audio");
+      const res = await fetch(`http://127.0.0.1:8000/spelling_test/get-audio?session_id=${sessionId.current}`);
       const contentType = res.headers.get("Content-Type");
       if (!res.ok || !contentType?.includes("application/json")) {
         const errorText = await res.text();
@@ -38,7 +40,8 @@ const SpellingTask = () => {
       }
       const data = await res.json();
       const audioFileName = data.audio_file.replace("audio/correct/", "");
-      setAudioUrl(`http://127.0.0.1:8000/${data.audio_file}`);
+      // Content-hashed URL: the browser caches each clip for good
+      setAudioUrl(`http://127.0.0.1:8000${data.audio_url}`);
       setAudioFileName(data.audio_file.replace("audio/correct/", ""));
       setUserAnswer("");
       setResult(null);
@@ -0,0 +1,118 @@
+"""Model inputs rebuilt from the CSVs and images in ``backend/data``.
+
+Each loader returns ``(X, y)`` with X exactly as the serving model receives it
+(after encoders/scalers), using the same 80/20 ``random_state=42`` split as the
+training scripts so ``X_test`` is the held-out part.
+"""
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+DATA_DIR = os.path.join(BASE_DIR, "data")
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+
+from services.feature_transforms import ArithmeticFeatures, letters_multihot  # noqa: E402
+
+
+def _model(name):
+    return joblib.load(os.path.join(MODEL_DIR, name))
+
+
+def arithmetic():
+    df = pd.read_csv(os.path.join(DATA_DIR, "arithmetic_data_1k.csv"))
+    op1 = df['question'].str.extract(r'(\d+)')[0].astype(int)
+    op2 = df['question'].str.extract(r'[\+\-\*/] (\d+)')[0].astype(int)
+    operation = df['question'].str.extract(r'(\+|\-|\*|\/)')[0]
+    user_choice = (df['user_choice'] != 'choice_1').astype(int)
+    features = ArithmeticFeatures(_model("arithmetic_op_encoder.joblib"), _model("arithmetic_scaler.pkl"))
+    X = features.matrix(op1, op2, operation, user_choice, df['response_time'].astype(float))
+    return X, df['is_correct'].astype(int).to_numpy()
+
+
+def number_understanding():
+    df = pd.read_csv(os.path.join(DATA_DIR, "number_understanding_dataset_10k.csv"))
+    df['user_correct'] = (df['user_answer'] == df['correct_answer']).astype(int)
+    X = df[['left_number', 'right_number', 'response_time_sec', 'user_correct']].to_numpy(dtype=float)
+    return _model("number_understanding_scaler.pkl").transform(X), df['at_risk'].to_numpy()
+
+
+def letter_tracing():
+    df = pd.read_csv(os.path.join(DATA_DIR, "dysgraphia_tracing_dataset_revised.csv"))
+    y = _model("dysgraphia_tracing_label_encoder.joblib").transform(df['label'])
+    return df[['duration_seconds', 'accuracy']].to_numpy(dtype=float), y
+
+
+def letter_confusion(scaler=None):
+    df = pd.read_csv(os.path.join(DATA_DIR, "dyslexia_letter_dataset_10k.csv"))
+    q_type = _model("le_question_type.joblib").transform(df['question_type'])
+    shown = df['shown_letters'].str.split(',')
+    multihot = letters_multihot(shown)
+    rt = df[['response_time_ms']].to_numpy(dtype=float)
+    rt = scaler.transform(rt) if scaler is not None else rt
+    X = np.column_stack([df['correct'], rt[:, 0], q_type, multihot]).astype(np.float32)
+    return X, (df['group'] == 'dyslexic').astype(int).to_numpy()
+
+
+def phonospeech():
+    from services.phonospeech_features import extract_phoneme_features
+    df = pd.read_csv(os.path.join(DATA_DIR, "dyslexia_training_dataset.csv"))
+    for col in ['Question', 'Child_Response']:
+        df[col] = df[col].fillna('').astype(str)
+    X_text = _model("vectorizer.joblib").transform(df['Question'] + ' ' + df['Child_Response'])
+    numeric = [extract_phoneme_features(q) + extract_phoneme_features(c) for q, c in zip(df['Question'], df['Child_Response'])]
+    X_numeric = _model("scaler.joblib").transform(numeric)
+    y = df['Risk_Level'].map({'Minimal': 0, 'Emerging': 1, 'Strong_Indicators': 2}).to_numpy()
+    return np.hstack([X_text.toarray(), X_numeric]), y
+
+
+def spelling():
+    from services.audio_features import extract_spelling_features
+    df = pd.read_csv(os.path.join(DATA_DIR, "spelling_audio_dataset.csv"))
+    X = np.array([extract_spelling_features(os.path.join(BASE_DIR, path)) for path in df['audio_file']])
+    return _model("dyslexia_spelling_audio_model.joblib")['scaler'].transform(X), df['is_incorrect'].to_numpy()
+
+
+def handwritten():
+    from services.image_features import extract_hog_features, load_image
+    X, y = [], []
+    for label, class_name in enumerate(sorted(os.listdir(DATA_DIR))):
+        class_dir = os.path.join(DATA_DIR, class_name)
+        if not os.path.isdir(class_dir):
+            continue
+        for name in sorted(os.listdir(class_dir)):
+            if name.lower().endswith(('.png', '.jpg', '.jpeg')):
+                X.append(load_image(os.path.join(class_dir, name)))
+                y.append(label)
+    return extract_hog_features(X), np.array(y)
+
+
+# task -> (model file, loader); the spelling model lives inside a bundle
+TASKS = {
+    "arithmetic": ("dyscalculia_arithmetic.joblib", arithmetic),
+    "numberunderstanding": ("dyscalculia_numberunderstanding.joblib", number_understanding),
+    "letter_tracing": ("dysgraphia_tracing_model.joblib", letter_tracing),
+    "letterconfusion": ("dyslexia_letter_confusion_model.joblib", letter_confusion),
+    "phonospeech": ("phonospeech_model.joblib", phonospeech),
+    "spelling": ("dyslexia_spelling_audio_model.joblib", spelling),
+    "handwritten": ("dysgraphia_handwritten_model.joblib", handwritten),
+}
+
+
+def load_task(task):
+    """Return ``(model, X_test, y_test)`` for one task, or None if its model file is missing."""
+    model_file, loader = TASKS[task]
+    if not os.path.exists(os.path.join(MODEL_DIR, model_file)):
+        return None
+    model = _model(model_file)
+    if isinstance(model, dict):
+        model = model['model']
+    X, y = loader()
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    return model, X_test, y_test
@@ -0,0 +1,73 @@
+"""Parity check and latency benchmark: sklearn forests vs. services.forest.
+
+Run from ``backend/``:
+
+    python -m benchmarks.forest_engine [--tasks arithmetic phonospeech] [--rows 200]
+
+For every task the compiled engine must reproduce sklearn's ``predict_proba``
+bit for bit on the held-out split; the script exits non-zero otherwise.
+"""
+import argparse
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from benchmarks.datasets import TASKS, load_task
+from services.forest import compile_model
+
+
+def _latency_us(fn, rows):
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        fn(row)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return np.percentile(timings, [50, 95])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", nargs="*", default=list(TASKS))
+    parser.add_argument("--rows", type=int, default=200, help="single-row requests timed per engine")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    header = f"{'task':<20}{'rows':>6}  {'identical':<10}{'sklearn p50/p95 us':>20}{'compiled p50/p95 us':>22}{'batch sk ms':>13}{'batch cf ms':>13}"
+    print(header)
+    print("-" * len(header))
+    ok = True
+    for task in args.tasks:
+        loaded = load_task(task)
+        if loaded is None:
+            print(f"{task:<20}  model file missing, skipped")
+            continue
+        model, X, _ = loaded
+        compiled = compile_model(model)
+
+        expected = model.predict_proba(X)
+        actual = compiled.predict_proba(X)
+        identical = np.array_equal(expected, actual)
+        ok &= identical
+
+        rows = [X[i:i + 1] for i in range(min(args.rows, len(X)))]
+        sk_p50, sk_p95 = _latency_us(model.predict_proba, rows)
+        cf_p50, cf_p95 = _latency_us(compiled.predict_proba, rows)
+
+        start = time.perf_counter()
+        model.predict_proba(X)
+        sk_batch = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        compiled.predict_proba(X)
+        cf_batch = (time.perf_counter() - start) * 1e3
+
+        print(f"{task:<20}{len(X):>6}  {str(identical):<10}{sk_p50:>10.0f}/{sk_p95:<9.0f}{cf_p50:>11.0f}/{cf_p95:<10.0f}{sk_batch:>13.1f}{cf_batch:>13.1f}")
+
+    if not ok:
+        print("\nCompiled forest output differs from sklearn.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Parity check and timing: skimage HOG pipeline vs. services.image_features.
+
+Run from ``backend/``:
+
+    python -m benchmarks.hog_parity [--resize-atol 1e-12] [--hog-atol 1e-6]
+
+Every handwriting image under ``data/`` goes through the original skimage
+pipeline and the NumPy one. Each stage is compared on identical input:
+
+* grayscale + resize must agree within ``--resize-atol``,
+* HOG of skimage's own resized image must agree within ``--hog-atol``,
+* end to end, the handwriting model must predict the same class for every image.
+
+End-to-end feature differences are reported but not bounded: skimage's HOG
+turns last-bit resize rounding in near-empty cells into visible feature
+changes (compare the "skimage on float32 input" line), so no reimplementation
+can match it element-wise. The script exits non-zero if any check fails.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+from skimage import feature, transform
+from skimage.color import rgb2gray
+
+from benchmarks.datasets import DATA_DIR, MODEL_DIR
+from services.image_features import IMAGE_SIZE, extract_hog_features, hog, load_image, resize, to_gray
+
+
+def skimage_resize(image):
+    return transform.resize(rgb2gray(image), IMAGE_SIZE)
+
+
+def skimage_hog(image):
+    return feature.hog(image, orientations=8, pixels_per_cell=(16, 16), cells_per_block=(1, 1), visualize=False)
+
+
+def image_paths():
+    paths = []
+    for class_name in sorted(os.listdir(DATA_DIR)):
+        class_dir = os.path.join(DATA_DIR, class_name)
+        if os.path.isdir(class_dir):
+            paths += [os.path.join(class_dir, name) for name in sorted(os.listdir(class_dir))
+                      if name.lower().endswith(('.png', '.jpg', '.jpeg'))]
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resize-atol", type=float, default=1e-12)
+    parser.add_argument("--hog-atol", type=float, default=1e-6)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    images = [load_image(path) for path in image_paths()]
+
+    start = time.perf_counter()
+    sk_resized = np.array([skimage_resize(image) for image in images])
+    expected = np.array([skimage_hog(image) for image in sk_resized])
+    sk_ms = (time.perf_counter() - start) * 1e3
+
+    extract_hog_features(images)  # build the per-size resize taps once
+    start = time.perf_counter()
+    actual = extract_hog_features(images)
+    np_ms = (time.perf_counter() - start) * 1e3
+
+    # Per-image latency, as a single upload is served
+    start = time.perf_counter()
+    for image in images:
+        extract_hog_features([image])
+    single_ms = (time.perf_counter() - start) * 1e3
+
+    resize_diff = max(np.abs(resize(to_gray(image)) - sk).max() for image, sk in zip(images, sk_resized))
+    hog_diff = np.abs(hog(sk_resized) - expected).max()
+    end_diff = np.abs(actual - expected)
+    floor_diff = np.abs(np.array([skimage_hog(r.astype(np.float32).astype(np.float64)) for r in sk_resized]) - expected)
+
+    print(f"images: {len(images)}  features: {actual.shape[1]}")
+    print(f"resize max abs diff:     {resize_diff:.2e}  (atol {args.resize_atol:.0e})")
+    print(f"hog max abs diff:        {hog_diff:.2e}  (atol {args.hog_atol:.0e})")
+    print(f"end to end max/mean:     {end_diff.max():.2e} / {end_diff.mean():.2e}")
+    print(f"skimage on float32 input: {floor_diff.max():.2e} / {floor_diff.mean():.2e}")
+    print(f"skimage: {sk_ms / len(images):.2f} ms/image  numpy batch: {np_ms / len(images):.2f} ms/image  "
+          f"numpy single: {single_ms / len(images):.2f} ms/image")
+
+    ok = resize_diff <= args.resize_atol and hog_diff <= args.hog_atol
+    model_path = os.path.join(MODEL_DIR, "dysgraphia_handwritten_model.joblib")
+    if os.path.exists(model_path):
+        import joblib
+        model = joblib.load(model_path)
+        same = np.array_equal(model.predict(expected), model.predict(actual))
+        proba_diff = np.abs(model.predict_proba(expected) - model.predict_proba(actual)).max()
+        print(f"model predictions identical: {same}  max proba diff: {proba_diff:.3f}")
+        ok &= same
+
+    if not ok:
+        print("\nNumPy HOG pipeline differs from skimage.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Decode cost per megapixel: exact handwriting pipeline vs. the upload path.
+
+Run from ``backend/``:
+
+    python -m benchmarks.image_decode [--megapixels 1 3 12] [--repeat 3] [--draft-mode RGB]
+
+Inputs are the handwriting images under ``data/`` as they are, plus "phone
+photo" versions of each: upscaled (bicubic) to roughly each ``--megapixels``
+size and re-encoded as JPEG (quality 90) and PNG. For every group the script
+times, per image, what happens before HOG:
+
+* exact:  ``decode_image`` (full RGB decode) -> float64 gray -> resize
+* upload: ``decode_upload`` (header check, reduced decode, gray) -> resize
+
+and reports the median milliseconds per source megapixel, the speed-up, the
+largest HOG feature difference and how often the handwriting model predicts the
+same class on both paths. The last two columns compare each path against the
+prediction for the original, un-upscaled image, so flips that upscaling alone
+causes are not charged to the upload path.
+"""
+import argparse
+import io
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.hog_parity import image_paths
+from services import image_features
+from services.image_features import IMAGE_SIZE, decode_image, decode_upload, extract_hog_features, hog, resize, to_gray
+
+
+def exact_input(image_bytes):
+    return resize(to_gray(decode_image(image_bytes)))
+
+
+def upload_input(image_bytes):
+    return resize(decode_upload(image_bytes))
+
+
+def encode(image, fmt, **params):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+def build_groups(megapixels):
+    originals = []
+    for path in image_paths():
+        with open(path, "rb") as f:
+            originals.append(f.read())
+    groups = {"original": originals}
+    for mp in megapixels:
+        for fmt, params in (("JPEG", {"quality": 90}), ("PNG", {"compress_level": 1})):
+            encoded = []
+            for image_bytes in originals:
+                image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+                scale = np.sqrt(mp * 1e6 / (image.width * image.height))
+                image = image.resize((round(image.width * scale), round(image.height * scale)), Image.BICUBIC)
+                encoded.append(encode(image, fmt, **params))
+            groups[f"{mp:g}MP {fmt}"] = encoded
+    return groups
+
+
+def timed(fn, images, repeat):
+    """(median ms per megapixel, 128x128 inputs)"""
+    per_mp, outputs = [], []
+    for image_bytes in images:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            mp = image.width * image.height / 1e6
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            out = fn(image_bytes)
+            best = min(best, time.perf_counter() - start)
+        per_mp.append(best * 1000 / mp)
+        outputs.append(out)
+    return float(np.median(per_mp)), np.stack(outputs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[1, 3, 12])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=40, help="images per group (default 40)")
+    args = parser.parse_args()
+
+    from services.registry import registry
+    model = registry.get("handwritten")["model"]
+    image_features.MAX_IMAGE_PIXELS = max(image_features.MAX_IMAGE_PIXELS, int(max(args.megapixels) * 1.1e6))
+
+    groups = {name: images[:args.limit] for name, images in build_groups(args.megapixels).items()}
+    reference = model.predict(extract_hog_features([decode_image(b) for b in groups["original"]]))
+
+    print(f"{'group':<12} {'images':>6} {'exact ms/MP':>12} {'upload ms/MP':>13} {'speed-up':>9} "
+          f"{'max |dHOG|':>11} {'same label':>11} {'exact~orig':>11} {'upload~orig':>12}")
+    for name, images in groups.items():
+        exact_ms, exact = timed(exact_input, images, args.repeat)
+        upload_ms, upload = timed(upload_input, images, args.repeat)
+        exact_features, upload_features = hog(exact), hog(upload)
+        exact_labels, upload_labels = model.predict(exact_features), model.predict(upload_features)
+        print(f"{name:<12} {len(images):>6} {exact_ms:>12.2f} {upload_ms:>13.2f} {exact_ms / upload_ms:>8.1f}x "
+              f"{np.abs(exact_features - upload_features).max():>11.4f} {np.mean(exact_labels == upload_labels):>11.1%} "
+              f"{np.mean(exact_labels == reference):>11.1%} {np.mean(upload_labels == reference):>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
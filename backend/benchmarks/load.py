@@ -0,0 +1,383 @@
+"""Load benchmark for every router: in-process over ASGI and against uvicorn.
+
+Run from ``backend/``:
+
+    python -m benchmarks.load [--mode asgi|uvicorn|both] [--concurrency 1 8 32]
+                              [--requests 200] [--endpoint NAME ...]
+                              [--output load.json] [--baseline previous.json]
+
+Request bodies are drawn from the CSVs and images in ``backend/data`` (a
+session of arithmetic attempts, 1-3 handwriting scans, a phonospeech answer,
+...). For every endpoint and concurrency level the same number of requests is
+sent by that many concurrent clients, and the run reports p50/p95/p99 latency,
+requests per second, non-2xx responses and the server's peak RSS while that
+endpoint was under load (sampled from /proc; in ``asgi`` mode the server is
+this process). Results go to ``--output`` as JSON; ``--baseline`` prints each
+number next to the same one from an earlier run.
+
+The prediction memo serves repeated inputs from memory; pass ``--no-memo`` to
+measure featurization and inference on every request.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from benchmarks.datasets import BASE_DIR, DATA_DIR
+
+DEFAULT_CONCURRENCY = (1, 8, 32)
+DEFAULT_REQUESTS = 200
+WARMUP_REQUESTS = 5
+RSS_SAMPLE_S = 0.01
+MEMO_ROUTES = ("letter_tracing", "numberunderstanding", "phonospeech", "handwritten")
+
+
+# === Payloads from backend/data ===
+class Payloads:
+    def __init__(self, seed=42):
+        self.rng = random.Random(seed)
+        self.arithmetic = pd.read_csv(os.path.join(DATA_DIR, "arithmetic_data_1k.csv"))
+        self.numbers = pd.read_csv(os.path.join(DATA_DIR, "number_understanding_dataset_10k.csv"))
+        self.tracing = pd.read_csv(os.path.join(DATA_DIR, "dysgraphia_tracing_dataset_revised.csv"))
+        self.letters = pd.read_csv(os.path.join(DATA_DIR, "dyslexia_letter_dataset_10k.csv"))
+        self.phonospeech = pd.read_csv(os.path.join(DATA_DIR, "dyslexia_training_dataset.csv")).fillna("")
+        self.spelling = pd.read_csv(os.path.join(DATA_DIR, "spellingfrontend_test.csv"))
+        self.images = []
+        for class_name in ("DYSGR", "NON_DYSGR"):
+            class_dir = os.path.join(DATA_DIR, class_name)
+            for name in sorted(os.listdir(class_dir)):
+                with open(os.path.join(class_dir, name), "rb") as f:
+                    self.images.append((name, f.read()))
+        from services.audio_assets import load_audio_assets
+        assets = load_audio_assets()
+        self.audio_urls = [assets.url(audio_file) for audio_file in self.spelling["audio_file"]]
+
+    def _row(self, df):
+        return df.iloc[self.rng.randrange(len(df))]
+
+    def arithmetic_summary(self):
+        attempts = []
+        for _ in range(self.rng.randint(3, 8)):
+            row = self._row(self.arithmetic)
+            op1, operation, op2 = row["question"].split()[:3]
+            attempts.append({
+                "op1": int(op1), "op2": int(op2), "operation": operation,
+                "user_choice": 0 if row["user_choice"] == "choice_1" else 1,
+                "response_time": float(row["response_time"]),
+            })
+        return {"json": {"attempts": attempts}}
+
+    def handwritten_predict(self):
+        scans = self.rng.sample(self.images, self.rng.randint(1, 3))
+        return {"files": [("files", (name, data, "image/png")) for name, data in scans]}
+
+    def numberunderstanding_questions(self):
+        return {"params": {"session_id": f"s{self.rng.randrange(100)}"}}
+
+    def numberunderstanding_predict(self):
+        row = self._row(self.numbers)
+        return {"json": {
+            "left_number": float(row["left_number"]), "right_number": float(row["right_number"]),
+            "response_time_sec": float(row["response_time_sec"]),
+            "user_correct": int(row["user_answer"] == row["correct_answer"]),
+        }}
+
+    def letter_tracing_trace(self):
+        row = self._row(self.tracing)
+        return {"json": {"letter": row["letter"], "drawing": "", "duration": float(row["duration_seconds"]),
+                         "accuracy": float(row["accuracy"])}}
+
+    def letterconfusion_submit(self):
+        answers = []
+        for _ in range(self.rng.randint(5, 10)):
+            row = self._row(self.letters)
+            answers.append({"question_type": row["question_type"], "shown_letters": row["shown_letters"].split(","),
+                            "correct": int(row["correct"]), "response_time_ms": float(row["response_time_ms"])})
+        return {"json": answers}
+
+    def phonospeech_questions(self):
+        return {}
+
+    def phonospeech_predict(self):
+        row = self._row(self.phonospeech)
+        return {"json": {"question": str(row["Question"]), "child_response": str(row["Child_Response"])}}
+
+    def spelling_get_audio(self):
+        return {"params": {"session_id": f"s{self.rng.randrange(100)}"}}
+
+    def spelling_validate(self):
+        row = self._row(self.spelling)
+        word = row["correct_word"]
+        answer = word if self.rng.random() < 0.6 else word[:-1] + self.rng.choice("aeiou")
+        return {"json": {"user_answer": answer, "audio_file": row["audio_file"].replace("audio/correct/", "")}}
+
+    def audio_file(self):
+        return {"path": self.rng.choice(self.audio_urls)}
+
+
+# name -> (method, path, Payloads method)
+ENDPOINTS = {
+    "arithmetic_summary": ("POST", "/arithmetic_test/api/arithmetic/summary", "arithmetic_summary"),
+    "handwritten_predict": ("POST", "/handwritten_test/dysgraphia/predict", "handwritten_predict"),
+    "numberunderstanding_questions": ("GET", "/numberunderstanding_test/getQuestions", "numberunderstanding_questions"),
+    "numberunderstanding_predict": ("POST", "/numberunderstanding_test/predict", "numberunderstanding_predict"),
+    "letter_tracing_trace": ("POST", "/letter_tracing/trace", "letter_tracing_trace"),
+    "letterconfusion_submit": ("POST", "/letterconfusion_test/dyslexia/submit_answer/", "letterconfusion_submit"),
+    "phonospeech_questions": ("GET", "/phonospeech_test/phonospeech/questions", "phonospeech_questions"),
+    "phonospeech_predict": ("POST", "/phonospeech_test/phonospeech/predict", "phonospeech_predict"),
+    "spelling_get_audio": ("GET", "/spelling_test/get-audio", "spelling_get_audio"),
+    "spelling_validate": ("POST", "/spelling_test/validate-answer", "spelling_validate"),
+    "audio_file": ("GET", None, "audio_file"),
+}
+
+
+# === Peak RSS of the server process ===
+def rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler:
+    """Polls a process's RSS on a background thread; ``peak()`` since the last ``reset()``."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self._peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_S):
+            rss = rss_bytes(self.pid)
+            if rss is not None and (self._peak is None or rss > self._peak):
+                self._peak = rss
+
+    def reset(self):
+        self._peak = rss_bytes(self.pid)
+
+    def peak(self):
+        return self._peak
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+# === Driving one endpoint ===
+def _request_args(method, path, kwargs):
+    kwargs = dict(kwargs)
+    return method, kwargs.pop("path", path), kwargs
+
+
+async def run_level(client, method, path, requests, concurrency):
+    latencies, statuses = [], Counter()
+    pending = iter(requests)
+
+    async def client_loop():
+        for kwargs in pending:
+            request_method, request_path, request_kwargs = _request_args(method, path, kwargs)
+            start = time.perf_counter()
+            try:
+                response = await client.request(request_method, request_path, **request_kwargs)
+                statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - start) * 1000.0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if not (isinstance(status, int) and status < 400)),
+        "status_counts": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {"p50": round(p50, 2), "p95": round(p95, 2), "p99": round(p99, 2),
+                       "mean": round(float(np.mean(latencies)), 2), "max": round(max(latencies), 2)},
+    }
+
+
+async def run_suite(client, sampler, endpoints, concurrency_levels, n_requests, payloads):
+    results = {}
+    for name in endpoints:
+        method, path, factory = ENDPOINTS[name]
+        make = getattr(payloads, factory)
+        # First calls load models and build per-version state; keep them out of the numbers
+        await run_level(client, method, path, [make() for _ in range(WARMUP_REQUESTS)], 1)
+        results[name] = {}
+        for concurrency in concurrency_levels:
+            requests = [make() for _ in range(n_requests)]
+            sampler.reset()
+            level = await run_level(client, method, path, requests, concurrency)
+            peak = sampler.peak()
+            level["peak_rss_mb"] = round(peak / 2**20, 1) if peak is not None else None
+            results[name][str(concurrency)] = level
+            _print_row(name, concurrency, level)
+    return results
+
+
+# === Modes ===
+async def run_asgi(endpoints, concurrency_levels, n_requests, payloads):
+    import main
+
+    sampler = RssSampler(os.getpid())
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://asgi", timeout=120) as client:
+            # Routers print per request; keep that out of the report
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                return await run_suite(client, sampler, endpoints, concurrency_levels, n_requests, payloads)
+    finally:
+        sampler.stop()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_uvicorn(endpoints, concurrency_levels, n_requests, payloads):
+    port = _free_port()
+    log = tempfile.TemporaryFile()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=log, env=os.environ.copy(),
+    )
+    sampler = RssSampler(server.pid)
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=max(concurrency_levels), max_keepalive_connections=max(concurrency_levels))
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+            deadline = time.monotonic() + 180
+            while True:
+                if server.poll() is not None:
+                    log.seek(0)
+                    raise RuntimeError(f"uvicorn exited with {server.returncode}:\n{log.read().decode(errors='replace')[-2000:]}")
+                try:
+                    if (await client.get("/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not start within 180 s")
+                await asyncio.sleep(0.2)
+            return await run_suite(client, sampler, endpoints, concurrency_levels, n_requests, payloads)
+    finally:
+        sampler.stop()
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        log.close()
+
+
+# === Reporting ===
+def _print_row(name, concurrency, level, baseline=None):
+    latency = level["latency_ms"]
+    line = (f"  {name:<31}{concurrency:>4}{level['rps']:>9.1f}{latency['p50']:>9.1f}{latency['p95']:>9.1f}"
+            f"{latency['p99']:>9.1f}{level['errors']:>7}{level['peak_rss_mb'] or float('nan'):>10.1f}")
+    if baseline is not None:
+        line += f"   rps x{level['rps'] / baseline['rps']:.2f}, p50 x{latency['p50'] / baseline['latency_ms']['p50']:.2f}"
+    print(line, file=sys.stderr, flush=True)
+
+
+def _print_header(mode):
+    print(f"\n[{mode}]\n  {'endpoint':<31}{'c':>4}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>7}{'peak MB':>10}",
+          file=sys.stderr, flush=True)
+
+
+def compare(results, baseline):
+    print("\nAgainst baseline (x = this run / baseline):", file=sys.stderr)
+    for mode, endpoints in results.items():
+        if mode not in baseline.get("results", {}):
+            print(f"\n[{mode}] not in the baseline run", file=sys.stderr)
+            continue
+        _print_header(mode)
+        for name, levels in endpoints.items():
+            for concurrency, level in levels.items():
+                before = baseline["results"][mode].get(name, {}).get(concurrency)
+                if before:
+                    _print_row(name, int(concurrency), level, before)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["asgi", "uvicorn", "both"], default="asgi")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY))
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="per endpoint and concurrency level")
+    parser.add_argument("--endpoint", action="append", choices=sorted(ENDPOINTS), help="default: all")
+    parser.add_argument("--output", default="load_results.json")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--no-memo", action="store_true", help="disable the prediction memo on every route")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.no_memo:
+        for route in MEMO_ROUTES:
+            os.environ[f"MEMO_MAX_ENTRIES_{route.upper()}"] = "0"
+    endpoints = args.endpoint or list(ENDPOINTS)
+    modes = ["asgi", "uvicorn"] if args.mode == "both" else [args.mode]
+    runners = {"asgi": run_asgi, "uvicorn": run_uvicorn}
+
+    results = {}
+    for mode in modes:
+        _print_header(mode)
+        payloads = Payloads(args.seed)
+        results[mode] = asyncio.run(runners[mode](endpoints, args.concurrency, args.requests, payloads))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "requests_per_level": args.requests,
+            "concurrency": args.concurrency,
+            "memo": not args.no_memo,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Parity check and timing: librosa MFCC pipeline vs. services.mfcc.
+
+Run from ``backend/``:
+
+    python -m benchmarks.mfcc_parity [--load-atol 1e-6] [--mfcc-atol 1e-3] [--delta-atol 1e-4]
+
+Every WAV under ``audio/`` (not the generated variants) goes through
+``librosa.load(sr=16000)`` + ``feature.mfcc(n_mfcc=20)`` + ``feature.delta``
+and through the NumPy implementation. Each stage is compared on identical
+input:
+
+* loading (WAV read, mono mix, resample to 16 kHz) within ``--load-atol``,
+* MFCC of librosa's own samples within ``--mfcc-atol`` (dB units; float32
+  rounding in the FFT and matrix products is all that should differ),
+* deltas of librosa's own MFCCs within ``--delta-atol``,
+* end to end, the spelling model must give the same class for every clip.
+
+Per-clip times and the time to the first MFCC in a fresh interpreter (imports,
+plus librosa's numba compilation) are printed too. The script exits non-zero
+if any check fails.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from benchmarks.datasets import BASE_DIR, MODEL_DIR
+from services import mfcc
+from services.audio_assets import VARIANTS_DIR
+from services.audio_features import MAX_FRAMES, N_MFCC, SAMPLE_RATE, extract_spelling_features
+
+AUDIO_DIR = os.path.join(BASE_DIR, "audio")
+
+
+def wav_paths():
+    paths = []
+    for root, dirs, files in os.walk(AUDIO_DIR):
+        if os.path.relpath(root, AUDIO_DIR).split(os.sep)[0] == VARIANTS_DIR:
+            dirs[:] = []
+            continue
+        paths += [os.path.join(root, name) for name in files if name.lower().endswith(".wav")]
+    return sorted(paths)
+
+
+def librosa_features(path):
+    import librosa
+
+    y_audio, sr = librosa.load(path, sr=SAMPLE_RATE)
+    coefficients = librosa.feature.mfcc(y=y_audio, sr=sr, n_mfcc=N_MFCC)
+    features = np.concatenate([coefficients, librosa.feature.delta(coefficients),
+                               librosa.feature.delta(coefficients, order=2)], axis=0)
+    if features.shape[1] < MAX_FRAMES:
+        features = np.pad(features, ((0, 0), (0, MAX_FRAMES - features.shape[1])), mode='constant')
+    return features[:, :MAX_FRAMES].flatten()
+
+
+def first_call_seconds(statement):
+    """Wall time of ``statement`` in a fresh interpreter (best of 3)."""
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    return min(float(subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, capture_output=True, text=True,
+                                    check=True, env=dict(os.environ, PYTHONPATH=BASE_DIR)).stdout) for _ in range(3))
+
+
+def timed(fn, paths):
+    fn(paths[0])
+    start = time.perf_counter()
+    rows = [fn(path) for path in paths]
+    return (time.perf_counter() - start) * 1e3 / len(paths), np.array(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--load-atol", type=float, default=1e-6)
+    parser.add_argument("--mfcc-atol", type=float, default=1e-3)
+    parser.add_argument("--delta-atol", type=float, default=1e-4)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    import librosa
+
+    paths = wav_paths()
+    load_diff = mfcc_diff = delta_diff = 0.0
+    for path in paths:
+        y_librosa, _ = librosa.load(path, sr=SAMPLE_RATE)
+        y_numpy, _ = mfcc.load(path, SAMPLE_RATE)
+        load_diff = max(load_diff, np.abs(y_librosa - y_numpy).max() if len(y_librosa) == len(y_numpy) else np.inf)
+        expected = librosa.feature.mfcc(y=y_librosa, sr=SAMPLE_RATE, n_mfcc=N_MFCC)
+        mfcc_diff = max(mfcc_diff, np.abs(mfcc.mfcc(y_librosa, SAMPLE_RATE, N_MFCC) - expected).max())
+        for order in (1, 2):
+            delta_diff = max(delta_diff, np.abs(mfcc.delta(expected, order) - librosa.feature.delta(expected, order=order)).max())
+
+    librosa_ms, expected = timed(librosa_features, paths)
+    numpy_ms, actual = timed(extract_spelling_features, paths)
+    end_diff = np.abs(actual - expected)
+
+    print(f"clips: {len(paths)}  features: {actual.shape[1]}  resampler: {mfcc.resampler()}")
+    print(f"load max abs diff:    {load_diff:.2e}  (atol {args.load_atol:.0e})")
+    print(f"mfcc max abs diff:    {mfcc_diff:.2e}  (atol {args.mfcc_atol:.0e})")
+    print(f"delta max abs diff:   {delta_diff:.2e}  (atol {args.delta_atol:.0e})")
+    print(f"end to end max/mean:  {end_diff.max():.2e} / {end_diff.mean():.2e}")
+    print(f"librosa: {librosa_ms:.2f} ms/clip  numpy: {numpy_ms:.2f} ms/clip")
+    clip = "np.zeros(SAMPLE_RATE, dtype=np.float32)"
+    setup = "import numpy as np; from services.audio_features import SAMPLE_RATE, N_MFCC"
+    print(f"first MFCC in a new process: librosa "
+          f"{first_call_seconds(f'{setup}; import librosa; librosa.feature.mfcc(y={clip}, sr=SAMPLE_RATE, n_mfcc=N_MFCC)'):.2f} s  "
+          f"numpy {first_call_seconds(f'{setup}; from services import mfcc; mfcc.mfcc({clip}, SAMPLE_RATE, N_MFCC)'):.2f} s")
+
+    ok = load_diff <= args.load_atol and mfcc_diff <= args.mfcc_atol and delta_diff <= args.delta_atol
+    model_path = os.path.join(MODEL_DIR, "dyslexia_spelling_audio_model.joblib")
+    if os.path.exists(model_path):
+        import joblib
+        from services.spelling_feature_store import score_spelling_features
+        bundle = joblib.load(model_path)
+        expected_prob = score_spelling_features(bundle["model"], bundle["scaler"], expected)
+        actual_prob = score_spelling_features(bundle["model"], bundle["scaler"], actual)
+        same = np.array_equal(expected_prob >= 0.5, actual_prob >= 0.5)
+        print(f"model predictions identical: {same}  max proba diff: {np.abs(expected_prob - actual_prob).max():.3f}")
+        ok &= same
+
+    if not ok:
+        print("\nNumPy MFCC pipeline differs from librosa.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
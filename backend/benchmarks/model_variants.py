@@ -0,0 +1,246 @@
+"""Accuracy vs. latency vs. size for candidate model variants of each task.
+
+Run from ``backend/``:
+
+    python -m benchmarks.model_variants [--tasks phonospeech arithmetic] [--latency-budget-us 500]
+                                        [--from-run RUN_ID] [--all-formats] [--output variants.json]
+
+Every task's data comes from ``training_script/train_all.py`` (same
+datasets, features and split as a real retrain, so accuracy is on held-out
+rows). Candidates per task:
+
+* estimators, trained here: the configured one (``baseline``), fewer trees,
+  depth caps, a minimum leaf size, extra trees, and simpler models (a
+  single depth-8 tree, histogram gradient boosting, logistic regression);
+* ``--from-run``: the models of an earlier ``train_all.py`` run, loaded;
+* formats of the baseline (of every forest with ``--all-formats``): the
+  serving form (``compiled``, as ``services.forest`` runs it), plain
+  ``sklearn``, ``compiled-f32`` (``CompiledForest.to_float32``: same leaves,
+  about half the memory) and ``compressed`` (joblib ``compress=3``).
+
+For each it measures held-out accuracy and macro F1, single-row latency
+(p50/p95 of one ``predict_proba`` per row), batched latency (per row, in
+batches of ``--batch``), file size, and - in a fresh interpreter - load
+time and resident memory added by loading (models much under 1 MB land in
+memory the allocator already holds and show as ~0). Per task, ``*`` marks the Pareto
+front over (accuracy, single-row p50, resident MB): no other variant is at
+least as good on all three and better on one. With ``--latency-budget-us``,
+the most accurate variant within budget is named for each task.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+from benchmarks.datasets import BASE_DIR
+from services.forest import compile_model
+
+sys.path.insert(0, os.path.join(BASE_DIR, "training_script"))
+import train_all  # noqa: E402
+
+FORMATS = ("compiled", "sklearn", "compiled-f32", "compressed")
+
+# Measures load time and the resident memory it adds, after the libraries are imported
+LOAD_PROBE = """
+import gc, json, sys, time
+sys.path.insert(0, {base_dir!r})
+import joblib, numpy, sklearn.ensemble, sklearn.linear_model, sklearn.pipeline
+import services.forest
+
+def rss_kib():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+
+gc.collect()
+before = rss_kib()
+started = time.perf_counter()
+model = joblib.load({path!r})
+load_s = time.perf_counter() - started
+gc.collect()
+print(json.dumps({{"load_s": load_s, "rss_mb": (rss_kib() - before) / 1024}}))
+"""
+
+
+def is_forest(spec):
+    return spec["class"] in ("RandomForestClassifier", "ExtraTreesClassifier")
+
+
+def estimator_variants(base, random_state=42):
+    """{name: estimator spec} around the configured estimator."""
+    params = base.get("params", {})
+    variants = {"baseline": base}
+
+    def with_params(**changes):
+        return {"class": base["class"], "params": {**params, **changes}}
+
+    if is_forest(base):
+        n_trees = params.get("n_estimators", 100)
+        depth = params.get("max_depth")
+        for trees in sorted({max(1, n_trees // 4), max(1, n_trees // 2)}):
+            variants[f"trees={trees}"] = with_params(n_estimators=trees)
+        for cap in (8, 12, 16):
+            if depth is None or cap < depth:
+                variants[f"depth<={cap}"] = with_params(max_depth=cap)
+        variants["leaf>=5"] = with_params(min_samples_leaf=5)
+        if base["class"] != "ExtraTreesClassifier":
+            variants["extra-trees"] = {"class": "ExtraTreesClassifier", "params": params}
+    variants["tree depth<=8"] = {"class": "DecisionTreeClassifier", "params": {"max_depth": 8, "random_state": random_state}}
+    variants["hist-gb"] = {"class": "HistGradientBoostingClassifier", "params": {"max_iter": 100, "random_state": random_state}}
+    variants["logistic"] = {"class": "LogisticRegression", "params": {"max_iter": 2000}}
+    return variants
+
+
+def serving_form(fitted, fmt):
+    if fmt == "sklearn":
+        return fitted
+    return compile_model(fitted, float32=fmt == "compiled-f32")
+
+
+def latency(model, X, n_rows, batch):
+    """(single-row p50 us, p95 us, batched us per row)."""
+    X = np.asarray(X)
+    rows = [X[i:i + 1] for i in range(min(n_rows, len(X)))]
+    model.predict_proba(rows[0])
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append((time.perf_counter() - start) * 1e6)
+    big = np.resize(X, (batch, X.shape[1]))
+    start = time.perf_counter()
+    model.predict_proba(big)
+    batched = (time.perf_counter() - start) * 1e6 / batch
+    p50, p95 = np.percentile(timings, [50, 95])
+    return float(p50), float(p95), float(batched)
+
+
+def load_profile(model, compress, workdir):
+    """(file bytes, load seconds, resident MB) of ``model`` dumped with joblib, loaded in a new process."""
+    path = os.path.join(workdir, f"model-{time.perf_counter_ns()}.joblib")
+    joblib.dump(model, path, compress=compress)
+    size = os.path.getsize(path)
+    probe = LOAD_PROBE.format(base_dir=BASE_DIR, path=path)
+    out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout
+    os.remove(path)
+    measured = json.loads(out.strip().splitlines()[-1])
+    return size, measured["load_s"], measured["rss_mb"]
+
+
+def measure(name, fmt, fitted, prepared, args, workdir):
+    from sklearn.metrics import accuracy_score, f1_score
+
+    model = serving_form(fitted, "compiled" if fmt == "compressed" else fmt)
+    y_pred = model.predict(np.asarray(prepared.X_test))
+    p50, p95, batched = latency(model, prepared.X_test, args.rows, args.batch)
+    size, load_s, rss_mb = load_profile(model, 3 if fmt == "compressed" else 0, workdir)
+    return {
+        "variant": name, "format": fmt,
+        "accuracy": float(accuracy_score(prepared.y_test, y_pred)),
+        "macro_f1": float(f1_score(prepared.y_test, y_pred, average="macro")),
+        "single_p50_us": p50, "single_p95_us": p95, "batch_us_per_row": batched,
+        "file_mb": size / 1e6, "load_ms": load_s * 1e3, "rss_mb": rss_mb,
+    }
+
+
+def pareto(rows):
+    """Mark rows no other row beats on accuracy, single-row p50 and resident MB at once."""
+    for row in rows:
+        row["pareto"] = not any(
+            other["accuracy"] >= row["accuracy"] and other["single_p50_us"] <= row["single_p50_us"]
+            and other["rss_mb"] <= row["rss_mb"]
+            and (other["accuracy"] > row["accuracy"] or other["single_p50_us"] < row["single_p50_us"]
+                 or other["rss_mb"] < row["rss_mb"])
+            for other in rows if other is not row
+        )
+    return rows
+
+
+def bench_task(task, spec, args, workdir):
+    cpus = max(1, args.cpus)
+    prepared = train_all.BUILDERS[spec["features"]["builder"]](
+        os.path.join(BASE_DIR, spec["dataset"]), spec["features"], spec["split"], cpus)
+    X_train, y_train = np.asarray(prepared.X_train), np.asarray(prepared.y_train)
+    prepared.X_test = np.asarray(prepared.X_test)
+
+    rows = []
+    for name, estimator_spec in estimator_variants(spec["estimator"]).items():
+        started = time.perf_counter()
+        try:
+            fitted = prepared.wrap(train_all.make_estimator(estimator_spec, cpus)).fit(X_train, y_train)
+        except Exception as e:
+            print(f"  {name}: not trained ({type(e).__name__}: {e})")
+            continue
+        fit_s = time.perf_counter() - started
+        formats = FORMATS if is_forest(estimator_spec) and (name == "baseline" or args.all_formats) else ("compiled",)
+        for fmt in formats:
+            rows.append(dict(measure(name, fmt, fitted, prepared, args, workdir), fit_s=fit_s))
+
+    if args.from_run:
+        task_dir = os.path.join(train_all.RUNS_DIR, args.from_run, task)
+        model_file = os.path.join(task_dir, spec["artifacts"]["model"])
+        if os.path.exists(model_file):
+            loaded = joblib.load(model_file)
+            if isinstance(loaded, dict):
+                loaded = loaded["model"]
+            rows.append(dict(measure(f"run {args.from_run}", "compiled", loaded, prepared, args, workdir), fit_s=None))
+        else:
+            print(f"  run {args.from_run}: no {os.path.relpath(model_file, BASE_DIR)}")
+    return pareto(rows)
+
+
+def print_task(task, rows, budget_us):
+    print(f"\n{task}")
+    print(f"  {'':1} {'variant':<20} {'format':<13} {'accuracy':>8} {'F1':>6} {'p50 us':>8} {'p95 us':>8} "
+          f"{'batch us/row':>12} {'file MB':>8} {'load ms':>8} {'RSS MB':>7}")
+    for row in sorted(rows, key=lambda r: (-r["accuracy"], r["single_p50_us"])):
+        print(f"  {'*' if row['pareto'] else ' ':1} {row['variant']:<20} {row['format']:<13} {row['accuracy']:>8.2%} "
+              f"{row['macro_f1']:>6.3f} {row['single_p50_us']:>8.0f} {row['single_p95_us']:>8.0f} "
+              f"{row['batch_us_per_row']:>12.2f} {row['file_mb']:>8.2f} {row['load_ms']:>8.1f} {row['rss_mb']:>7.1f}")
+    if budget_us is not None:
+        within = [row for row in rows if row["single_p50_us"] <= budget_us]
+        if within:
+            best = max(within, key=lambda r: (r["accuracy"], -r["rss_mb"]))
+            print(f"  within {budget_us:g} us: {best['variant']} ({best['format']}), {best['accuracy']:.2%}, "
+                  f"{best['single_p50_us']:.0f} us, {best['rss_mb']:.1f} MB")
+        else:
+            print(f"  nothing within {budget_us:g} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default=train_all.CONFIG_PATH)
+    parser.add_argument("--tasks", nargs="+", help="default: every task in the config")
+    parser.add_argument("--rows", type=int, default=200, help="single-row requests timed per variant")
+    parser.add_argument("--batch", type=int, default=1000, help="rows per batched predict_proba")
+    parser.add_argument("--cpus", type=int, default=train_all.usable_cpus(), help="n_jobs for training variants")
+    parser.add_argument("--from-run", help="also load the models of this train_all.py run id")
+    parser.add_argument("--all-formats", action="store_true", help="every format for every forest, not only the baseline")
+    parser.add_argument("--latency-budget-us", type=float, help="name the most accurate variant within this single-row p50")
+    parser.add_argument("--output", help="write all rows as JSON")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    config = train_all.load_config(args.config)
+    tasks = args.tasks or list(config)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for task in tasks:
+            print(f"[{task}] training and measuring variants...")
+            results[task] = bench_task(task, config[task], args, workdir)
+    for task in tasks:
+        print_task(task, results[task], args.latency_budget_us)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
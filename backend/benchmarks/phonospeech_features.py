@@ -0,0 +1,93 @@
+"""Parity check and latency: dense phonospeech path vs. services.phonospeech_features.
+
+Run from ``backend/``:
+
+    python -m benchmarks.phonospeech_features [--rows 300]
+
+Every (question, child_response) pair in the dataset, the same questions with
+shuffled responses, and unseen questions are featurized both ways. The sparse
+rows must equal ``vectorizer.transform`` + ``scaler.transform`` + ``hstack``
+exactly, and the compiled forest on sparse input must reproduce sklearn's
+probabilities on the dense rows; the script exits non-zero otherwise.
+"""
+import argparse
+import random
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datasets import DATA_DIR, _model
+from services.forest import compile_model
+from services.phonospeech_features import PhonoSpeechFeaturizer, extract_phoneme_features, load_questions
+
+
+def dense_features(vectorizer, scaler, pairs):
+    # The original per-request path in routers/phonospeech_test.py
+    X_text = vectorizer.transform([question + ' ' + child_response for question, child_response in pairs])
+    X_numeric = scaler.transform([
+        extract_phoneme_features(question) + extract_phoneme_features(child_response)
+        for question, child_response in pairs
+    ])
+    return np.hstack([X_text.toarray(), X_numeric])
+
+
+def sample_pairs(seed=42):
+    df = pd.read_csv(f"{DATA_DIR}/dyslexia_training_dataset.csv")
+    for col in ['Question', 'Child_Response']:
+        df[col] = df[col].fillna('').astype(str)
+    pairs = list(zip(df['Question'], df['Child_Response']))
+    rng = random.Random(seed)
+    words = " ".join(df['Question'] + ' ' + df['Child_Response']).split()
+    pairs += [(question, " ".join(rng.sample(words, rng.randint(0, 6)))) for question, _ in pairs]
+    pairs += [(f"Unseen question about {rng.choice(words)}", rng.choice(words)) for _ in range(50)]
+    return pairs
+
+
+def _latency_us(fn, pairs):
+    timings = []
+    for pair in pairs:
+        start = time.perf_counter()
+        fn([pair])
+        timings.append((time.perf_counter() - start) * 1e6)
+    return np.percentile(timings, [50, 95])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=300, help="single-pair requests timed per path")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    vectorizer, scaler, model = _model("vectorizer.joblib"), _model("scaler.joblib"), _model("phonospeech_model.joblib")
+    compiled = compile_model(model)
+    featurizer = PhonoSpeechFeaturizer(vectorizer, scaler, load_questions())
+    pairs = sample_pairs()
+
+    dense = dense_features(vectorizer, scaler, pairs)
+    sparse = featurizer.transform(pairs)
+    features_identical = np.array_equal(dense, sparse.toarray())
+    proba_identical = np.array_equal(model.predict_proba(dense), compiled.predict_proba(sparse))
+    print(f"pairs: {len(pairs)}  features identical: {features_identical}  probabilities identical: {proba_identical}")
+
+    timed = pairs[:args.rows]
+    paths = {
+        "dense + sklearn": lambda p: model.predict_proba(dense_features(vectorizer, scaler, p)),
+        "dense + compiled": lambda p: compiled.predict_proba(dense_features(vectorizer, scaler, p)),
+        "sparse featurize only": featurizer.transform,
+        "sparse + compiled": lambda p: compiled.predict_proba(featurizer.transform(p)),
+    }
+    print(f"\n{'path':<24}{'p50 us':>10}{'p95 us':>10}")
+    for name, fn in paths.items():
+        p50, p95 = _latency_us(fn, timed)
+        print(f"{name:<24}{p50:>10.0f}{p95:>10.0f}")
+
+    if not (features_identical and proba_identical):
+        print("\nSparse phonospeech path differs from the dense one.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Parity check and latency: per-item letterconfusion/arithmetic assembly vs. services.feature_transforms.
+
+Run from ``backend/``:
+
+    python -m benchmarks.session_features [--sessions 300]
+
+Every dataset row is assembled both ways, and so are random sessions of 1-20
+answers/attempts. The model matrix, the probabilities and the arithmetic
+summary counters must be identical; the script exits non-zero otherwise.
+"""
+import argparse
+import random
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datasets import DATA_DIR, _model
+from services.feature_transforms import (
+    LETTERS, ArithmeticFeatures, LetterConfusionFeatures, arithmetic_session_stats,
+)
+from services.forest import compile_model
+
+
+# The original per-answer path in routers/letterconfusion.py
+def reference_letter_matrix(le_question_type, scaler, answers):
+    features = []
+    for question_type, shown_letters, correct, response_time_ms in answers:
+        q_type_enc = le_question_type.transform([question_type])[0]
+        shown_letters_enc = [1 if letter in shown_letters else 0 for letter in LETTERS]
+        rt_scaled = scaler.transform([[response_time_ms]])[0][0]
+        features.append([correct, rt_scaled, q_type_enc] + shown_letters_enc)
+    return np.array(features, dtype=np.float32)
+
+
+# The original per-attempt path in routers/arithmetic_test.py
+def reference_arithmetic(op_encoder, scaler, model, attempts):
+    features_list = []
+    for op1, op2, operation, user_choice, response_time in attempts:
+        op_encoded = int(op_encoder.transform([operation])[0])
+        features_list.append([op1, op2, op_encoded, user_choice, response_time])
+    X = scaler.transform(np.array(features_list))
+    preds = (model.predict_proba(X)[:, 1] > 0.5).astype(int)
+    stats = dict(total_correct=0, total_time=0, slow_count=0, fast_count=0, moderate_count=0, risk_count=0)
+    for i, (_, _, _, user_choice, response_time) in enumerate(attempts):
+        is_at_risk = 0 if user_choice == 0 else preds[i]
+        if response_time > 3:
+            stats["slow_count"] += 1
+        elif response_time < 1.5:
+            stats["fast_count"] += 1
+        else:
+            stats["moderate_count"] += 1
+        stats["risk_count"] += int(is_at_risk)
+        stats["total_correct"] += user_choice == 0
+        stats["total_time"] += response_time
+    return X, stats
+
+
+def letter_answers():
+    df = pd.read_csv(f"{DATA_DIR}/dyslexia_letter_dataset_10k.csv")
+    return list(zip(df['question_type'], df['shown_letters'].str.split(','), df['correct'].astype(int).tolist(),
+                    df['response_time_ms'].astype(float).tolist()))
+
+
+def arithmetic_attempts():
+    df = pd.read_csv(f"{DATA_DIR}/arithmetic_data_1k.csv")
+    return list(zip(
+        df['question'].str.extract(r'(\d+)')[0].astype(int).tolist(),
+        df['question'].str.extract(r'[\+\-\*/] (\d+)')[0].astype(int).tolist(),
+        df['question'].str.extract(r'(\+|\-|\*|\/)')[0].tolist(),
+        (df['user_choice'] != 'choice_1').astype(int).tolist(),
+        df['response_time'].astype(float).tolist(),
+    ))
+
+
+def _columns(rows):
+    return [list(column) for column in zip(*rows)]
+
+
+def _latency_us(fn, sessions):
+    timings = []
+    for session in sessions:
+        start = time.perf_counter()
+        fn(session)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return np.percentile(timings, [50, 95])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=300, help="random sessions checked and timed per task")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    rng = random.Random(42)
+    ok = True
+
+    le_question_type, letter_scaler = _model("le_question_type.joblib"), _model("letterconfusion_scaler.joblib")
+    letter_model = compile_model(_model("dyslexia_letter_confusion_model.joblib"))
+    letter_features = LetterConfusionFeatures(le_question_type, letter_scaler)
+    answers = letter_answers()
+    letter_sessions = [rng.sample(answers, rng.randint(1, 20)) for _ in range(args.sessions)]
+    identical = all(
+        np.array_equal(reference_letter_matrix(le_question_type, letter_scaler, rows), letter_features.matrix(*_columns(rows)))
+        for rows in [answers] + letter_sessions
+    )
+    print(f"letterconfusion  rows: {len(answers)}  sessions: {len(letter_sessions)}  features identical: {identical}")
+    ok &= identical
+
+    op_encoder, arithmetic_scaler = _model("arithmetic_op_encoder.joblib"), _model("arithmetic_scaler.pkl")
+    arithmetic_model = compile_model(_model("dyscalculia_arithmetic.joblib"))
+    arithmetic_features = ArithmeticFeatures(op_encoder, arithmetic_scaler)
+
+    def vectorized_arithmetic(rows):
+        op1, op2, operation, user_choice, response_time = _columns(rows)
+        X = arithmetic_features.matrix(op1, op2, operation, user_choice, response_time)
+        proba = arithmetic_model.predict_proba(X)[:, 1]
+        return X, arithmetic_session_stats(user_choice, response_time, proba > 0.5)
+
+    attempts = arithmetic_attempts()
+    arithmetic_sessions = [rng.sample(attempts, rng.randint(1, 20)) for _ in range(args.sessions)]
+    features_identical = counters_identical = True
+    max_time_diff = 0.0
+    for rows in [attempts] + arithmetic_sessions:
+        X_ref, stats_ref = reference_arithmetic(op_encoder, arithmetic_scaler, arithmetic_model, rows)
+        X, stats = vectorized_arithmetic(rows)
+        features_identical &= np.array_equal(X_ref, X)
+        counters_identical &= all(stats[key] == stats_ref[key] for key in stats if key != "total_time")
+        max_time_diff = max(max_time_diff, abs(stats["total_time"] - stats_ref["total_time"]))
+    print(f"arithmetic       rows: {len(attempts)}  sessions: {len(arithmetic_sessions)}  features identical: "
+          f"{features_identical}  counters identical: {counters_identical}  max |total_time diff|: {max_time_diff:.1e}")
+    # Summation order differs (numpy pairwise vs. running sum); anything beyond rounding is a bug
+    ok &= features_identical and counters_identical and max_time_diff < 1e-9
+
+    paths = {
+        "letterconfusion per-item": lambda rows: letter_model.predict_proba(reference_letter_matrix(le_question_type, letter_scaler, rows)),
+        "letterconfusion vectorized": lambda rows: letter_model.predict_proba(letter_features.matrix(*_columns(rows))),
+        "arithmetic per-item": lambda rows: reference_arithmetic(op_encoder, arithmetic_scaler, arithmetic_model, rows),
+        "arithmetic vectorized": vectorized_arithmetic,
+    }
+    print(f"\n{'path (incl. compiled forest)':<30}{'p50 us':>10}{'p95 us':>10}")
+    for name, fn in paths.items():
+        p50, p95 = _latency_us(fn, letter_sessions if name.startswith("letter") else arithmetic_sessions)
+        print(f"{name:<30}{p50:>10.0f}{p95:>10.0f}")
+
+    if not ok:
+        print("\nVectorized session features differ from the per-item path.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
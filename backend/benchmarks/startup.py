@@ -0,0 +1,137 @@
+"""Startup profile: import time of ``main`` and time until every warm-up step is done.
+
+Run from ``backend/``:
+
+    python -m benchmarks.startup [--top 25] [--output startup.json] [--baseline previous.json]
+
+A fresh interpreter imports ``main`` under ``python -X importtime`` and then
+runs the warm-up steps in the foreground. The report lists the slowest imports
+on the way to ``main`` (cumulative and self time), the heavy packages that
+were (or were not) imported by then, the imports the warm-up pulled in later,
+and each warm-up step's duration. ``--baseline`` prints each headline number
+next to the one from an earlier ``--output``.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.datasets import BASE_DIR
+
+# Packages worth tracking: whether they are paid for at import or later
+HEAVY_PACKAGES = ("sklearn", "scipy", "pandas", "librosa", "numba", "joblib", "PIL", "numpy", "fastapi")
+MARKER = "=== main imported ==="
+
+CHILD = f"""
+import json, sys, time
+started = time.perf_counter()
+import main
+import_s = time.perf_counter() - started
+sys.stderr.write({MARKER!r} + "\\n")
+sys.stderr.flush()
+started = time.perf_counter()
+report = main.warmup.run()
+print(json.dumps({{"import_s": import_s, "warmup_s": time.perf_counter() - started, "warmup": report}}))
+"""
+
+
+def parse_importtime(lines):
+    """[(module, self_us, cumulative_us)] from ``-X importtime`` output lines."""
+    modules = []
+    for line in lines:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def profile():
+    env = dict(os.environ, PYTHONPATH=BASE_DIR)
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD], cwd=BASE_DIR, env=env,
+                          capture_output=True, text=True)
+    wall_s = time.perf_counter() - started
+    if proc.returncode != 0:
+        sys.exit(proc.stderr[-4000:])
+    stderr = proc.stderr.splitlines()
+    cut = stderr.index(MARKER)
+    at_import = parse_importtime(stderr[:cut])
+    during_warmup = parse_importtime(stderr[cut + 1:])
+    child = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    def imported(modules, package):
+        return any(name == package for name, _, _ in modules)
+
+    return {
+        "python": sys.version.split()[0],
+        "process_wall_s": round(wall_s, 3),
+        "import_main_s": round(child["import_s"], 3),
+        "warmup_s": round(child["warmup_s"], 3),
+        "ready_s": round(child["import_s"] + child["warmup_s"], 3),
+        "modules_at_import": len(at_import),
+        "modules_during_warmup": len(during_warmup),
+        "heavy_packages": {
+            package: "import" if imported(at_import, package) else "warm-up" if imported(during_warmup, package) else "not loaded"
+            for package in HEAVY_PACKAGES
+        },
+        "slowest_imports": [
+            {"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cumulative_us / 1000, 1)}
+            for name, self_us, cumulative_us in sorted(at_import, key=lambda m: -m[2])
+        ],
+        "slowest_warmup_imports": [
+            {"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cumulative_us / 1000, 1)}
+            for name, self_us, cumulative_us in sorted(during_warmup, key=lambda m: -m[2])
+        ],
+        "warmup_steps": {name: step["seconds"] for name, step in child["warmup"]["steps"].items()},
+        "warmup_failed": {name: step["error"] for name, step in child["warmup"]["steps"].items() if step["status"] != "ready"},
+    }
+
+
+def print_report(report, top, baseline=None):
+    def versus(key):
+        if baseline is None or key not in baseline:
+            return ""
+        return f"   (baseline {baseline[key]:.3f} s)"
+
+    print(f"import main   {report['import_main_s']:.3f} s{versus('import_main_s')}")
+    print(f"warm-up       {report['warmup_s']:.3f} s{versus('warmup_s')}")
+    print(f"ready         {report['ready_s']:.3f} s{versus('ready_s')}")
+    print(f"modules       {report['modules_at_import']} at import, {report['modules_during_warmup']} more during warm-up")
+    print()
+    print("heavy packages: " + ", ".join(f"{package}={when}" for package, when in report["heavy_packages"].items()))
+    for title, key in (("Slowest imports on the way to main", "slowest_imports"), ("Slowest imports during warm-up", "slowest_warmup_imports")):
+        print()
+        print(f"{title} (top {top}):")
+        print(f"  {'cumulative ms':>13} {'self ms':>9}  module")
+        for row in report[key][:top]:
+            print(f"  {row['cumulative_ms']:>13.1f} {row['self_ms']:>9.1f}  {row['module']}")
+    print()
+    print("Warm-up steps:")
+    for name, seconds in report["warmup_steps"].items():
+        print(f"  {name:<22} {seconds:.3f} s" + (f"  FAILED: {report['warmup_failed'][name]}" if name in report["warmup_failed"] else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile backend import time and warm-up.")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--output", help="write the full report as JSON")
+    parser.add_argument("--baseline", help="an earlier --output to compare against")
+    args = parser.parse_args()
+
+    report = profile()
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, args.top, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
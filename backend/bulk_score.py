@@ -0,0 +1,416 @@
+"""Offline bulk scoring of screening exports with the served models.
+
+From ``backend/``:
+
+    python bulk_score.py TASK export.csv [--out DIR] [--child-column child_id]
+                         [--column API_NAME=CSV_NAME ...] [--chunk-rows 20000] [--workers N]
+
+TASK is ``arithmetic``, ``numberunderstanding``, ``letterconfusion`` or
+``letter_tracing``. The export has one attempt per row, with the fields of
+that task's API request as columns (``--column`` maps differently named
+ones) plus a child id:
+
+    arithmetic           op1, op2, operation, user_choice, response_time
+    numberunderstanding  left_number, right_number, response_time_sec, user_correct
+    letterconfusion      question_type, shown_letters ("b,d,p"), correct, response_time_ms
+    letter_tracing       duration, accuracy
+
+Models come from the registry (models/manifest.json) and features from the
+routers' own code, so a row scores exactly as the same attempt sent to the
+API would. The file is read in chunks of ``--chunk-rows``; each chunk is
+featurized and scored with one ``predict_proba`` call. Chunks are spread over
+``--workers`` processes (default: one per usable CPU, each limited to one
+BLAS/OpenMP thread), forked after the models are loaded so they share them.
+
+Two files are written next to the export (or into ``--out``):
+
+* ``<name>.<task>.attempts.csv``: one line per input row (``row`` is its
+  position in the export), appended chunk by chunk in input order. Rows that
+  cannot be scored (missing or non-numeric values, unknown categories,
+  values the API would reject) keep their line, with ``error`` set.
+* ``<name>.<task>.children.csv``: one summary per child - the arithmetic
+  session summary, the letterconfusion verdict, at-risk counts and label
+  counts - from running totals, so memory grows with the number of children
+  and the chunks in flight, not with the file.
+
+Progress and the final rows/second go to stdout.
+"""
+import abc
+import argparse
+import itertools
+import os
+import sys
+import time
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from serve import cap_threads, usable_cpus
+
+# Parallelism comes from worker processes; each keeps to one thread
+cap_threads(1)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+DEFAULT_CHUNK_ROWS = 20000
+# Chunks submitted but not yet written, per worker
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+PROGRESS_INTERVAL_S = 5.0
+
+# Matrices come from the routers' feature code in the training column order, without names
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+# === Tasks ===
+def open_batch_model(models):
+    # The registry serves the compiled forest, which is quickest for a few rows
+    # per call; at thousands of rows sklearn's own traversal is 2-3x faster and
+    # gives the same probabilities. Same file the registry verified and loaded.
+    import joblib
+
+    model = joblib.load(models.path("model"))
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = 1
+    return model
+
+
+class BulkTask(abc.ABC):
+    """How one task's export rows are validated, scored and summarized."""
+
+    columns = ()
+    # Scores with the task's forest (``forest()``) rather than a router function
+    uses_forest = False
+    # Columns that are not numeric; every other one is parsed as a number
+    text_columns = ()
+
+    def __init__(self, models, engine="sklearn"):
+        self.models = models
+        self.engine = engine
+
+    def forest(self):
+        """The model to score chunks with; see ``open_batch_model``."""
+        if self.engine == "compiled":
+            return self.models["model"]
+        return self.models.derived("batch_model", open_batch_model)
+
+    def invalid(self, values):
+        """{error message: row mask} of rows the API would reject."""
+        return {}
+
+    @abc.abstractmethod
+    def score(self, values):
+        """(per-attempt output columns, per-child sum columns) for valid rows."""
+
+    @abc.abstractmethod
+    def summarize(self, totals):
+        """One summary row per child from the summed columns."""
+
+
+class ArithmeticTask(BulkTask):
+    columns = ("op1", "op2", "operation", "user_choice", "response_time")
+    text_columns = ("operation",)
+    uses_forest = True
+
+    def __init__(self, models, engine="sklearn"):
+        from routers.arithmetic_test import open_features
+
+        super().__init__(models, engine)
+        self.features = models.derived("features", open_features)
+
+    def invalid(self, values):
+        return {"unknown operation": ~np.isin(values["operation"], self.features.operations.classes)}
+
+    def score(self, values):
+        from services.feature_transforms import arithmetic_attempt_flags
+
+        X = self.features.matrix(values["op1"], values["op2"], values["operation"],
+                                 values["user_choice"], values["response_time"])
+        proba = self.forest().predict_proba(X)[:, 1]
+        flags = arithmetic_attempt_flags(values["user_choice"], values["response_time"], proba > 0.5)
+        attempts = {"at_risk_proba": proba, "at_risk": flags["at_risk"].astype(np.int8)}
+        sums = {
+            "total_correct": flags["correct"], "total_time": values["response_time"],
+            "slow_count": flags["slow"], "fast_count": flags["fast"],
+            "moderate_count": flags["moderate"], "risk_count": flags["at_risk"],
+        }
+        return attempts, sums
+
+    def summarize(self, totals):
+        from routers.arithmetic_test import session_summary
+
+        totals = totals.astype({column: int for column in totals.columns if column != "total_time"})
+        return pd.DataFrame([session_summary(stats, int(stats["attempts"])) for stats in totals.to_dict("records")],
+                            index=totals.index)
+
+
+class NumberUnderstandingTask(BulkTask):
+    columns = ("left_number", "right_number", "response_time_sec", "user_correct")
+
+    def score(self, values):
+        from routers.numberunderstanding import predict_proba_batch, speed_indicator
+
+        proba = predict_proba_batch(self.models, np.column_stack([values[column] for column in self.columns]))
+        at_risk = np.argmax(proba, axis=1)
+        attempts = {
+            "at_risk": at_risk,
+            "confidence": proba[:, 1],
+            "speed_category": [speed_indicator(rt)[0] for rt in values["response_time_sec"]],
+        }
+        return attempts, {"at_risk_count": at_risk, "confidence_sum": proba[:, 1],
+                          "response_time_sum": values["response_time_sec"]}
+
+    def summarize(self, totals):
+        return pd.DataFrame({
+            "attempts": totals["attempts"].astype(int),
+            "at_risk_count": totals["at_risk_count"].astype(int),
+            "at_risk_share": totals["at_risk_count"] / totals["attempts"],
+            "mean_confidence": totals["confidence_sum"] / totals["attempts"],
+            "mean_response_time_sec": totals["response_time_sum"] / totals["attempts"],
+        })
+
+
+class LetterConfusionTask(BulkTask):
+    columns = ("question_type", "shown_letters", "correct", "response_time_ms")
+    text_columns = ("question_type", "shown_letters")
+    uses_forest = True
+
+    def __init__(self, models, engine="sklearn"):
+        from routers.letterconfusion import open_features
+
+        super().__init__(models, engine)
+        self.features = models.derived("features", open_features)
+
+    def invalid(self, values):
+        return {"unknown question_type": ~np.isin(values["question_type"], self.features.question_types.classes)}
+
+    def score(self, values):
+        shown_letters = [[letter.strip(" '\"[]") for letter in text.split(",")] for text in values["shown_letters"]]
+        X = self.features.matrix(values["question_type"], shown_letters, values["correct"], values["response_time_ms"])
+        proba = self.forest().predict_proba(X)[:, 1]
+        return {"dyslexic_proba": proba}, {"proba_sum": proba}
+
+    def summarize(self, totals):
+        from routers.letterconfusion import verdict
+
+        mean = totals["proba_sum"] / totals["attempts"]
+        return pd.DataFrame({
+            "attempts": totals["attempts"].astype(int),
+            "prediction": [verdict(value) for value in mean],
+            "confidence": mean.round(2),
+        })
+
+
+class LetterTracingTask(BulkTask):
+    columns = ("duration", "accuracy")
+
+    def __init__(self, models, engine="sklearn"):
+        super().__init__(models, engine)
+        self.labels = np.asarray(models["label_encoder"].classes_)
+
+    def invalid(self, values):
+        return {"Invalid duration or accuracy": (values["duration"] < 0)
+                | ~((values["accuracy"] >= 0.0) & (values["accuracy"] <= 1.0))}
+
+    def score(self, values):
+        from routers.letter_tracing import MIN_CONFIDENCE, predict_proba_batch
+
+        proba = predict_proba_batch(self.models, np.column_stack([values["duration"], values["accuracy"]]))
+        best = np.argmax(proba, axis=1)
+        confidence = proba[np.arange(len(best)), best]
+        label = np.where(confidence < MIN_CONFIDENCE, "uncertain", self.labels[best])
+        sums = {"confidence_sum": confidence}
+        sums.update({f"label_{name}": label == name for name in [*self.labels, "uncertain"]})
+        return {"label": label, "confidence": confidence}, sums
+
+    def summarize(self, totals):
+        counts = totals[[column for column in totals.columns if column.startswith("label_")]].astype(int)
+        summary = pd.DataFrame({
+            "attempts": totals["attempts"].astype(int),
+            "mean_confidence": totals["confidence_sum"] / totals["attempts"],
+            "most_common_label": counts.idxmax(axis=1).str.removeprefix("label_"),
+        })
+        return summary.join(counts)
+
+
+TASKS = {
+    "arithmetic": ArithmeticTask,
+    "numberunderstanding": NumberUnderstandingTask,
+    "letterconfusion": LetterConfusionTask,
+    "letter_tracing": LetterTracingTask,
+}
+
+
+def open_task(name, engine="sklearn"):
+    from services.registry import registry
+
+    task = TASKS[name](registry.get(name), engine)
+    if task.uses_forest:
+        # Loaded before the pool forks so the workers share it
+        task.forest()
+    return task
+
+
+# === Chunks ===
+# Set in the parent before the pool forks; the initializer only loads when it was not inherited
+_task = None
+
+
+def _open_worker(name, engine):
+    global _task
+    if _task is None:
+        _task = open_task(name, engine)
+
+
+def parse_values(task, frame):
+    """(column arrays, per-row error message or "") for one chunk."""
+    values = {}
+    errors = np.full(len(frame), "", dtype=object)
+    for column in task.columns:
+        if column in task.text_columns:
+            values[column] = np.char.strip(frame[column].to_numpy(dtype=str))
+            bad = values[column] == ""
+        else:
+            values[column] = pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=np.float64)
+            bad = ~np.isfinite(values[column])
+        errors[bad & (errors == "")] = f"missing or invalid {column}"
+    with np.errstate(invalid="ignore"):
+        for message, bad in task.invalid(values).items():
+            errors[bad & (errors == "")] = message
+    return values, errors
+
+
+def score_chunk(frame, start, child_column):
+    """(attempt lines, per-child partial sums or None, rows, invalid rows) for rows ``start``.. of the export."""
+    task = _task
+    values, errors = parse_values(task, frame)
+    ok = errors == ""
+    attempts = pd.DataFrame({"row": np.arange(start, start + len(frame))})
+    if child_column:
+        attempts[child_column] = frame[child_column].to_numpy()
+    partial = None
+    if ok.any():
+        outputs, sums = task.score({column: array[ok] for column, array in values.items()})
+        valid_rows = np.flatnonzero(ok)
+        for column, output in outputs.items():
+            output = pd.Series(output, index=valid_rows)
+            if output.dtype.kind in "biu":
+                output = output.astype("Int64")
+            attempts[column] = output.reindex(attempts.index)
+        if child_column:
+            children = attempts.loc[ok, child_column].to_numpy()
+            sums = pd.DataFrame({"attempts": np.ones(len(children)),
+                                 **{column: np.asarray(total, dtype=np.float64) for column, total in sums.items()}})
+            # Rows without a child id are scored but not summarized
+            named = children != ""
+            partial = sums[named].groupby(children[named], sort=False).sum()
+    attempts["error"] = errors
+    return attempts, partial, len(frame), int((~ok).sum())
+
+
+def read_chunks(path, chunk_rows, rename):
+    for frame in pd.read_csv(path, chunksize=chunk_rows, dtype=str, keep_default_na=False):
+        yield frame.rename(columns=rename) if rename else frame
+
+
+def run(task_name, path, out_dir, child_column, rename, chunk_rows, workers, engine="sklearn"):
+    global _task
+
+    started = time.perf_counter()
+    _task = open_task(task_name, engine)
+    name = os.path.splitext(os.path.basename(path))[0]
+    out_dir = out_dir or os.path.dirname(os.path.abspath(path))
+    os.makedirs(out_dir, exist_ok=True)
+    attempts_path = os.path.join(out_dir, f"{name}.{task_name}.attempts.csv")
+    children_path = os.path.join(out_dir, f"{name}.{task_name}.children.csv")
+
+    chunks = read_chunks(path, chunk_rows, rename)
+    first = next(chunks, None)
+    if first is None:
+        sys.exit(f"{path} has no rows")
+    missing = [column for column in _task.columns if column not in first.columns]
+    if missing:
+        sys.exit(f"{path} is missing column(s) {missing} for {task_name} (map them with --column API_NAME=CSV_NAME)")
+    if child_column not in first.columns:
+        print(f"No {child_column!r} column: writing per-attempt results only")
+        child_column = None
+
+    totals = None
+    rows = invalid = 0
+    last_report = time.perf_counter()
+    scoring_started = time.perf_counter()
+
+    def write(result):
+        nonlocal totals, rows, invalid, last_report
+        attempts, partial, n, n_invalid = result
+        attempts.to_csv(out, header=rows == 0, index=False)
+        if partial is not None:
+            totals = partial if totals is None else totals.add(partial, fill_value=0)
+        rows += n
+        invalid += n_invalid
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_INTERVAL_S:
+            print(f"  {rows} rows, {rows / (now - scoring_started):.0f} rows/s")
+            last_report = now
+
+    with open(attempts_path, "w", newline="") as out:
+        frames = itertools.chain([first], chunks)
+        start = 0
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_open_worker, initargs=(task_name, engine)) as pool:
+                pending = deque()
+                for frame in frames:
+                    pending.append(pool.submit(score_chunk, frame, start, child_column))
+                    start += len(frame)
+                    if len(pending) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+        else:
+            for frame in frames:
+                write(score_chunk(frame, start, child_column))
+                start += len(frame)
+    scoring_s = time.perf_counter() - scoring_started
+
+    n_children = 0
+    if totals is not None:
+        summary = _task.summarize(totals)
+        summary.index.name = child_column
+        summary.to_csv(children_path)
+        n_children = len(summary)
+
+    print(f"{task_name}: {rows} rows ({invalid} not scored) from {path} in {scoring_s:.1f}s "
+          f"= {rows / max(scoring_s, 1e-9):.0f} rows/s with {workers} worker(s); "
+          f"{time.perf_counter() - started:.1f}s including model loading")
+    print(f"  attempts: {attempts_path}")
+    if n_children:
+        print(f"  children: {children_path} ({n_children} children)")
+    return {"rows": rows, "invalid": invalid, "children": n_children, "seconds": scoring_s}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("task", choices=sorted(TASKS))
+    parser.add_argument("csv")
+    parser.add_argument("--out", help="output directory (default: next to the export)")
+    parser.add_argument("--child-column", default="child_id")
+    parser.add_argument("--column", action="append", default=[], metavar="API_NAME=CSV_NAME",
+                        help="read API field API_NAME from export column CSV_NAME")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=usable_cpus())
+    parser.add_argument("--engine", choices=("sklearn", "compiled"), default="sklearn",
+                        help="forest used for arithmetic/letterconfusion chunks (compiled: as served)")
+    args = parser.parse_args()
+
+    rename = {}
+    for mapping in args.column:
+        api_name, sep, csv_name = mapping.partition("=")
+        if not sep:
+            parser.error(f"--column expects API_NAME=CSV_NAME, got {mapping!r}")
+        rename[csv_name] = api_name
+    run(args.task, args.csv, args.out, args.child_column, rename, max(1, args.chunk_rows), max(1, args.workers),
+        args.engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
-from fastapi import FastAPI
-import uvicorn
+from fastapi import Depends, FastAPI, Header, HTTPException, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from routers.spelling_test import router as spelling_router
 from routers.handwritten_test import router as handwritten_router
@@ -8,16 +8,23 @@ from routers.letterconfusion import router as letterconfusion_router
 from routers.numberunderstanding import router as numberunderstanding_router
 from routers.arithmetic_test import router as arithmetic_router
 from routers.letter_tracing import router as letter_tracing_router
-from fastapi.staticfiles import StaticFiles
+from routers.audio_assets import router as audio_router
+from services.audio_assets import load_audio_assets
+from services.batching import batcher_stats
+from services.executor import pool_stats, shutdown_pools
+from services.memo import memo_stats
+from services import prometheus
+from services.registry import registry
+from services.timing import StageTimingMiddleware
+from services.warmup import warmup
+from services.serving import PARENT_PID_ENV
+import hmac
 import os
+import signal
 import uvicorn
 
 app = FastAPI()
 
-app.mount("/audio/correct", StaticFiles(directory="audio/correct"), name="correct_audio")
-app.mount("/audio/incorrect", StaticFiles(directory="audio/incorrect"), name="incorrect_audio")
-
-
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -25,7 +32,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the frontend read per-stage timings from fetch() responses
+    expose_headers=["Server-Timing"],
 )
+# Outermost, so "total" covers everything below it (Server-Timing header + /metrics histograms)
+app.add_middleware(StageTimingMiddleware)
 
 app.include_router(spelling_router, prefix="/spelling_test", tags=["Dyslexia Spelling"])
 app.include_router(handwritten_router, prefix="/handwritten_test", tags=["Dysgraphia Handwriting"])
@@ -34,12 +45,90 @@ app.include_router(letterconfusion_router, prefix="/letterconfusion_test", tags=
 app.include_router(numberunderstanding_router, prefix="/numberunderstanding_test", tags=["Dyslexia Number Understanding"])
 app.include_router(arithmetic_router, prefix="/arithmetic_test", tags=["Dyslexia Arithmetic"])
 app.include_router(letter_tracing_router, prefix="/letter_tracing", tags=["Dysgraphia Letter Tracing"])
+# Spelling clips: /audio/<path> as before, plus immutable content-hashed names
+app.include_router(audio_router, prefix="/audio", tags=["Audio"])
+
+
+@app.on_event("startup")
+def start_warmup():
+    # Models, datasets and DSP paths load in the background; /readyz reports when they are done
+    warmup.start()
+
+@app.on_event("shutdown")
+def shutdown_inference_pools():
+    shutdown_pools()
 
 
 @app.get("/")
 def root():
     return {"message": "EarlyEdge API is running!"}
 
+@app.get("/healthz")
+def healthz():
+    # Liveness: the process is up and serving
+    return {"status": "alive"}
+
+@app.get("/readyz")
+def readyz():
+    # Readiness: every router's warm-up step has finished (503 with per-step status until then)
+    report = warmup.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+# === Admin: stats, metrics, model versions and reload need MODEL_ADMIN_TOKEN ===
+def require_admin(x_admin_token: str = Header(None), authorization: str = Header(None)):
+    # Fails closed: without MODEL_ADMIN_TOKEN configured, admin endpoints are refused.
+    # Send it as X-Admin-Token, or as "Authorization: Bearer <token>" (Prometheus scrape configs)
+    admin_token = os.environ.get("MODEL_ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (MODEL_ADMIN_TOKEN is not set).")
+    supplied = x_admin_token
+    if supplied is None and authorization and authorization.lower().startswith("bearer "):
+        supplied = authorization[len("bearer "):].strip()
+    if supplied is None or not hmac.compare_digest(supplied.encode(), admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+admin = [Depends(require_admin)]
+
+@app.get("/executor/stats", dependencies=admin)
+def executor_stats():
+    return pool_stats()
+
+@app.get("/batching/stats", dependencies=admin)
+def batching_stats():
+    return batcher_stats()
+
+@app.get("/metrics", include_in_schema=False, dependencies=admin)
+def metrics():
+    # Prometheus text format: stage histograms, pool queues, batch sizes, memo counters
+    return Response(content=prometheus.render(), media_type=prometheus.CONTENT_TYPE)
+
+@app.get("/memo/stats", dependencies=admin)
+def memoization_stats():
+    return memo_stats()
+
+@app.get("/audio_assets/stats", dependencies=admin)
+def audio_asset_stats():
+    return load_audio_assets().stats()
+
+@app.get("/models", dependencies=admin)
+def model_versions():
+    return registry.versions()
+
+@app.post("/models/reload", dependencies=admin)
+async def reload_models(task: str = None):
+    # Re-reads models/manifest.json and swaps in changed versions without a restart.
+    # Under serve.py only the parent reloads (then replaces every worker), so the
+    # request is forwarded there as SIGHUP and covers all changed tasks.
+    serve_parent = os.environ.get(PARENT_PID_ENV)
+    if serve_parent and int(serve_parent) == os.getppid():
+        os.kill(os.getppid(), signal.SIGHUP)
+        return JSONResponse(status_code=202, content={
+            "status": "reload requested",
+            "detail": "serve.py reloads every changed task in the parent and replaces workers one at a time.",
+        })
+    return await registry.reload_async([task] if task else None)
+
+# Single process for development; production runs serve.py (preloaded models, forked workers)
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
     uvicorn.run("main:app", host="0.0.0.0", port=port, reload=False)
@@ -1,17 +1,17 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import List
-import joblib
 import numpy as np
-import os
+from services.executor import get_pool
+from services.feature_transforms import ArithmeticFeatures, UnknownCategoryError, arithmetic_session_stats
+from services.registry import registry
+from services.timing import stage
+from services.warmup import warmup
 
-# ======= Load Model, Scaler, and Encoder =======
-base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-model = joblib.load(os.path.join(base_dir, "models", "dyscalculia_arithmetic.joblib"))
-scaler = joblib.load(os.path.join(base_dir, "models", "arithmetic_scaler.pkl"))
-op_encoder = joblib.load(os.path.join(base_dir, "models", "arithmetic_op_encoder.joblib"))
+# ======= Model, Scaler, and Encoder (versioned, see models/manifest.json; loaded on first use or during warm-up) =======
 
 router = APIRouter(prefix="/api/arithmetic")
+inference_pool = get_pool("arithmetic")
 
 class Attempt(BaseModel):
     op1: int
@@ -23,99 +23,94 @@ class Attempt(BaseModel):
 class SummaryRequest(BaseModel):
     attempts: List[Attempt]
 
-@router.post("/summary")
-async def calculate_summary(request: SummaryRequest):
+def open_features(models):
+    return ArithmeticFeatures(models["op_encoder"], models["scaler"])
+
+def summarize_attempts(models, attempts: List[Attempt]):
+    features = models.derived("features", open_features)
+    user_choice = [attempt.user_choice for attempt in attempts]
+    response_time = [attempt.response_time for attempt in attempts]
     try:
-        total_correct = 0
-        total_time = 0
-        slow_count = 0
-        fast_count = 0
-        moderate_count = 0
-        risk_count = 0
-
-        features_list = []
-        for attempt in request.attempts:
-            # Encode operation using the saved encoder
-            try:
-                op_encoded = int(op_encoder.transform([attempt.operation])[0])
-            except Exception:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid operation: {attempt.operation}. Allowed: {list(op_encoder.classes_)}"
-                )
-            features = [
-                attempt.op1,
-                attempt.op2,
-                op_encoded,
-                attempt.user_choice,
-                attempt.response_time
-            ]
-            features_list.append(features)
-
-        # Scale features
-        X = scaler.transform(np.array(features_list))
-
-        # Predict with sklearn model
-        proba = model.predict_proba(X)[:, 1]  # Probability of 'at risk'
-        preds = (proba > 0.5).astype(int)
-
-        for i, attempt in enumerate(request.attempts):
-            is_at_risk = preds[i]
-            if attempt.user_choice == 0:
-                is_at_risk = 0  # If user was correct, not at risk
-
-            if attempt.response_time > 3:
-                slow_count += 1
-            elif attempt.response_time < 1.5:
-                fast_count += 1
-            else:
-                moderate_count += 1
-
-            risk_count += is_at_risk
-            if attempt.user_choice == 0:
-                total_correct += 1
-
-            total_time += attempt.response_time
-
-        total_attempts = len(request.attempts)
-        avg_time = total_time / total_attempts if total_attempts > 0 else 0
-
-        # Determine risk level
-        if total_correct == total_attempts:
-            overall_risk = "No risk"
+        with stage("features"):
+            X = features.matrix(
+                [attempt.op1 for attempt in attempts],
+                [attempt.op2 for attempt in attempts],
+                [attempt.operation for attempt in attempts],
+                user_choice,
+                response_time,
+            )
+    except UnknownCategoryError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid operation: {e.value}. Allowed: {e.allowed}"
+        )
+
+    # Predict with sklearn model
+    with stage("forest"):
+        proba = models["model"].predict_proba(X)[:, 1]  # Probability of 'at risk'
+    stats = arithmetic_session_stats(user_choice, response_time, proba > 0.5)
+    return session_summary(stats, len(attempts))
+
+def session_summary(stats, total_attempts):
+    """Summary of one session from ``arithmetic_session_stats`` counters (also used by bulk_score.py)."""
+    total_correct, risk_count = stats["total_correct"], stats["risk_count"]
+    slow_count, fast_count, moderate_count = stats["slow_count"], stats["fast_count"], stats["moderate_count"]
+
+    avg_time = stats["total_time"] / total_attempts if total_attempts > 0 else 0
+
+    # Determine risk level
+    if total_correct == total_attempts:
+        overall_risk = "No risk"
+    else:
+        risk_ratio = risk_count / total_attempts
+        if risk_ratio < 0.33:
+            overall_risk = "Minimal Indicators (denoting Low Risk)"
+        elif risk_ratio < 0.66:
+            overall_risk = "Emerging Indicators (denoting Moderate Risk)"
         else:
-            risk_ratio = risk_count / total_attempts
-            if risk_ratio < 0.33:
-                overall_risk = "Minimal Indicators (denoting Low Risk)"
-            elif risk_ratio < 0.66:
-                overall_risk = "Emerging Indicators (denoting Moderate Risk)"
-            else:
-                overall_risk = "Strong Indicators (denoting High Risk)"
-
-        # Determine speed category
-        speed_category = "Slow" if slow_count > fast_count and slow_count > moderate_count else \
-                         "Fast" if fast_count > slow_count and fast_count > moderate_count else \
-                         "Moderate"
-
-        # Assessment recommendation
-        if total_attempts == 3:
-            assessment_quality = "Minimal (fast screening)"
-        elif total_attempts == 4:
-            assessment_quality = "Moderate (balanced reliability)"
-        elif total_attempts >= 5:
-            assessment_quality = "Ideal (optimal for ML pattern detection)"
-        else:
-            assessment_quality = "Insufficient attempts"
-
-        return {
-            "total_correct": total_correct,
-            "average_time": avg_time,
-            "overall_risk": overall_risk,
-            "speed_category": speed_category,
-            "risk_count": int(risk_count),
-            "total_attempts": total_attempts,
-            "assessment_quality": assessment_quality
-        }
+            overall_risk = "Strong Indicators (denoting High Risk)"
+
+    # Determine speed category
+    speed_category = "Slow" if slow_count > fast_count and slow_count > moderate_count else \
+                     "Fast" if fast_count > slow_count and fast_count > moderate_count else \
+                     "Moderate"
+
+    # Assessment recommendation
+    if total_attempts == 3:
+        assessment_quality = "Minimal (fast screening)"
+    elif total_attempts == 4:
+        assessment_quality = "Moderate (balanced reliability)"
+    elif total_attempts >= 5:
+        assessment_quality = "Ideal (optimal for ML pattern detection)"
+    else:
+        assessment_quality = "Insufficient attempts"
+
+    return {
+        "total_correct": total_correct,
+        "average_time": avg_time,
+        "overall_risk": overall_risk,
+        "speed_category": speed_category,
+        "risk_count": int(risk_count),
+        "total_attempts": total_attempts,
+        "assessment_quality": assessment_quality
+    }
 
+@router.post("/summary")
+async def calculate_summary(request: SummaryRequest, http_request: Request):
+    if not request.attempts:
+        raise HTTPException(status_code=400, detail="No attempts provided.")
+    try:
+        models = registry.get("arithmetic")
+        return await inference_pool.run(summarize_attempts, models, request.attempts, request=http_request)
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in summary calculation: {e}")
+
+# ======= Warm-up: model + feature transforms, one scored attempt =======
+def warm_up():
+    models = registry.get("arithmetic")
+    operation = str(models["op_encoder"].classes_[0])
+    summarize_attempts(models, [Attempt(op1=2, op2=3, operation=operation, user_choice=0, response_time=2.0)])
+
+warmup.add_step("arithmetic", warm_up)
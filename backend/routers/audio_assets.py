@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Request
+from services.audio_assets import load_audio_assets
+from services.warmup import warmup
+
+router = APIRouter()
+
+# === Endpoint: Audio files, by original path or content-hashed name ===
+# Every clip is read and hashed once, on first use or during warm-up (see services/audio_assets.py)
+@router.api_route("/{path:path}", methods=["GET", "HEAD"])
+async def get_audio_file(path: str, request: Request):
+    return load_audio_assets().response(request, path)
+
+warmup.add_step("audio_assets", load_audio_assets)
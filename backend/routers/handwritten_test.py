@@ -1,46 +1,80 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, UploadFile, HTTPException, Request
 from typing import List
-from PIL import Image
 import numpy as np
+import asyncio
 import io
-import joblib
-from skimage import transform, feature
-from skimage.color import rgb2gray
 import os
+from PIL import Image
+from services.executor import get_pool
+from services.image_features import ImageRejected, decode_upload, extract_hog_features
+from services.memo import MISS, get_memo, input_key
+from services.registry import registry
+from services.timing import stage
+from services.uploads import read_image_upload, upload_limit_route
+from services.warmup import warmup
+
+# Upper bound on images per request (a full worksheet batch)
+MAX_IMAGES = int(os.environ.get("HANDWRITTEN_MAX_IMAGES", 30))
+# Per image, and for the whole request (checked from Content-Length before the body is read).
+# The request cap bounds what one request holds in memory, so it is far below MAX_IMAGES x MAX_IMAGE_BYTES
+MAX_IMAGE_BYTES = int(os.environ.get("HANDWRITTEN_MAX_IMAGE_MB", 15)) * 1024 * 1024
+MAX_REQUEST_BYTES = int(os.environ.get("HANDWRITTEN_MAX_REQUEST_MB", 60)) * 1024 * 1024
 
-router = APIRouter()
+router = APIRouter(route_class=upload_limit_route(MAX_REQUEST_BYTES))
+inference_pool = get_pool("handwritten")
+memo = get_memo("handwritten")
 
-# Load trained sklearn model
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "models", "dysgraphia_handwritten_model.joblib"))
-model = joblib.load(MODEL_PATH)
+# Trained sklearn model: versioned in models/manifest.json, loaded on first use or during warm-up
 
 labels = ["Dysgraphic", "Non-Dysgraphic"]
 
-def preprocess_image(image_bytes):
-    # Load image and convert to grayscale
-    image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    image = np.array(image)
-    if image.ndim == 3:
-        image = rgb2gray(image)
-    # Resize to 128x128
-    image = transform.resize(image, (128, 128))
-    # Extract HOG features
-    hog_features = feature.hog(image, orientations=8, pixels_per_cell=(16, 16),
-                               cells_per_block=(1, 1), visualize=False)
-    return hog_features
+def extract_features(images):
+    with stage("decode"):
+        decoded = [decode_upload(image_bytes) for image_bytes in images]
+    with stage("hog"):
+        return extract_hog_features(decoded)
+
+def predict_proba(models, features):
+    with stage("forest"):
+        return models["model"].predict_proba(features)
 
 @router.post("/dysgraphia/predict")
-async def predict(files: List[UploadFile] = File(...)):
-    if not (1 <= len(files) <= 3):
-        raise HTTPException(status_code=400, detail="Please upload 1 to 3 images.")
+async def predict(request: Request, files: List[UploadFile] = File(...)):
+    if not (1 <= len(files) <= MAX_IMAGES):
+        raise HTTPException(status_code=400, detail=f"Please upload 1 to {MAX_IMAGES} images.")
 
     predictions = []
+    models = registry.get("handwritten")
+
+    # Size and header (format, pixel count) are checked before each file is read in full;
+    # one file at a time, so a rejected file stops the request before the rest are read
+    with stage("read"):
+        images = [await read_image_upload(file, MAX_IMAGE_BYTES) for file in files]
 
-    for file in files:
-        image_data = await file.read()
-        features = preprocess_image(image_data).reshape(1, -1)
-        proba = model.predict_proba(features)[0]
+    # Images seen before under this model version (same bytes) skip decoding and scoring
+    with stage("memo"):
+        keys = [input_key(image_bytes) for image_bytes in images]
+        probas = [memo.get(models, key) for key in keys]
+    missing = [i for i, proba in enumerate(probas) if proba is MISS]
+
+    if missing:
+        # Decode + HOG in one contiguous chunk per pool worker, then score every new image with one call
+        new_images = [images[i] for i in missing]
+        n_chunks = min(len(new_images), inference_pool.workers)
+        bounds = np.linspace(0, len(new_images), n_chunks + 1).astype(int)
+        try:
+            chunks = await asyncio.gather(*(
+                inference_pool.run(extract_features, new_images[start:stop], request=request)
+                for start, stop in zip(bounds[:-1], bounds[1:])
+            ))
+        except ImageRejected as e:
+            # A header that looked fine, then a body that does not decode
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        new_probas = await inference_pool.run(predict_proba, models, np.vstack(chunks), request=request)
+        for i, proba in zip(missing, new_probas):
+            probas[i] = memo.put(models, keys[i], proba)
+
+    for file, proba in zip(files, probas):
         predicted_index = int(np.argmax(proba))
         confidence = float(proba[predicted_index])
         prediction_label = labels[predicted_index] if predicted_index < len(labels) else "Unknown Classification"
@@ -65,3 +99,11 @@ async def predict(files: List[UploadFile] = File(...)):
         })
 
     return {"Results": predictions}
+
+# === Warm-up: model, one decode + HOG + prediction on a blank scan ===
+def warm_up():
+    blank = io.BytesIO()
+    Image.new("L", (256, 256), color=255).save(blank, format="PNG")
+    predict_proba(registry.get("handwritten"), extract_features([blank.getvalue()]))
+
+warmup.add_step("handwritten", warm_up)
@@ -1,7 +1,11 @@
-import os
-import joblib
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from services.batching import get_batcher
+from services.executor import get_pool
+from services.memo import get_memo, input_key
+from services.registry import registry
+from services.surrogate import open_surrogate
+from services.warmup import warmup
 
 # --- 1. Define request/response schemas ---
 class TraceRequest(BaseModel):
@@ -16,15 +20,22 @@ class TraceResponse(BaseModel):
     duration_seconds: float  # Return the time for tracing in seconds
     accuracy: float         # Return the accuracy score for feedback
 
-# --- 2. Load the trained model and label encoder on startup ---
-model_path = os.path.join(os.path.dirname(__file__), '../models/dysgraphia_tracing_model.joblib')
-label_encoder_path = os.path.join(os.path.dirname(__file__), '../models/dysgraphia_tracing_label_encoder.joblib')
+# --- 2. Trained model and label encoder (versioned, see models/manifest.json; loaded on first use or during warm-up) ---
+def open_model(models):
+    # Exact lookup table when one was compiled for this model file (python -m services.surrogate build)
+    return open_surrogate("letter_tracing", models["model"], models.path("model"))
 
-model = joblib.load(model_path)
-label_encoder = joblib.load(label_encoder_path)
+def predict_proba_batch(models, rows):
+    return models.derived("surrogate", open_model).predict_proba(rows)
+
+# Below this confidence the label is reported as "uncertain"; adjust as needed
+MIN_CONFIDENCE = 0.7
 
 # --- 3. Create router ---
 router = APIRouter()
+inference_pool = get_pool("letter_tracing")
+batcher = get_batcher("letter_tracing", predict_proba_batch, pool=inference_pool)
+memo = get_memo("letter_tracing")
 
 @router.post("/trace", response_model=TraceResponse)
 async def trace_letter(req: TraceRequest):
@@ -33,18 +44,19 @@ async def trace_letter(req: TraceRequest):
         raise HTTPException(status_code=400, detail="Invalid duration or accuracy")
 
     # Prepare features for model: duration and accuracy
-    features = [[req.duration, req.accuracy]]
+    features = [req.duration, req.accuracy]
 
-    # Get prediction probabilities
-    probabilities = model.predict_proba(features)[0]
+    # Get prediction probabilities (memoized per model version, batched with concurrent requests)
+    models = registry.get("letter_tracing")
+    probabilities = await memo.cached(models, input_key(features), lambda: batcher.predict(features, context=models))
     pred_idx = probabilities.argmax()
     confidence = float(probabilities[pred_idx])
 
     # Convert numeric prediction back to original label
-    label = label_encoder.inverse_transform([pred_idx])[0]
+    label = models["label_encoder"].inverse_transform([pred_idx])[0]
 
     # Threshold confidence level to ensure a more reliable prediction
-    if confidence < 0.7:  # Adjust this threshold as needed
+    if confidence < MIN_CONFIDENCE:
         label = "uncertain"  # or any other fallback
 
     # Return prediction label, confidence, duration, and accuracy for the frontend
@@ -53,4 +65,10 @@ async def trace_letter(req: TraceRequest):
         confidence=confidence,
         duration_seconds=req.duration,
         accuracy=req.accuracy
-    )
\ No newline at end of file
+    )
+
+# --- 4. Warm-up: model + surrogate table, one prediction ---
+def warm_up():
+    predict_proba_batch(registry.get("letter_tracing"), [[3.0, 0.8]])
+
+warmup.add_step("letter_tracing", warm_up)
@@ -1,17 +1,17 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import List
 import numpy as np
-import joblib
-import os
+from services.executor import get_pool
+from services.feature_transforms import LetterConfusionFeatures, UnknownCategoryError
+from services.registry import registry
+from services.timing import stage
+from services.warmup import warmup
 
 router = APIRouter()
+inference_pool = get_pool("letterconfusion")
 
-# Load model and tools
-base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-model = joblib.load(os.path.join(base_dir, "models", "dyslexia_letter_confusion_model.joblib"))
-le_question_type = joblib.load(os.path.join(base_dir, "models", "le_question_type.joblib"))
-scaler = joblib.load(os.path.join(base_dir, "models", "scaler.joblib"))
+# Model and tools are versioned in models/manifest.json and loaded on first use or during warm-up
 
 class AnswerItem(BaseModel):
     question_type: str  # e.g., "matching_task" or "same_different_task"
@@ -19,45 +19,44 @@ class AnswerItem(BaseModel):
     correct: int  # 1 or 0
     response_time_ms: float  # e.g., 1234.56
 
-# Multi-hot encoding for shown_letters
-def letters_to_multihot(shown_letters_list):
-    all_letters = ['b', 'd', 'p', 'q', 'm', 'n', 'u', 't', 'f', 'c', 'o', 'h', 'k', 'v', 'w', 'x', 'z', 'y', 'a', 'e', 'i', 'l', 'j']
-    return [1 if letter in shown_letters_list else 0 for letter in all_letters]
+def open_features(models):
+    return LetterConfusionFeatures(models["question_type_encoder"], models["scaler"])
 
-def preprocess_input(data: List[AnswerItem]) -> np.ndarray:
-    features = []
-    for item in data:
-        # Validate question_type
-        if item.question_type not in le_question_type.classes_:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid question_type: {item.question_type}. Allowed values are: {list(le_question_type.classes_)}"
-            )
-
-        # Encode question_type
-        q_type_enc = le_question_type.transform([item.question_type])[0]
-
-        # One-hot encode shown_letters
-        shown_letters_enc = letters_to_multihot(item.shown_letters)
-
-        # Scale response_time_ms
-        rt_scaled = scaler.transform([[item.response_time_ms]])[0][0]
+def preprocess_input(models, data: List[AnswerItem]) -> np.ndarray:
+    features = models.derived("features", open_features)
+    try:
+        return features.matrix(
+            [item.question_type for item in data],
+            [item.shown_letters for item in data],
+            [item.correct for item in data],
+            [item.response_time_ms for item in data],
+        )
+    except UnknownCategoryError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid question_type: {e.value}. Allowed values are: {e.allowed}"
+        )
 
-        # Combine features
-        features.append([item.correct, rt_scaled, q_type_enc] + shown_letters_enc)
+def predict_dyslexic_proba(models, answers: List[AnswerItem]) -> np.ndarray:
+    with stage("features"):
+        inputs = preprocess_input(models, answers)
+    # Get probability of class 1 (dyslexic)
+    with stage("forest"):
+        return models["model"].predict_proba(inputs)[:, 1]
 
-    features_array = np.array(features, dtype=np.float32)
-    return features_array
+def verdict(mean_confidence):
+    return "dyslexic" if mean_confidence >= 0.5 else "non-dyslexic"
 
 @router.post("/dyslexia/submit_answer/")
-async def submit_answer(answers: List[AnswerItem]):
+async def submit_answer(answers: List[AnswerItem], request: Request):
+    if not answers:
+        raise HTTPException(status_code=400, detail="No answers provided.")
     try:
-        inputs = preprocess_input(answers)
-        # Get probability of class 1 (dyslexic)
-        proba = model.predict_proba(inputs)[:, 1]
+        models = registry.get("letterconfusion")
+        proba = await inference_pool.run(predict_dyslexic_proba, models, answers, request=request)
         mean_confidence = float(np.mean(proba))
 
-        prediction = "dyslexic" if mean_confidence >= 0.5 else "non-dyslexic"
+        prediction = verdict(mean_confidence)
         next_question_id = len(answers) + 1 if len(answers) < 10 else None
 
         return {
@@ -70,3 +69,11 @@ async def submit_answer(answers: List[AnswerItem]):
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+# === Warm-up: model + feature transforms, one scored answer ===
+def warm_up():
+    models = registry.get("letterconfusion")
+    question_type = str(models["question_type_encoder"].classes_[0])
+    predict_dyslexic_proba(models, [AnswerItem(question_type=question_type, shown_letters=["b", "d"], correct=1, response_time_ms=1000.0)])
+
+warmup.add_step("letterconfusion", warm_up)
@@ -1,28 +1,26 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-import pandas as pd
-import os
-import joblib
+from typing import Optional
 import numpy as np
+from services.batching import get_batcher
+from services.catalog import load_table
+from services.executor import get_pool
+from services.feature_transforms import standardize
+from services.memo import get_memo, input_key
+from services.registry import registry
+from services.sampler import table_sampler
+from services.surrogate import open_surrogate
+from services.warmup import warmup
 
 router = APIRouter()
+inference_pool = get_pool("numberunderstanding")
 
-# Load sklearn model and scaler
-base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-model_path = os.path.join(base_dir, "models", "dyscalculia_numberunderstanding.joblib")
-scaler_path = os.path.join(base_dir, "models", "number_understanding_scaler.pkl")
+# sklearn model and scaler are versioned in models/manifest.json; both they and
+# the question dataset are loaded on first use or during warm-up
+dataset_csv = "number_understanding_dataset_10k.csv"
 
-try:
-    model = joblib.load(model_path)
-    scaler = joblib.load(scaler_path)
-except Exception as e:
-    raise RuntimeError(f"Failed to load model or scaler: {str(e)}")
-
-dataset_path = os.path.join(base_dir, "data", "number_understanding_dataset_10k.csv")
-try:
-    dataset = pd.read_csv(dataset_path)
-except Exception as e:
-    raise RuntimeError(f"Failed to load dataset: {str(e)}")
+# Most questions one request can prefetch
+MAX_QUESTIONS_PER_REQUEST = 50
 
 class PredictionInput(BaseModel):
     left_number: float
@@ -30,42 +28,66 @@ class PredictionInput(BaseModel):
     response_time_sec: float
     user_correct: int
 
+def render_question(dataset, i):
+    return {
+        "question_type": str(dataset.column("question_type")[i]),
+        "left_number": int(dataset.column("left_number")[i]),
+        "right_number": int(dataset.column("right_number")[i]),
+        "correct_answer": str(dataset.column("correct_answer")[i]),
+        "at_risk": int(dataset.column("at_risk")[i])
+    }
+
 @router.get("/getQuestions")
-async def get_questions():
+async def get_questions(
+    session_id: Optional[str] = None,
+    n: Optional[int] = Query(None, ge=1, le=MAX_QUESTIONS_PER_REQUEST),
+):
+    # With session_id, questions don't repeat until the whole dataset has been served;
+    # ?n= returns that many at once ({"questions": [...]}) so a test can be prefetched
     try:
-        row = dataset.sample(n=1).iloc[0]
-        return {
-            "question_type": row["question_type"],
-            "left_number": int(row["left_number"]),
-            "right_number": int(row["right_number"]),
-            "correct_answer": row["correct_answer"],
-            "at_risk": int(row["at_risk"])
-        }
+        dataset = load_table(dataset_csv)
+        if n is not None and n > len(dataset):
+            raise HTTPException(status_code=422, detail=f"n must be at most {len(dataset)}, the number of questions.")
+        rows = table_sampler(dataset).draw(session_id, n or 1)
+        if n is None:
+            return render_question(dataset, rows[0])
+        return {"questions": [render_question(dataset, i) for i in rows]}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching question: {str(e)}")
 
+def open_model(models):
+    # Exact lookup table when one was compiled for this model file (python -m services.surrogate build)
+    return open_surrogate("numberunderstanding", models["model"], models.path("model"))
+
+def predict_proba_batch(models, rows):
+    X_scaled = standardize(models["scaler"], rows)
+    return models.derived("surrogate", open_model).predict_proba(X_scaled)
+
+def speed_indicator(rt):
+    if rt < 3:
+        return "Minimal Indicators", "The child responded quickly. This may indicate good number recognition."
+    if rt <= 6:
+        return "Emerging Indicators", "The response time is within a normal range."
+    return "Strong Indicators", "The child took longer to respond. This might indicate difficulty in understanding numbers."
+
+batcher = get_batcher("numberunderstanding", predict_proba_batch, pool=inference_pool)
+memo = get_memo("numberunderstanding")
+
 @router.post("/predict")
 async def predict(input_data: PredictionInput):
     try:
-        # Prepare and scale input
-        X = np.array([[input_data.left_number, input_data.right_number, input_data.response_time_sec, input_data.user_correct]])
-        X_scaled = scaler.transform(X)
-
-        # Predict
-        proba = model.predict_proba(X_scaled)[0]
+        # Prepare input; scaling and prediction run batched with concurrent requests,
+        # and repeated inputs are answered from the memo
+        row = [input_data.left_number, input_data.right_number, input_data.response_time_sec, input_data.user_correct]
+        models = registry.get("numberunderstanding")
+        proba = await memo.cached(models, input_key(row), lambda: batcher.predict(row, context=models))
         is_at_risk = int(np.argmax(proba))
         confidence = float(proba[1])  # Probability of 'at risk' class
 
         rt = input_data.response_time_sec
-        if rt < 3:
-            speed = "Minimal Indicators"
-            message = "The child responded quickly. This may indicate good number recognition."
-        elif rt <= 6:
-            speed = "Emerging Indicators"
-            message = "The response time is within a normal range."
-        else:
-            speed = "Strong Indicators"
-            message = "The child took longer to respond. This might indicate difficulty in understanding numbers."
+        speed, message = speed_indicator(rt)
 
         return {
             "at_risk": is_at_risk,
@@ -76,5 +98,16 @@ async def predict(input_data: PredictionInput):
             "speed_message": message
         }
 
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+# === Warm-up: dataset, model + surrogate, one scored question ===
+def warm_up():
+    dataset = load_table(dataset_csv)
+    table_sampler(dataset)
+    row = [float(dataset.column(column)[0]) for column in ("left_number", "right_number")] + [3.0, 1]
+    predict_proba_batch(registry.get("numberunderstanding"), [row])
+
+warmup.add_step("numberunderstanding", warm_up)
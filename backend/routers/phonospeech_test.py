@@ -1,31 +1,36 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
-import joblib
-import os
-import pandas as pd
 import numpy as np
-import re
-
-def extract_phoneme_features(text):
-    text = str(text)
-    vowels = len(re.findall(r'[aeiou]', text.lower()))
-    consonants = len(re.findall(r'[bcdfghjklmnpqrstvwxyz]', text.lower()))
-    total_chars = len(text)
-    vowel_ratio = vowels / total_chars if total_chars > 0 else 0
-    consonant_ratio = consonants / total_chars if total_chars > 0 else 0
-    return [vowels, consonants, vowel_ratio, consonant_ratio, total_chars]
-
-# Load model, vectorizer, scaler at startup
-MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
-model = joblib.load(os.path.join(MODEL_DIR, 'phonospeech_model.joblib'))
-vectorizer = joblib.load(os.path.join(MODEL_DIR, 'vectorizer.joblib'))
-scaler = joblib.load(os.path.join(MODEL_DIR, 'scaler.joblib'))
+from services.batching import get_batcher
+from services.catalog import get_listing, load_table
+from services.executor import get_pool
+from services.memo import get_memo, input_key
+from services.phonospeech_features import QUESTIONS_CSV, PhonoSpeechFeaturizer, load_questions
+from services.registry import registry
+from services.timing import stage
+from services.warmup import warmup
 
+# Model, vectorizer and scaler are versioned in models/manifest.json and loaded on first use or during warm-up
 router = APIRouter(
     prefix="/phonospeech",
     tags=["phonospeech"]
 )
 
+def open_featurizer(models):
+    # Question-side TF-IDF counts and phoneme features for every dataset question, once per model version
+    return PhonoSpeechFeaturizer(models["vectorizer"], models["scaler"], load_questions())
+
+def predict_proba_batch(models, pairs):
+    # pairs: list of (question, child_response); features stay sparse all the way into the forest
+    featurizer = models.derived("featurizer", open_featurizer)
+    with stage("featurize"):
+        X = featurizer.transform(pairs)
+    with stage("forest"):
+        return models["model"].predict_proba(X)
+
+batcher = get_batcher("phonospeech", predict_proba_batch, pool=get_pool("phonospeech"))
+memo = get_memo("phonospeech")
+
 class PhonoSpeechRequest(BaseModel):
     question: str
     child_response: str
@@ -34,36 +39,40 @@ class PhonoSpeechResponse(BaseModel):
     risk_level: str
     confidence_score: float
 
+def question_listing():
+    questions = load_table(QUESTIONS_CSV).unique('Question')
+    return {"questions": [{"Question": question} for question in questions]}
+
 @router.get("/questions")
-def get_questions():
-    csv_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'dyslexia_training_dataset.csv')
-    if not os.path.exists(csv_path):
+def get_questions(request: Request):
+    # Serialized once; clients revalidating with If-None-Match get a 304
+    try:
+        listing = get_listing("phonospeech/questions", question_listing)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Questions file not found.")
-    df = pd.read_csv(csv_path)
-    if 'Question' not in df.columns:
+    except KeyError:
         raise HTTPException(status_code=500, detail="'Question' column not found in dataset.")
-    questions = df[['Question']].drop_duplicates().to_dict(orient='records')
-    return {"questions": questions}
+    return listing.response(request)
 
 @router.post("/predict", response_model=PhonoSpeechResponse)
-def predict_phonospeech(data: PhonoSpeechRequest):
+async def predict_phonospeech(data: PhonoSpeechRequest):
     question = str(data.question)
     child_response = str(data.child_response)
-    # Text features
-    text_features = question + ' ' + child_response
-    X_text = vectorizer.transform([text_features])
-    # Phoneme features for both question and child response
-    question_phonemes = extract_phoneme_features(question)
-    child_phonemes = extract_phoneme_features(child_response)
-    X_numeric = scaler.transform([question_phonemes + child_phonemes])
-    # Combine features
-    X_combined = np.hstack([X_text.toarray(), X_numeric])
-    # Predict
-    pred = model.predict(X_combined)[0]
-    proba = model.predict_proba(X_combined)[0]
+    # Predict (memoized, batched with concurrent requests); predict() is argmax of the same probabilities
+    models = registry.get("phonospeech")
+    pair = (question, child_response)
+    proba = await memo.cached(models, input_key(pair), lambda: batcher.predict(pair, context=models))
+    pred = int(np.argmax(proba))
     risk_map = {0: 'Minimal', 1: 'Emerging', 2: 'Strong_Indicators'}
     confidence = float(proba[pred])
     return PhonoSpeechResponse(
         risk_level=risk_map[pred],
         confidence_score=confidence
-    )
\ No newline at end of file
+    )
+
+# === Warm-up: model + featurizer (question features for the whole dataset), one prediction ===
+def warm_up():
+    question = question_listing()["questions"][0]["Question"]
+    predict_proba_batch(registry.get("phonospeech"), [(question, "")])
+
+warmup.add_step("phonospeech", warm_up)
@@ -1,35 +1,45 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
-import pandas as pd
-import joblib
 import numpy as np
 import string
 import traceback
-import librosa
 import os
 from difflib import SequenceMatcher
-from typing import List, Dict
+from typing import List, Dict, Optional
+from services.audio_assets import load_audio_assets
+from services.audio_features import extract_spelling_features
+from services.catalog import load_table
+from services.executor import get_pool
+from services.registry import registry
+from services.sampler import table_sampler
+from services.spelling_feature_store import BASE_DIR, SpellingFeatureStore, score_spelling_features
+from services.timing import stage
+from services.warmup import warmup
 
 router = APIRouter()
 
-# === Load datasets ===
-frontend_csv_path = './data/spellingfrontend_test.csv'
-ground_truth_csv_path = './data/spelling_audio_dataset.csv'
-
-try:
-    frontend_df = pd.read_csv(frontend_csv_path)
-    ground_truth_df = pd.read_csv(ground_truth_csv_path)
-except FileNotFoundError as e:
-    raise FileNotFoundError(f"CSV file not found: {e.filename}")
-
-# === Load trained model and scaler ===
-model_path = './models/dyslexia_spelling_audio_model.joblib'
-try:
-    model_bundle = joblib.load(model_path)
-    model = model_bundle['model']
-    scaler = model_bundle['scaler']
-except FileNotFoundError:
-    raise FileNotFoundError(f"Model file not found at {model_path}")
+# === Datasets (read on first use or during warm-up) ===
+frontend_csv = 'spellingfrontend_test.csv'
+ground_truth_csv = 'spelling_audio_dataset.csv'
+
+def frontend():
+    return load_table(frontend_csv)
+
+def ground_truth():
+    # Indexed by audio_file for validate-answer lookups
+    return load_table(ground_truth_csv, index=["audio_file"])
+
+# Clips are served from memory under content-hashed URLs (load_audio_assets(), see main.py /audio);
+# the trained model and scaler are versioned in models/manifest.json
+
+# === Precomputed MFCC features / probabilities keyed by audio path (one per model version) ===
+def open_feature_store(models):
+    model_bundle = models["model"]
+    return SpellingFeatureStore.open(
+        scorer=lambda X: score_spelling_features(model_bundle['model'], model_bundle['scaler'], X),
+        model_path=models.path("model"),
+        pool=get_pool("spelling"),
+    )
 
 # === Risk classification for spelling ===
 def classify_spelling_risk(prob):
@@ -41,16 +51,40 @@ def classify_spelling_risk(prob):
         return "Minimal indicators"
 
 # === Endpoint: Get random audio ===
+# Most clips one request can prefetch
+MAX_AUDIO_PER_REQUEST = 50
+
+def render_audio(table, i, variant=None):
+    audio_file = str(table.column('audio_file')[i])
+    return {
+        "audio_file": audio_file,
+        "audio_url": load_audio_assets().url(audio_file, variant),
+        "correct_word": str(table.column('correct_word')[i]),
+    }
+
 @router.get("/get-audio")
-async def get_audio():
+async def get_audio(
+    session_id: Optional[str] = None,
+    n: Optional[int] = Query(None, ge=1, le=MAX_AUDIO_PER_REQUEST),
+    variant: Optional[str] = None,
+):
     try:
-        # Get a random word that hasn't been used in the last 5 attempts
-        random_row = frontend_df.sample(1).iloc[0]
-        audio_file = random_row['audio_file']
-        correct_spelling = random_row['correct_word']
-        response = {"audio_file": audio_file, "correct_word": correct_spelling}
+        # With session_id, a word is not repeated until every word has been played
+        # (and never within the last 5 attempts); ?n= returns {"audio": [...]}.
+        # audio_url is cacheable forever; ?variant=compact picks the 16 kHz mono
+        # encoding where one has been built
+        table = frontend()
+        if n is not None and n > len(table):
+            raise HTTPException(status_code=422, detail=f"n must be at most {len(table)}, the number of clips.")
+        rows = table_sampler(table).draw(session_id, n or 1)
+        if n is None:
+            response = render_audio(table, rows[0], variant)
+        else:
+            response = {"audio": [render_audio(table, i, variant) for i in rows]}
         print(f"Response: {response}")
         return response
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"Error in /get-audio: {e}")
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -77,42 +111,22 @@ async def validate_answer(request: Request):
         )
 
         # Check ground truth
-        correct_row = ground_truth_df[
-            ground_truth_df['audio_file'] == normalized_audio_file
-        ]
-        if correct_row.empty:
+        with stage("lookup"):
+            correct_row = ground_truth().lookup('audio_file', normalized_audio_file)
+        if correct_row is None:
             return JSONResponse(
                 status_code=404,
                 content={"error": "Audio file not found in dataset."},
             )
 
-        correct_word = correct_row.iloc[0]['correct_spelling']
+        correct_word = correct_row['correct_spelling']
         is_correct = user_answer.strip().lower() == correct_word.strip().lower()
 
-        # === Audio feature extraction (MFCC) ===
+        # === Spelling probability (precomputed MFCC store, computed on miss) ===
         try:
-            base_dir = os.path.abspath(os.path.dirname(__file__))
-            audio_path = os.path.join(base_dir, '..', normalized_audio_file)
-
-            y_audio, sr = librosa.load(audio_path, sr=16000)
-            mfcc = librosa.feature.mfcc(y=y_audio, sr=sr, n_mfcc=20)
-            mfcc_delta = librosa.feature.delta(mfcc)
-            mfcc_delta2 = librosa.feature.delta(mfcc, order=2)
-            features = np.concatenate([mfcc, mfcc_delta, mfcc_delta2], axis=0)
-            max_len = 100
-            if features.shape[1] < max_len:
-                pad_width = max_len - features.shape[1]
-                features = np.pad(features, ((0, 0), (0, pad_width)), mode='constant')
-            else:
-                features = features[:, :max_len]
-            input_vector = features.flatten().reshape(1, -1)
-            input_vector = scaler.transform(input_vector)
-            if hasattr(model, "predict_proba"):
-                # Probability of being incorrect (class 1)
-                spelling_prob = model.predict_proba(input_vector)[0][1]
-            else:
-                prediction = model.predict(input_vector)[0]
-                spelling_prob = 1.0 if prediction == 1 else 0.0
+            feature_store = registry.get("spelling").derived("feature_store", open_feature_store)
+            with stage("store"):
+                spelling_prob = await feature_store.get_prob(normalized_audio_file)
         except Exception as model_error:
             traceback.print_exc()
             return JSONResponse(
@@ -136,3 +150,17 @@ async def validate_answer(request: Request):
     except Exception as e:
         traceback.print_exc()
         return JSONResponse(status_code=500, content={"error": f"Unexpected error: {str(e)}"})
+
+# === Warm-up: datasets, clips, model + feature store, one MFCC extraction ===
+def warm_up():
+    table = frontend()
+    table_sampler(table)
+    ground_truth()
+    load_audio_assets()
+    models = registry.get("spelling")
+    models.derived("feature_store", open_feature_store)
+    # One clip end to end builds the cached window, mel filterbank and DCT matrices
+    features = extract_spelling_features(os.path.join(BASE_DIR, str(table.column('audio_file')[0])))
+    score_spelling_features(models["model"]['model'], models["model"]['scaler'], features.reshape(1, -1))
+
+warmup.add_step("spelling", warm_up)
@@ -0,0 +1,305 @@
+"""Production serving: load everything once, then fork uvicorn workers.
+
+From ``backend/``:
+
+    python serve.py [--workers N] [--port 8000] [--max-requests 5000]
+                    [--max-worker-memory-mb 0] [--threads-per-worker N]
+
+The parent process imports the app and runs every warm-up step in the
+foreground (models, datasets, audio, numba kernels), collects garbage and
+``gc.freeze()``s what is left, so the large model object graphs sit in the
+permanent generation: the workers' collectors never traverse them, and the
+pages they live on stay shared copy-on-write instead of being dirtied by
+reference-count and GC-header writes. It then opens the listening socket and
+forks ``--workers`` uvicorn servers on it (default: one per usable CPU, or
+``WEB_CONCURRENCY``).
+
+Each worker caps BLAS/OpenMP/numba/joblib threads at ``--threads-per-worker``
+(default: CPUs / workers, at least 1) so N workers do not each start a
+thread per core. Workers restart gracefully (in-flight requests finish, the
+socket stays open) after ``--max-requests`` requests, spread by a random
+jitter so they do not all restart at once, and when their private memory goes
+past ``--max-worker-memory-mb``. Dead workers are replaced.
+
+Signals to the parent: SIGTERM/SIGINT stop every worker gracefully; SIGHUP
+reloads models/manifest.json in the parent and then replaces workers one at
+a time, so new workers start from the new models.
+
+Model reloads in production always go through the parent. A worker that
+answers ``POST /models/reload`` does not reload itself (that would leave the
+other workers on the old version, and the worker itself would fall back to
+the parent's snapshot on its next restart); it sends SIGHUP to the parent
+and answers 202. The parent then reloads every task whose manifest entry
+changed, whatever ``?task=`` asked for.
+
+Each worker keeps its own memo, sampler sessions and metrics; ``/metrics``,
+``/memo/stats`` etc. describe whichever worker answered. POSIX only;
+``python main.py`` still runs a single process for development.
+"""
+import argparse
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+from services.serving import PARENT_PID_ENV
+
+# === Thread caps (must be set before numpy/scipy/numba are imported) ===
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS",
+                   "NUMEXPR_NUM_THREADS", "NUMBA_NUM_THREADS", "LOKY_MAX_CPU_COUNT")
+
+MEMORY_CHECK_INTERVAL_S = 5.0
+# A worker that dies sooner than this after starting is restarted with a growing delay
+MIN_WORKER_LIFETIME_S = 5.0
+MAX_RESTART_DELAY_S = 30.0
+SUPERVISE_INTERVAL_S = 0.5
+
+
+def usable_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def cap_threads(n):
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(n)
+
+
+def private_memory_mb():
+    """Memory only this process holds (not pages still shared with the parent), from /proc."""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            kib = sum(int(line.split()[1]) for line in f if line.startswith(("Private_Clean:", "Private_Dirty:")))
+        return kib / 1024
+    except OSError:
+        return None
+
+
+# === Parent: preload once ===
+def preload():
+    import gc
+
+    import main
+
+    report = main.warmup.run()
+    if not report["ready"]:
+        failed = [name for name, step in report["steps"].items() if step["status"] != "ready"]
+        print(f"Warm-up failed for {failed}; workers will retry those on first use.")
+    gc.collect()
+    # Everything alive now (models, tables, numba code) is left alone by every worker's GC
+    gc.freeze()
+    return main.app
+
+
+def open_socket(host, port, backlog):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+# === Worker ===
+def run_worker(app, sock, args):
+    import asyncio
+
+    import uvicorn
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(args.threads_per_worker)
+    max_requests = None
+    if args.max_requests:
+        max_requests = args.max_requests + random.randint(0, args.max_requests_jitter)
+    config = uvicorn.Config(app, lifespan="on", limit_max_requests=max_requests,
+                            timeout_graceful_shutdown=args.graceful_timeout, access_log=args.access_log)
+    server = uvicorn.Server(config)
+
+    async def watch_memory():
+        while not server.should_exit:
+            await asyncio.sleep(MEMORY_CHECK_INTERVAL_S)
+            used = private_memory_mb()
+            if used is not None and used > args.max_worker_memory_mb:
+                print(f"Worker {os.getpid()}: {used:.0f} MB private memory > {args.max_worker_memory_mb} MB, restarting")
+                server.should_exit = True
+
+    async def serve():
+        watcher = asyncio.ensure_future(watch_memory()) if args.max_worker_memory_mb else None
+        try:
+            await server.serve(sockets=[sock])
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+    asyncio.run(serve())
+    if max_requests and server.server_state.total_requests >= max_requests:
+        print(f"Worker {os.getpid()}: served {max_requests} requests, restarting")
+
+
+def spawn(app, sock, args):
+    pid = os.fork()
+    if pid == 0:
+        # Child: default signal handling (uvicorn installs its own), then serve until told to stop
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        code = 0
+        try:
+            run_worker(app, sock, args)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+    return pid
+
+
+# === Parent: supervise ===
+class Supervisor:
+    def __init__(self, app, sock, args):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        # pid -> started_at
+        self.workers = {}
+        self.stopping = False
+        self.reload_requested = False
+        self.restart_delay = 0.0
+
+    def start_worker(self):
+        pid = spawn(self.app, self.sock, self.args)
+        self.workers[pid] = time.monotonic()
+        print(f"Started worker {pid}")
+        return pid
+
+    def on_stop(self, signum, frame):
+        self.stopping = True
+
+    def on_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def reap(self):
+        """Collect exited workers; returns how many exited too soon after starting."""
+        early = 0
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            started = self.workers.pop(pid, None)
+            if started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            print(f"Worker {pid} exited ({code})")
+            # uvicorn re-raises SIGTERM after a graceful shutdown, so -SIGTERM is a clean exit too
+            if code not in (0, -signal.SIGTERM) and time.monotonic() - started < MIN_WORKER_LIFETIME_S:
+                early += 1
+        return early
+
+    def stop_worker(self, pid):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while pid in self.workers and time.monotonic() < deadline:
+            time.sleep(0.1)
+            self.reap()
+        if pid in self.workers:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.workers.pop(pid, None)
+
+    def rolling_restart(self):
+        import gc
+
+        import main
+
+        print(f"Reloading models: {main.registry.reload()}")
+        main.warmup.run()
+        gc.collect()
+        gc.freeze()
+        for pid in list(self.workers):
+            # Bring up the replacement first so capacity never drops by more than one worker
+            self.start_worker()
+            self.stop_worker(pid)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.on_stop)
+        signal.signal(signal.SIGINT, self.on_stop)
+        signal.signal(signal.SIGHUP, self.on_reload)
+        os.environ[PARENT_PID_ENV] = str(os.getpid())
+        for _ in range(self.args.workers):
+            self.start_worker()
+
+        while not self.stopping:
+            time.sleep(SUPERVISE_INTERVAL_S)
+            if self.reap():
+                self.restart_delay = min(max(self.restart_delay * 2, 1.0), MAX_RESTART_DELAY_S)
+                print(f"Worker crashed on startup; waiting {self.restart_delay:.0f}s before restarting")
+                time.sleep(self.restart_delay)
+            elif len(self.workers) == self.args.workers:
+                self.restart_delay = 0.0
+            if self.reload_requested:
+                self.reload_requested = False
+                self.rolling_restart()
+            while not self.stopping and len(self.workers) < self.args.workers:
+                self.start_worker()
+
+        print("Stopping workers")
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            time.sleep(0.1)
+            self.reap()
+        for pid in list(self.workers):
+            os.kill(pid, signal.SIGKILL)
+        self.sock.close()
+
+
+def parse_args(argv=None):
+    cpus = usable_cpus()
+    parser = argparse.ArgumentParser(description="Serve the API with preloaded models and forked uvicorn workers.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", cpus)))
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="BLAS/OpenMP/numba/joblib threads per worker (default: CPUs / workers)")
+    parser.add_argument("--max-requests", type=int, default=int(os.environ.get("MAX_REQUESTS", 0)),
+                        help="restart a worker after this many requests (0: never)")
+    parser.add_argument("--max-requests-jitter", type=int, default=None, help="default: 10%% of --max-requests")
+    parser.add_argument("--max-worker-memory-mb", type=int, default=int(os.environ.get("MAX_WORKER_MEMORY_MB", 0)),
+                        help="restart a worker whose private memory exceeds this (0: never)")
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="seconds in-flight requests get on restart/stop")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--access-log", action="store_true")
+    args = parser.parse_args(argv)
+    args.workers = max(1, args.workers)
+    if args.threads_per_worker is None:
+        args.threads_per_worker = max(1, cpus // args.workers)
+    if args.max_requests_jitter is None:
+        args.max_requests_jitter = args.max_requests // 10
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs os.fork (Linux/macOS); use python main.py elsewhere.")
+    cap_threads(args.threads_per_worker)
+    started = time.perf_counter()
+    app = preload()
+    print(f"Preloaded in {time.perf_counter() - started:.1f}s; {args.workers} worker(s) x {args.threads_per_worker} thread(s) on {args.host}:{args.port}")
+    Supervisor(app, open_socket(args.host, args.port, args.backlog), args).run()
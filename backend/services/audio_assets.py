@@ -0,0 +1,210 @@
+"""In-memory audio assets with content-hashed, immutable URLs.
+
+Every file under ``backend/audio`` is read (up to a memory budget) and hashed
+once at startup. Each is reachable two ways under ``/audio``:
+
+    /audio/correct/apple.wav                 original path, ETag + revalidate
+    /audio/correct/apple.3f2a9c1b7e4d.wav    content-hashed, cached for a year
+
+so routers hand out ``url(audio_file)`` and browsers never ask for a clip
+twice. Responses carry a strong ETag and honour single byte Ranges, which
+<audio> elements use for seeking.
+
+Compact variants (16 kHz mono PCM) are made offline, not per request:
+
+    python -m services.audio_assets build
+
+writes ``audio/variants/compact/<same path>``; ``url(audio_file, "compact")``
+then points at the variant and falls back to the original where there is none.
+"""
+import argparse
+import hashlib
+import mimetypes
+import os
+import threading
+
+from fastapi import Response
+
+from services.catalog import etag_matches
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUDIO_DIR = os.path.join(BASE_DIR, "audio")
+VARIANTS_DIR = "variants"
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".opus", ".webm", ".m4a", ".flac")
+
+COMPACT_VARIANT = "compact"
+COMPACT_SAMPLE_RATE = 16000
+
+# Files past this many bytes in total are read from disk per request
+MAX_PRELOAD_BYTES = 64 * 1024 * 1024
+HASH_LENGTH = 12
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+class AudioAsset:
+    __slots__ = ("path", "name", "size", "digest", "etag", "hashed_name", "content_type", "data")
+
+    def __init__(self, path, name, preload):
+        self.path = path
+        # Relative to the audio directory with forward slashes, e.g. "correct/apple.wav"
+        self.name = name
+        with open(path, "rb") as f:
+            data = f.read()
+        self.size = len(data)
+        self.data = data if preload else None
+        self.digest = hashlib.sha256(data).hexdigest()
+        self.etag = '"' + self.digest[:32] + '"'
+        stem, ext = os.path.splitext(name)
+        self.hashed_name = f"{stem}.{self.digest[:HASH_LENGTH]}{ext}"
+        self.content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    def read(self, start, end):
+        """Bytes [start, end)."""
+        if self.data is not None:
+            return self.data[start:end]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+
+def parse_range(header, size):
+    """(start, end) for a single ``bytes=`` range; None to send the whole file; ValueError if unsatisfiable."""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        # Unknown unit or multipart range: serving the full body is allowed
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first.isdigit() or last.isdigit()):
+        return None
+    if not first.isdigit():
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size
+    start = int(first)
+    end = min(int(last) + 1, size) if last.isdigit() else size
+    if start >= size or end <= start:
+        raise ValueError(header)
+    return start, end
+
+
+class AudioAssets:
+    def __init__(self, audio_dir=AUDIO_DIR, max_preload_bytes=MAX_PRELOAD_BYTES):
+        self.audio_dir = audio_dir
+        self.assets = {}
+        # URL path under /audio -> (asset, Cache-Control)
+        self.routes = {}
+        preloaded = 0
+        for root, dirs, files in os.walk(audio_dir):
+            dirs.sort()
+            for filename in sorted(files):
+                if not filename.lower().endswith(AUDIO_EXTENSIONS):
+                    continue
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, audio_dir).replace(os.sep, "/")
+                preload = preloaded + os.path.getsize(path) <= max_preload_bytes
+                asset = AudioAsset(path, name, preload)
+                preloaded += asset.size if preload else 0
+                self.assets[name] = asset
+                self.routes[name] = (asset, REVALIDATE)
+                self.routes[asset.hashed_name] = (asset, IMMUTABLE)
+        self.preloaded_bytes = preloaded
+
+    def _asset(self, audio_file, variant=None):
+        # audio_file as stored in the CSVs: "audio/correct/apple.wav" (or relative to audio/)
+        name = audio_file.replace("\\", "/").removeprefix("/").removeprefix("audio/")
+        if variant:
+            asset = self.assets.get(f"{VARIANTS_DIR}/{variant}/{name}")
+            if asset is not None:
+                return asset
+        return self.assets.get(name)
+
+    def url(self, audio_file, variant=None):
+        """Immutable URL of ``audio_file`` (or its ``variant``); the plain path if it is not an asset."""
+        asset = self._asset(audio_file, variant)
+        if asset is None:
+            return "/" + audio_file.removeprefix("/")
+        return f"/audio/{asset.hashed_name}"
+
+    def response(self, request, path):
+        route = self.routes.get(path)
+        if route is None:
+            return Response(status_code=404)
+        asset, cache_control = route
+        headers = {"ETag": asset.etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+        if etag_matches(request.headers.get("if-none-match"), asset.etag):
+            return Response(status_code=304, headers=headers)
+
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        byte_range = None
+        if range_header and (not if_range or if_range.strip() == asset.etag):
+            try:
+                byte_range = parse_range(range_header, asset.size)
+            except ValueError:
+                headers["Content-Range"] = f"bytes */{asset.size}"
+                return Response(status_code=416, headers=headers)
+        if byte_range is None:
+            return Response(content=asset.read(0, asset.size), media_type=asset.content_type, headers=headers)
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{asset.size}"
+        return Response(content=asset.read(start, end), status_code=206, media_type=asset.content_type, headers=headers)
+
+    def stats(self):
+        return {
+            "assets": len(self.assets),
+            "preloaded_bytes": self.preloaded_bytes,
+            "variants": sorted({name.split("/")[1] for name in self.assets if name.startswith(VARIANTS_DIR + "/")}),
+        }
+
+
+_assets = None
+_assets_lock = threading.Lock()
+
+
+def load_audio_assets():
+    """The process-wide AudioAssets for ``backend/audio``, scanned on first use."""
+    global _assets
+    if _assets is None:
+        with _assets_lock:
+            if _assets is None:
+                _assets = AudioAssets()
+    return _assets
+
+
+# === Offline build step for compact variants ===
+def build_compact_variants(audio_dir=AUDIO_DIR, sample_rate=COMPACT_SAMPLE_RATE, force=False):
+    import librosa
+    import soundfile as sf
+
+    target_dir = os.path.join(audio_dir, VARIANTS_DIR, COMPACT_VARIANT)
+    written = 0
+    for root, dirs, files in os.walk(audio_dir):
+        if os.path.relpath(root, audio_dir).split(os.sep)[0] == VARIANTS_DIR:
+            dirs[:] = []
+            continue
+        for filename in sorted(files):
+            if not filename.lower().endswith(AUDIO_EXTENSIONS):
+                continue
+            source = os.path.join(root, filename)
+            target = os.path.join(target_dir, os.path.splitext(os.path.relpath(source, audio_dir))[0] + ".wav")
+            if not force and os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                continue
+            y, _ = librosa.load(source, sr=sample_rate, mono=True)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            sf.write(target, y, sample_rate, subtype="PCM_16")
+            written += 1
+            print(f"{os.path.relpath(source, audio_dir)}: {os.path.getsize(source)} -> {os.path.getsize(target)} bytes")
+    print(f"Wrote {written} compact variant(s) to {target_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build pre-encoded audio variants served by services.audio_assets.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--sample-rate", type=int, default=COMPACT_SAMPLE_RATE)
+    parser.add_argument("--force", action="store_true", help="rebuild variants that are already up to date")
+    args = parser.parse_args()
+    build_compact_variants(sample_rate=args.sample_rate, force=args.force)
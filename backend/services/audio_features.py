@@ -0,0 +1,39 @@
+import numpy as np
+
+from services import mfcc
+from services.timing import stage
+
+# === Spelling audio feature configuration (shared with training-spelling.py) ===
+SAMPLE_RATE = 16000
+N_MFCC = 20
+MAX_FRAMES = 100
+# Which implementation computed the features; stored next to precomputed ones
+EXTRACTOR = "numpy-mfcc"
+FEATURE_CONFIG = {"sample_rate": SAMPLE_RATE, "n_mfcc": N_MFCC, "max_frames": MAX_FRAMES, "extractor": EXTRACTOR}
+
+
+def spelling_features(y_audio, sr):
+    """Flattened MFCC + delta + delta2 vector, padded or cut to MAX_FRAMES frames."""
+    with stage("mfcc"):
+        coefficients = mfcc.mfcc(y_audio, sr, N_MFCC)
+        mfcc_delta = mfcc.delta(coefficients)
+        mfcc_delta2 = mfcc.delta(coefficients, order=2)
+        features = np.concatenate([coefficients, mfcc_delta, mfcc_delta2], axis=0)
+    if features.shape[1] < MAX_FRAMES:
+        pad_width = MAX_FRAMES - features.shape[1]
+        features = np.pad(features, ((0, 0), (0, pad_width)), mode='constant')
+    else:
+        features = features[:, :MAX_FRAMES]
+    return features.flatten()
+
+
+def extract_spelling_features(audio_path):
+    """Return the flattened MFCC + delta + delta2 vector used by the spelling model."""
+    with stage("load"):
+        y_audio, sr = mfcc.load(audio_path, sr=SAMPLE_RATE)
+    return spelling_features(y_audio, sr)
+
+
+def spelling_features_from_files(paths):
+    """Audio paths -> (N, 6000) feature matrix (training; see services/feature_cache.py)."""
+    return np.array([extract_spelling_features(path) for path in paths])
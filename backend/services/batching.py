@@ -0,0 +1,129 @@
+"""Micro-batching for models that are called with one row per request.
+
+Concurrent requests for the same model are queued and scored together with a
+single vectorized call once ``max_batch_size`` inputs are waiting or the oldest
+one has waited ``max_wait_ms``:
+
+    batcher = get_batcher("letter_tracing", predict_batch, pool=inference_pool)
+    probabilities = await batcher.predict([duration, accuracy], context=models)
+
+``predict_fn(context, items)`` receives the queued inputs that share the same
+``context`` (e.g. one model version) and must return one result row per input.
+Limits can be overridden with ``BATCH_MAX_SIZE_<NAME>`` and
+``BATCH_MAX_WAIT_MS_<NAME>``.
+"""
+import asyncio
+import os
+import time
+
+from services.metrics import Histogram, BATCH_SIZE_BUCKETS, LATENCY_MS_BUCKETS
+from services.timing import background_context, stage
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 2.0
+
+
+class MicroBatcher:
+    def __init__(self, name, predict_fn, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS, pool=None):
+        self.name = name
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.pool = pool
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(LATENCY_MS_BUCKETS)
+        self._queue = None
+        self._worker = None
+        self._loop = None
+
+    def _ensure_worker(self):
+        # The queue and worker task belong to the running loop, so create them lazily
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            # Not in the context of whichever request got here first: a batch serves many
+            self._worker = loop.create_task(self._run(), context=background_context(f"batch:{self.name}"))
+
+    async def predict(self, item, context=None):
+        self._ensure_worker()
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, context, fut, time.perf_counter()))
+        with stage("batch"):
+            return await fut
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = batch[0][3] + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Callers that went away while queued are dropped before scoring
+            batch = [entry for entry in batch if not entry[2].cancelled()]
+            started = time.perf_counter()
+            for _, _, _, enqueued in batch:
+                self.queue_wait_ms.observe((started - enqueued) * 1000.0)
+
+            groups = {}
+            for entry in batch:
+                groups.setdefault(id(entry[1]), []).append(entry)
+            for group in groups.values():
+                await self._score(group)
+
+    async def _score(self, group):
+        self.batch_size.observe(len(group))
+        context = group[0][1]
+        items = [entry[0] for entry in group]
+        try:
+            with stage("predict"):
+                if self.pool is not None:
+                    results = await self.pool.submit(self.predict_fn, context, items)
+                else:
+                    results = self.predict_fn(context, items)
+        except Exception as e:
+            for _, _, fut, _ in group:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, _, fut, _), result in zip(group, results):
+            if not fut.done():
+                fut.set_result(result)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+
+_batchers = {}
+
+
+def get_batcher(name, predict_fn, pool=None):
+    batcher = _batchers.get(name)
+    if batcher is None:
+        max_batch_size = int(os.environ.get(f"BATCH_MAX_SIZE_{name.upper()}", DEFAULT_MAX_BATCH_SIZE))
+        max_wait_ms = float(os.environ.get(f"BATCH_MAX_WAIT_MS_{name.upper()}", DEFAULT_MAX_WAIT_MS))
+        batcher = _batchers[name] = MicroBatcher(name, predict_fn, max_batch_size, max_wait_ms, pool)
+    return batcher
+
+
+def batcher_stats():
+    return {name: batcher.stats() for name, batcher in _batchers.items()}
@@ -0,0 +1,125 @@
+"""Read-only catalog of the CSV datasets the routers look things up in.
+
+Each CSV is read once into per-column numpy arrays, with dict indexes on the
+columns routers look rows up by:
+
+    ground_truth = load_table("spelling_audio_dataset.csv", index=["audio_file"])
+    row = ground_truth.lookup("audio_file", "audio/correct/apple.wav")
+
+Static listings (e.g. the phonospeech question list) are serialized to JSON
+once and served with a strong ETag; a client that sends it back in
+If-None-Match gets an empty 304.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+from fastapi import Response
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value covers ``etag`` (weak comparison, as RFC 9110 asks)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def _native(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class Table:
+    """Columnar, immutable view of one CSV."""
+
+    def __init__(self, name, df, index=()):
+        self.name = name
+        self.columns = {column: df[column].to_numpy() for column in df.columns}
+        self.n_rows = len(df)
+        self._indexes = {}
+        for column in index:
+            self.index(column)
+
+    def __len__(self):
+        return self.n_rows
+
+    def column(self, name):
+        return self.columns[name]
+
+    def index(self, column):
+        """value -> first row with that value (what ``df[df[column] == value].iloc[0]`` returned)."""
+        index = self._indexes.get(column)
+        if index is None:
+            index = {}
+            for row, value in enumerate(self.columns[column].tolist()):
+                index.setdefault(value, row)
+            self._indexes[column] = index
+        return index
+
+    def row(self, i):
+        return {column: _native(values[i]) for column, values in self.columns.items()}
+
+    def lookup(self, column, value):
+        i = self.index(column).get(value)
+        return None if i is None else self.row(i)
+
+    def unique(self, column):
+        """Distinct values in order of first appearance (like ``drop_duplicates``)."""
+        return list(self.index(column))
+
+
+class Listing:
+    """A JSON body serialized once, served with an ETag."""
+
+    def __init__(self, content):
+        # Same encoding FastAPI's JSONResponse uses
+        self.body = json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+
+    def matches(self, if_none_match):
+        return etag_matches(if_none_match, self.etag)
+
+    def response(self, request):
+        if self.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
+
+
+_tables = {}
+_listings = {}
+_table_lock = threading.Lock()
+# Separate lock: building a listing usually loads a table
+_listing_lock = threading.Lock()
+
+
+def load_table(filename, index=(), data_dir=DATA_DIR):
+    """The Table for ``data/<filename>``, read on first use; raises FileNotFoundError if missing."""
+    key = os.path.join(data_dir, filename)
+    table = _tables.get(key)
+    if table is None:
+        with _table_lock:
+            table = _tables.get(key)
+            if table is None:
+                import pandas as pd
+
+                table = _tables[key] = Table(filename, pd.read_csv(key))
+    for column in index:
+        table.index(column)
+    return table
+
+
+def get_listing(key, build):
+    """The Listing for ``key``, building its content with ``build()`` on first use."""
+    listing = _listings.get(key)
+    if listing is None:
+        with _listing_lock:
+            listing = _listings.get(key)
+            if listing is None:
+                listing = _listings[key] = Listing(build())
+    return listing
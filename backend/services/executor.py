@@ -0,0 +1,180 @@
+"""Per-route bounded pools for the CPU-bound parts of the routers.
+
+Routes are ``async def``, so sklearn/skimage/librosa calls made directly in the
+handler block the event loop. Handlers submit that work here instead:
+
+    pool = get_pool("handwritten")
+    result = await pool.run(preprocess_and_predict, data, request=request)
+
+Thread pools suit numpy/sklearn work that releases the GIL; process pools are
+for pure-Python-heavy work (the function and its arguments must be picklable).
+Each pool admits at most ``workers + queue`` jobs and rejects the rest with 503,
+and queued jobs are cancelled when the client disconnects.
+
+Routers and batchers hold their pool for the life of the process. App shutdown
+closes each pool's executor but keeps the pool, and the next job opens a fresh
+executor, so a second lifespan in the same process (tests, embedded servers)
+works with the references taken at import.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from services.timing import record
+
+# === Pool configuration (override with INFERENCE_POOL_<NAME>="kind,workers,queue") ===
+DEFAULT_POOL = {"kind": "thread", "workers": 2, "queue": 32}
+
+POOL_CONFIG = {
+    "arithmetic": {"kind": "thread", "workers": 2, "queue": 32},
+    "handwritten": {"kind": "thread", "workers": 2, "queue": 16},
+    "numberunderstanding": {"kind": "thread", "workers": 2, "queue": 64},
+    "letter_tracing": {"kind": "thread", "workers": 2, "queue": 64},
+    "letterconfusion": {"kind": "thread", "workers": 2, "queue": 32},
+    "phonospeech": {"kind": "thread", "workers": 2, "queue": 64},
+    "spelling": {"kind": "thread", "workers": 2, "queue": 16},
+}
+
+DISCONNECT_POLL_INTERVAL = 0.05
+
+
+def _pool_config(name):
+    config = dict(POOL_CONFIG.get(name, DEFAULT_POOL))
+    override = os.environ.get(f"INFERENCE_POOL_{name.upper()}")
+    if override:
+        kind, workers, queue = [part.strip() for part in override.split(",")]
+        config.update(kind=kind, workers=int(workers), queue=int(queue))
+    if config["kind"] not in ("thread", "process"):
+        raise ValueError(f"Unknown pool kind for {name}: {config['kind']}")
+    return config
+
+
+class InferencePool:
+    def __init__(self, name, kind="thread", workers=2, queue=32):
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = workers + queue
+        self.pending = 0
+        self.running = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+        self.executor = None
+        self._open()
+
+    def _open(self):
+        """The live executor, created on first use and again after ``shutdown``."""
+        with self._lock:
+            if self.executor is None:
+                if self.kind == "process":
+                    self.executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"inference-{self.name}")
+            return self.executor
+
+    def _started(self, fn, submitted):
+        # Runs in the worker thread; only used for thread pools
+        def wrapper(*args):
+            record("queue", (time.perf_counter() - submitted) * 1000.0)
+            with self._lock:
+                self.running += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+        return wrapper
+
+    def submit(self, fn, *args):
+        """Schedule ``fn(*args)`` and return an asyncio future, or raise 503 if the pool is full."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail=f"Server busy ({self.name}), please retry.",
+                headers={"Retry-After": "1"},
+            )
+        loop = asyncio.get_running_loop()
+        executor = self._open()
+        if self.kind == "thread":
+            # Run in a copy of the caller's context, so stages timed in the job count for its request
+            context = contextvars.copy_context()
+            fut = loop.run_in_executor(executor, context.run, self._started(fn, time.perf_counter()), *args)
+        else:
+            fut = loop.run_in_executor(executor, fn, *args)
+        self.pending += 1
+        fut.add_done_callback(self._done)
+        return fut
+
+    def _done(self, fut):
+        self.pending -= 1
+        if fut.cancelled():
+            self.cancelled += 1
+
+    async def run(self, fn, *args, request=None):
+        """Run ``fn(*args)`` in the pool; cancel it if ``request``'s client goes away first."""
+        fut = self.submit(fn, *args)
+        if request is None:
+            return await fut
+
+        watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+        try:
+            done, _ = await asyncio.wait({fut, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        finally:
+            watcher.cancel()
+        if fut not in done:
+            # Queued jobs never start; a job that is already running finishes in the background
+            fut.cancel()
+            raise HTTPException(status_code=499, detail="Client disconnected.")
+        return fut.result()
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "running": self.running,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _wait_for_disconnect(request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+
+_pools = {}
+
+
+def get_pool(name):
+    pool = _pools.get(name)
+    if pool is None:
+        pool = _pools[name] = InferencePool(name, **_pool_config(name))
+    return pool
+
+
+def pool_stats():
+    return {name: pool.stats() for name, pool in _pools.items()}
+
+
+def shutdown_pools():
+    # Pools stay registered (routers hold them); each reopens its executor on next use
+    for pool in _pools.values():
+        pool.shutdown()
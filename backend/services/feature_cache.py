@@ -0,0 +1,221 @@
+"""Content-addressed, parallel feature extraction for the training scripts.
+
+Every retrain used to decode and featurize every file again. Here each file's
+feature row is stored under the SHA-256 of its bytes, in a directory named
+after the extractor and a hash of its feature configuration:
+
+    cache = FeatureCache("hog", hog_features_from_files, HOG_CONFIG)
+    X, ok = cache.features(paths)
+
+so a retrain only featurizes files that are new or changed, and a change to
+the feature code's configuration starts a fresh directory instead of mixing
+rows. Files with identical bytes (``00006.png`` / ``00006 - Copy.png``) are
+featurized once. Misses are split into chunks and extracted in a process
+pool (``workers``, default one per CPU; 1 runs inline).
+
+``duplicate_report`` lists groups of identical files and, given the
+train/test split, the ones that sit on both sides of it - a leak that makes
+test accuracy look better than it is.
+
+Hashes are remembered per path with the file's size and mtime (as in
+``spelling_feature_store``), so unchanged files are not re-read either. The
+cache lives in ``models/feature_cache/`` and can be deleted at any time.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from services.hashing import file_sha256, file_signature
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, "models", "feature_cache")
+HASH_INDEX = "hashes.json"
+# Files per task sent to a worker; large enough that batched HOG pays off
+CHUNK_SIZE = 32
+
+
+def config_hash(config):
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=list).encode()).hexdigest()[:16]
+
+
+def _extract_chunk(extract, paths):
+    """(rows, errors) for one chunk; a failing batch is retried file by file to find the bad ones."""
+    try:
+        return list(np.asarray(extract(paths))), {}
+    except Exception:
+        pass
+    rows, errors = [], {}
+    for path in paths:
+        try:
+            rows.append(np.asarray(extract([path]))[0])
+        except Exception as e:
+            rows.append(None)
+            errors[path] = f"{type(e).__name__}: {e}"
+    return rows, errors
+
+
+class FeatureCache:
+    def __init__(self, name, extract, config, cache_dir=CACHE_DIR, workers=None):
+        """``extract`` maps a list of paths to an (N, d) array; it must be a module-level function."""
+        self.name = name
+        self.extract = extract
+        self.config = {"function": f"{extract.__module__}.{extract.__qualname__}", **config}
+        self.cache_dir = cache_dir
+        self.dir = os.path.join(cache_dir, f"{name}-{config_hash(self.config)}")
+        self.workers = workers or os.cpu_count() or 1
+        self._hashes = self._load_hash_index()
+        self.stats = {}
+
+    # === Content hashes ===
+    def _load_hash_index(self):
+        try:
+            with open(os.path.join(self.cache_dir, HASH_INDEX)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_hash_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = os.path.join(self.cache_dir, f"{HASH_INDEX}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self._hashes, f)
+        os.replace(tmp, os.path.join(self.cache_dir, HASH_INDEX))
+
+    def content_hash(self, path):
+        key = os.path.abspath(path)
+        signature = file_signature(path)
+        entry = self._hashes.get(key)
+        if entry is not None and entry["size"] == signature["size"] and entry["mtime_ns"] == signature["mtime_ns"]:
+            return entry["sha256"]
+        digest = file_sha256(path)
+        self._hashes[key] = dict(sha256=digest, **signature)
+        return digest
+
+    # === Rows ===
+    def _row_path(self, digest):
+        return os.path.join(self.dir, digest[:2], f"{digest}.npy")
+
+    def _load_row(self, digest):
+        try:
+            return np.load(self._row_path(digest))
+        except (OSError, ValueError):
+            return None
+
+    def _store_row(self, digest, row):
+        path = self._row_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp, row)
+        os.replace(tmp, path)
+
+    def _write_config(self):
+        os.makedirs(self.dir, exist_ok=True)
+        with open(os.path.join(self.dir, "config.json"), "w") as f:
+            json.dump(self.config, f, indent=2, sort_keys=True, default=list)
+
+    def features(self, paths):
+        """(X, ok): one feature row per path in order, and a mask of the files that could be featurized.
+
+        Rows of files that failed are left out of ``X``; their errors are
+        printed and kept in ``self.stats["errors"]``."""
+        started = time.perf_counter()
+        digests = []
+        unreadable = {}
+        for path in paths:
+            try:
+                digests.append(self.content_hash(path))
+            except OSError as e:
+                digests.append(None)
+                unreadable[path] = f"{type(e).__name__}: {e}"
+
+        # One representative path per distinct content
+        unique = {}
+        for path, digest in zip(paths, digests):
+            if digest is not None:
+                unique.setdefault(digest, path)
+        rows = {}
+        for digest in unique:
+            row = self._load_row(digest)
+            if row is not None:
+                rows[digest] = row
+        missing = [digest for digest in unique if digest not in rows]
+
+        errors = dict(unreadable)
+        chunks = [missing[i:i + CHUNK_SIZE] for i in range(0, len(missing), CHUNK_SIZE)]
+        workers = max(1, min(self.workers, len(chunks)))
+        if missing:
+            self._write_config()
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(_extract_chunk, [self.extract] * len(chunks),
+                                            [[unique[d] for d in chunk] for chunk in chunks]))
+            else:
+                results = [_extract_chunk(self.extract, [unique[d] for d in chunk]) for chunk in chunks]
+            for chunk, (chunk_rows, chunk_errors) in zip(chunks, results):
+                errors.update(chunk_errors)
+                for digest, row in zip(chunk, chunk_rows):
+                    if row is not None:
+                        self._store_row(digest, row)
+                        rows[digest] = row
+        self._save_hash_index()
+
+        ok = np.array([digest in rows for digest in digests], dtype=bool)
+        for path, error in errors.items():
+            print(f"Error processing {path}: {error}")
+        self.stats = {
+            "files": len(paths),
+            "unique": len(unique),
+            "cached": len(unique) - len(missing),
+            "extracted": len(missing) - (len(errors) - len(unreadable)),
+            "failed": int((~ok).sum()),
+            "seconds": round(time.perf_counter() - started, 3),
+            "errors": errors,
+        }
+        print(f"{self.name} features: {len(paths)} files, {len(unique)} distinct, {self.stats['cached']} cached, "
+              f"{self.stats['extracted']} extracted with {workers} worker(s)"
+              + (f", {self.stats['failed']} failed" if self.stats["failed"] else "") + f" in {self.stats['seconds']:.1f}s")
+        X = np.stack([rows[digest] for digest, good in zip(digests, ok) if good]) if ok.any() else np.empty((0, 0))
+        return X, ok
+
+    # === Duplicates ===
+    def duplicate_report(self, paths, labels=None, train_index=None, test_index=None):
+        """Groups of byte-identical files, and those split across train and test.
+
+        ``paths``/``labels`` are the rows the model saw (after dropping
+        failures), ``train_index``/``test_index`` positions into them."""
+        groups = {}
+        for i, path in enumerate(paths):
+            groups.setdefault(self.content_hash(path), []).append(i)
+        duplicates = [members for members in groups.values() if len(members) > 1]
+        side = {}
+        if train_index is not None and test_index is not None:
+            side.update({int(i): "train" for i in train_index})
+            side.update({int(i): "test" for i in test_index})
+        leaks = [members for members in duplicates if {side.get(i) for i in members} >= {"train", "test"}]
+        conflicts = []
+        if labels is not None:
+            conflicts = [members for members in duplicates if len({labels[i] for i in members}) > 1]
+
+        def names(members):
+            return [os.path.relpath(paths[i], BASE_DIR) for i in members]
+
+        report = {
+            "files": len(paths),
+            "duplicate_groups": len(duplicates),
+            "duplicate_files": sum(len(members) - 1 for members in duplicates),
+            "leaking_groups": [names(members) for members in leaks],
+            "test_rows_with_train_copy": sum(1 for members in leaks for i in members if side.get(i) == "test"),
+            "label_conflicts": [names(members) for members in conflicts],
+        }
+        print(f"Duplicates: {report['duplicate_files']} redundant file(s) in {report['duplicate_groups']} group(s); "
+              f"{len(leaks)} group(s) span train and test ({report['test_rows_with_train_copy']} test row(s) "
+              f"have an identical copy in train)")
+        for group in report["leaking_groups"]:
+            print(f"  leak: {' = '.join(group)}")
+        for group in report["label_conflicts"]:
+            print(f"  conflicting labels: {' = '.join(group)}")
+        return report
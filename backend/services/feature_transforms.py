@@ -0,0 +1,124 @@
+"""Feature assembly for the letterconfusion and arithmetic models.
+
+Shared by the routers and the training scripts so column order and encodings
+cannot drift apart. A whole answer/attempt list becomes the model matrix in a
+few array operations: fitted LabelEncoders become dict lookups and
+StandardScalers are applied as ``(X - mean_) / scale_`` directly. Both give
+exactly what ``encoder.transform`` / ``scaler.transform`` return, without
+paying sklearn's input validation once per item.
+"""
+import numpy as np
+
+LETTERS = ['b', 'd', 'p', 'q', 'm', 'n', 'u', 't', 'f', 'c', 'o', 'h', 'k', 'v', 'w', 'x', 'z', 'y', 'a', 'e', 'i', 'l', 'j']
+LETTER_INDEX = {letter: i for i, letter in enumerate(LETTERS)}
+
+LETTERCONFUSION_COLUMNS = ['correct', 'response_time_ms', 'question_type_enc'] + LETTERS
+ARITHMETIC_COLUMNS = ['op1', 'op2', 'operation', 'user_choice', 'response_time']
+
+
+class UnknownCategoryError(ValueError):
+    def __init__(self, name, value, allowed):
+        super().__init__(f"Invalid {name}: {value}. Allowed: {allowed}")
+        self.name = name
+        self.value = value
+        self.allowed = allowed
+
+
+class LabelTable:
+    """Dict lookup equivalent to a fitted LabelEncoder's ``transform``."""
+
+    def __init__(self, encoder, name="value"):
+        self.name = name
+        self.classes = list(encoder.classes_)
+        self.codes = {label: code for code, label in enumerate(self.classes)}
+
+    def encode(self, values):
+        try:
+            return np.fromiter((self.codes[value] for value in values), dtype=np.int64, count=len(values))
+        except KeyError as e:
+            raise UnknownCategoryError(self.name, e.args[0], self.classes) from None
+
+
+def standardize(scaler, X):
+    """``scaler.transform(X)`` for a fitted StandardScaler, same float64 operations."""
+    X = np.array(X, dtype=np.float64)
+    if scaler.with_mean:
+        X -= scaler.mean_
+    if scaler.with_std:
+        X /= scaler.scale_
+    return X
+
+
+def letters_multihot(letter_lists):
+    """(n, len(LETTERS)) 0/1 matrix: column j is set when LETTERS[j] is in row i's list."""
+    rows, cols = [], []
+    for i, letters in enumerate(letter_lists):
+        for letter in letters:
+            j = LETTER_INDEX.get(letter)
+            if j is not None:
+                rows.append(i)
+                cols.append(j)
+    multihot = np.zeros((len(letter_lists), len(LETTERS)), dtype=np.int64)
+    multihot[rows, cols] = 1
+    return multihot
+
+
+class LetterConfusionFeatures:
+    def __init__(self, question_type_encoder, scaler):
+        self.question_types = LabelTable(question_type_encoder, "question_type")
+        self.scaler = scaler
+
+    def matrix(self, question_types, shown_letters, correct, response_time_ms):
+        """Model input, float32, columns as LETTERCONFUSION_COLUMNS."""
+        X = np.empty((len(question_types), len(LETTERCONFUSION_COLUMNS)), dtype=np.float32)
+        X[:, 0] = correct
+        X[:, 1] = standardize(self.scaler, np.asarray(response_time_ms, dtype=np.float64)[:, None])[:, 0]
+        X[:, 2] = self.question_types.encode(question_types)
+        X[:, 3:] = letters_multihot(shown_letters)
+        return X
+
+
+class ArithmeticFeatures:
+    def __init__(self, op_encoder, scaler):
+        self.operations = LabelTable(op_encoder, "operation")
+        self.scaler = scaler
+
+    def matrix(self, op1, op2, operations, user_choice, response_time):
+        """Scaled model input, columns as ARITHMETIC_COLUMNS."""
+        X = np.column_stack([
+            np.asarray(op1, dtype=np.float64),
+            np.asarray(op2, dtype=np.float64),
+            self.operations.encode(operations),
+            np.asarray(user_choice, dtype=np.float64),
+            np.asarray(response_time, dtype=np.float64),
+        ])
+        return standardize(self.scaler, X)
+
+
+def arithmetic_attempt_flags(user_choice, response_time, predicted_at_risk):
+    """Per-attempt 0/1 arrays behind the arithmetic summary; a correct answer (user_choice 0) is never at risk."""
+    user_choice = np.asarray(user_choice)
+    response_time = np.asarray(response_time, dtype=np.float64)
+    correct = user_choice == 0
+    slow = response_time > 3
+    fast = response_time < 1.5
+    return {
+        "correct": correct,
+        "slow": slow,
+        "fast": fast,
+        "moderate": ~slow & ~fast,
+        "at_risk": np.asarray(predicted_at_risk, dtype=bool) & ~correct,
+    }
+
+
+def arithmetic_session_stats(user_choice, response_time, predicted_at_risk):
+    """Counters behind the arithmetic summary."""
+    flags = arithmetic_attempt_flags(user_choice, response_time, predicted_at_risk)
+    return {
+        "total_correct": int(flags["correct"].sum()),
+        "total_time": float(np.asarray(response_time, dtype=np.float64).sum()),
+        "slow_count": int(flags["slow"].sum()),
+        "fast_count": int(flags["fast"].sum()),
+        "moderate_count": int(flags["moderate"].sum()),
+        "risk_count": int(flags["at_risk"].sum()),
+    }
@@ -0,0 +1,211 @@
+"""Array-backed inference for fitted sklearn random forests.
+
+``CompiledForest.from_sklearn`` flattens every tree of a fitted forest into one
+set of contiguous node arrays (feature, threshold, left, right, leaf value) and
+``predict_proba`` walks all trees for a whole batch of rows at once. The
+results are bit-identical to sklearn's ``predict_proba``: inputs are cast to
+float32 like sklearn does, and per-tree probabilities are summed in estimator
+order before dividing by the number of trees.
+
+Sparse input is never densified to full width: only the features that some
+split actually reads are gathered into a compact block before traversal.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+# Rows scored per traversal chunk, bounds the (rows x trees) working set
+CHUNK_ROWS = 4096
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, missing_left, value, roots, classes, max_depth, n_features_in):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features_in)
+        self._derive()
+
+    def _derive(self):
+        # Lookup arrays computed from the node arrays. They are pickled along with
+        # the rest (so the model store maps them too); artifacts written before
+        # one was added get it here.
+        state = self.__dict__
+        if "is_leaf" not in state:
+            self.is_leaf = self.left == np.arange(len(self.left))
+        if "children" not in state:
+            # children[2 * node] is the left child and children[2 * node + 1] the right one
+            self.children = np.column_stack([self.left, self.right]).ravel()
+        if "used_features" not in state:
+            # Sparse rows are gathered into a block holding only the features some split reads
+            self.used_features = np.unique(self.feature[~self.is_leaf])
+            slot = np.full(self.n_features_in_, -1, dtype=np.int64)
+            slot[self.used_features] = np.arange(len(self.used_features))
+            self.feature_slot = slot
+            self.compact_feature = np.where(self.is_leaf, 0, slot[self.feature])
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._derive()
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        from sklearn.ensemble._forest import ForestClassifier
+
+        if not isinstance(forest, ForestClassifier):
+            raise TypeError(f"Expected a fitted forest classifier, got {type(forest).__name__}")
+        if forest.n_outputs_ != 1:
+            raise ValueError("Only single-output forests are supported")
+
+        n_classes = int(forest.n_classes_)
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            nodes = tree.__getstate__()["nodes"]
+            if "missing_go_to_left" in nodes.dtype.names:
+                missing.append(nodes["missing_go_to_left"].astype(bool))
+            else:
+                missing.append(np.zeros(tree.node_count, dtype=bool))
+            values.append(tree.value[:, 0, :n_classes])
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.int64),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.int64),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.int64),
+            missing_left=np.ascontiguousarray(np.concatenate(missing)),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.int64),
+            classes=np.asarray(forest.classes_),
+            max_depth=max(estimator.tree_.max_depth for estimator in forest.estimators_),
+            n_features_in=forest.n_features_in_,
+        )
+
+    def to_float32(self):
+        """A copy with float32 thresholds and leaf values and int32 node indices (about half the memory).
+
+        Inputs are compared as float32 anyway, so each threshold is rounded
+        down to the largest float32 not above it: every input takes the same
+        branch as before. Only the summed leaf probabilities lose precision."""
+        threshold = self.threshold.astype(np.float32)
+        above = threshold.astype(np.float64) > self.threshold
+        threshold[above] = np.nextafter(threshold[above], np.float32(-np.inf))
+        return CompiledForest(
+            feature=self.feature.astype(np.int32), threshold=threshold,
+            left=self.left.astype(np.int32), right=self.right.astype(np.int32),
+            missing_left=self.missing_left, value=self.value.astype(np.float32),
+            roots=self.roots, classes=self.classes_, max_depth=self.max_depth, n_features_in=self.n_features_in_,
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def _check_input(self, X):
+        if sp.issparse(X):
+            X = sp.csr_matrix(X, dtype=np.float32)
+            X.sum_duplicates()
+            if X.shape[1] != self.n_features_in_:
+                raise ValueError(
+                    f"X has {X.shape[1]} features, but CompiledForest is expecting {self.n_features_in_} features as input."
+                )
+            return X
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2:
+            X = X.reshape(-1, self.n_features_in_)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but CompiledForest is expecting {self.n_features_in_} features as input."
+            )
+        return np.ascontiguousarray(X)
+
+    def _gather(self, X):
+        """(values, feature index per node) to traverse with; sparse X becomes a compact dense block."""
+        if not sp.issparse(X):
+            return X, self.feature
+        slots = self.feature_slot[X.indices]
+        keep = slots >= 0
+        rows = np.repeat(np.arange(X.shape[0], dtype=np.int64), np.diff(X.indptr))
+        block = np.zeros((X.shape[0], max(len(self.used_features), 1)), dtype=np.float32)
+        block[rows[keep], slots[keep]] = X.data[keep]
+        return block, self.compact_feature
+
+    def _apply(self, X):
+        # node[i * n_trees + t] is the current node of row i in tree t; only
+        # positions that have not reached a leaf yet are advanced each step
+        X, feature = self._gather(X)
+        n_rows, n_trees = X.shape[0], self.n_estimators
+        node = np.tile(self.roots, n_rows)
+        row_base = np.repeat(np.arange(n_rows, dtype=np.int64) * X.shape[1], n_trees)
+        flat = X.ravel()
+        active = np.flatnonzero(~self.is_leaf[node])
+        check_missing = self.missing_left.any()
+        while active.size:
+            current = node[active]
+            x = flat[row_base[active] + feature[current]]
+            go_right = ~(x <= self.threshold[current])
+            if check_missing:
+                go_right &= ~(np.isnan(x) & self.missing_left[current])
+            current = self.children[2 * current + go_right]
+            node[active] = current
+            active = active[~self.is_leaf[current]]
+        return node.reshape(n_rows, n_trees)
+
+    def apply(self, X):
+        """Global leaf index reached by every row in every tree, shape (n_rows, n_trees)."""
+        return self._apply(self._check_input(X))
+
+    def predict_proba(self, X):
+        X = self._check_input(X)
+        proba = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            leaves = self._apply(X[start:start + CHUNK_ROWS])
+            # cumsum accumulates sequentially over trees, matching sklearn's summation order
+            summed = np.cumsum(self.value[leaves], axis=1)[:, -1]
+            proba[start:start + CHUNK_ROWS] = summed / self.n_estimators
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def compile_model(model, float32=False):
+    """Replace any sklearn forest in ``model`` with a CompiledForest.
+
+    Accepts a bare forest, a Pipeline whose final step is a forest, or a dict
+    bundle such as ``{'model': forest, 'scaler': scaler}``; anything else is
+    returned unchanged. ``float32=True`` compiles to the compact form
+    (``CompiledForest.to_float32``).
+    """
+    # sklearn is only needed once a model is loaded, not to import the app
+    from sklearn.ensemble._forest import ForestClassifier
+    from sklearn.pipeline import Pipeline
+
+    def compiled(forest):
+        forest = CompiledForest.from_sklearn(forest)
+        return forest.to_float32() if float32 else forest
+
+    if isinstance(model, ForestClassifier):
+        return compiled(model)
+    if isinstance(model, Pipeline):
+        name, final = model.steps[-1]
+        if isinstance(final, ForestClassifier):
+            return Pipeline(model.steps[:-1] + [(name, compiled(final))])
+        return model
+    if isinstance(model, dict):
+        return {key: compile_model(value, float32) for key, value in model.items()}
+    return model
@@ -0,0 +1,16 @@
+"""SHA-256 and size/mtime signatures of files on disk: manifest checksums, store and feature-cache keys."""
+import hashlib
+import os
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
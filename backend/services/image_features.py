@@ -0,0 +1,250 @@
+"""Handwriting image features shared by training and serving.
+
+A vectorized NumPy implementation of the exact skimage pipeline the
+handwriting model was trained on::
+
+    rgb2gray -> transform.resize(image, (128, 128))   # anti-aliased, reflect mode
+             -> feature.hog(orientations=8, pixels_per_cell=(16, 16),
+                            cells_per_block=(1, 1))   # L2-Hys
+
+Resizing is linear and separable (Gaussian anti-aliasing followed by bilinear
+interpolation, both with mirror boundaries), so for each input size it is
+folded into two small banded matrices, cached, and applied as
+``Wr @ image @ Wc.T`` over the band only.
+HOG runs on a whole (N, 128, 128) batch at once.
+
+Everything stays float64 on purpose: the model was trained on skimage's
+float64 output, and L2-Hys normalisation (eps=1e-5) blows up ~1e-8 residues in
+near-empty cells that float32 cannot represent next to 1.0 (white paper).
+``benchmarks/hog_parity.py`` checks every stage against skimage.
+
+Uploads take a cheaper route to the same 128x128 input (``decode_upload``):
+the header is checked first (format, pixel count), then the image is decoded
+at reduced size - JPEGs DCT-scaled on load (``Image.draft``), other formats
+box-reduced by an integer factor in PIL (``Image.reduce``) - to no less than
+``DECODE_OVERSAMPLE`` times 128 on each side, and only that is converted to
+grayscale. A 12 MP phone photo then costs a 1/8-scale JPEG decode and ~0.2 M
+float64 values instead of 36 M. The small image stays float64 for the reason
+above: float32 gray changed the predicted class about twice as often.
+The anti-aliased resize and HOG are unchanged.
+``benchmarks/image_decode.py`` reports the cost per megapixel and how often
+the model's answer differs from the exact pipeline.
+"""
+import io
+import os
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+IMAGE_SIZE = (128, 128)
+ORIENTATIONS = 8
+PIXELS_PER_CELL = (16, 16)
+N_FEATURES = (IMAGE_SIZE[0] // PIXELS_PER_CELL[0]) * (IMAGE_SIZE[1] // PIXELS_PER_CELL[1]) * ORIENTATIONS
+
+# skimage.color.rgb2gray weights, applied to [0, 1] intensities
+RGB_WEIGHTS = np.array([0.2125, 0.7154, 0.0721])
+GAUSSIAN_TRUNCATE = 4.0
+L2HYS_CLIP = 0.2
+L2HYS_EPS = 1e-5
+# What a HOG row depends on besides the code, for FeatureCache directories
+HOG_CONFIG = {"image_size": IMAGE_SIZE, "orientations": ORIENTATIONS, "pixels_per_cell": PIXELS_PER_CELL}
+
+# === Upload limits and reduced decoding ===
+UPLOAD_FORMATS = ("PNG", "JPEG", "WEBP", "BMP", "GIF", "TIFF")
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", 40_000_000))
+# Decoded images keep at least this many times IMAGE_SIZE on each side, so the
+# final anti-aliased resize still does the last step of the downsampling
+DECODE_OVERSAMPLE = 2
+
+
+def _mirror(indices, n):
+    # scipy.ndimage 'mirror' boundary: reflect about the edge samples (d c b | a b c d | c b a)
+    if n == 1:
+        return np.zeros_like(indices)
+    period = 2 * (n - 1)
+    indices = np.mod(indices, period)
+    return np.where(indices >= n, period - indices, indices)
+
+
+@lru_cache(maxsize=64)
+def resize_matrix(n_in, n_out):
+    """(n_out, n_in) matrix equivalent to skimage's anti-aliased linear resize along one axis."""
+    factor = n_in / n_out
+    sigma = max(0.0, (factor - 1) / 2)
+
+    smooth = np.eye(n_in)
+    if sigma > 1e-15:
+        radius = int(GAUSSIAN_TRUNCATE * sigma + 0.5)
+        offsets = np.arange(-radius, radius + 1)
+        kernel = np.exp(-0.5 / sigma ** 2 * offsets ** 2)
+        kernel /= kernel.sum()
+        smooth = np.zeros((n_in, n_in))
+        rows = np.repeat(np.arange(n_in), len(offsets))
+        cols = _mirror(np.arange(n_in)[:, None] + offsets[None, :], n_in).ravel()
+        np.add.at(smooth, (rows, cols), np.tile(kernel, n_in))
+
+    # grid_mode=True: output pixel centres map onto input pixel centres
+    coords = (np.arange(n_out) + 0.5) * factor - 0.5
+    lower = np.floor(coords).astype(np.int64)
+    weight = coords - lower
+    interp = np.zeros((n_out, n_in))
+    np.add.at(interp, (np.arange(n_out), _mirror(lower, n_in)), 1 - weight)
+    np.add.at(interp, (np.arange(n_out), _mirror(lower + 1, n_in)), weight)
+
+    return interp @ smooth
+
+
+@lru_cache(maxsize=64)
+def resize_taps(n_in, n_out):
+    """``resize_matrix`` as (index, weight) arrays of shape (n_out, taps); the matrix is banded."""
+    matrix = resize_matrix(n_in, n_out)
+    taps = max(1, int((matrix != 0).sum(axis=1).max()))
+    index = np.zeros((n_out, taps), dtype=np.int64)
+    weight = np.zeros((n_out, taps))
+    for row in range(n_out):
+        nonzero = np.flatnonzero(matrix[row])
+        index[row, :len(nonzero)] = nonzero
+        weight[row, :len(nonzero)] = matrix[row, nonzero]
+    return index, weight
+
+
+def to_gray(image):
+    """uint8/float image (H, W), (H, W, 3) or (H, W, 4) -> float64 grayscale in [0, 1]."""
+    image = np.asarray(image)
+    if image.dtype == np.uint8:
+        image = image / 255.0
+    image = image.astype(np.float64, copy=False)
+    if image.ndim == 3:
+        image = image[..., :3] @ RGB_WEIGHTS
+    return image
+
+
+def resize(gray, size=IMAGE_SIZE):
+    """Anti-aliased resize of one grayscale image (or an (N, H, W) stack of equal-size images)."""
+    # Equivalent to resize_matrix(H) @ gray @ resize_matrix(W).T, touching only the band
+    row_index, row_weight = resize_taps(gray.shape[-2], size[0])
+    col_index, col_weight = resize_taps(gray.shape[-1], size[1])
+    out = np.einsum("...tkw,tk->...tw", gray[..., row_index, :], row_weight)
+    out = np.einsum("...htk,tk->...ht", out[..., col_index], col_weight)
+    # skimage clips to the input range; only float rounding can step outside it
+    return np.clip(out, gray.min(), gray.max())
+
+
+def hog(images):
+    """HOG descriptors for an (N, 128, 128) batch -> (N, 512)."""
+    images = np.asarray(images, dtype=np.float64)
+    n, height, width = images.shape
+    cell_rows, cell_cols = PIXELS_PER_CELL
+    n_cells_row, n_cells_col = height // cell_rows, width // cell_cols
+
+    g_row = np.zeros_like(images)
+    g_col = np.zeros_like(images)
+    g_row[:, 1:-1, :] = images[:, 2:, :] - images[:, :-2, :]
+    g_col[:, :, 1:-1] = images[:, :, 2:] - images[:, :, :-2]
+    magnitude = np.hypot(g_col, g_row)
+    orientation = np.rad2deg(np.arctan2(g_row, g_col)) % 180
+
+    # Bin i covers [i, i + 1) * 180 / orientations; anything rounding up to 180 falls in no bin
+    bins = np.floor(orientation * (ORIENTATIONS / 180.0)).astype(np.int64)
+    magnitude = np.where(bins < ORIENTATIONS, magnitude, 0)
+    bins = np.minimum(bins, ORIENTATIONS - 1)
+
+    magnitude = magnitude[:, :n_cells_row * cell_rows, :n_cells_col * cell_cols]
+    bins = bins[:, :n_cells_row * cell_rows, :n_cells_col * cell_cols]
+    cell = (np.arange(n_cells_row * cell_rows) // cell_rows)[:, None] * n_cells_col + \
+        (np.arange(n_cells_col * cell_cols) // cell_cols)[None, :]
+    index = (np.arange(n)[:, None, None] * (n_cells_row * n_cells_col) + cell) * ORIENTATIONS + bins
+    hist = np.bincount(index.ravel(), weights=magnitude.ravel(), minlength=n * n_cells_row * n_cells_col * ORIENTATIONS)
+    hist = hist.reshape(n, n_cells_row * n_cells_col, ORIENTATIONS) / (cell_rows * cell_cols)
+
+    # L2-Hys over 1x1-cell blocks
+    hist = hist / np.sqrt(np.sum(hist ** 2, axis=-1, keepdims=True) + L2HYS_EPS ** 2)
+    hist = np.minimum(hist, L2HYS_CLIP)
+    hist = hist / np.sqrt(np.sum(hist ** 2, axis=-1, keepdims=True) + L2HYS_EPS ** 2)
+    return hist.reshape(n, -1)
+
+
+def decode_image(image_bytes):
+    """Decode an upload the way serving always has: PIL -> RGB -> uint8 array."""
+    return np.asarray(Image.open(io.BytesIO(image_bytes)).convert("RGB"))
+
+
+def load_image(path):
+    with open(path, "rb") as f:
+        return decode_image(f.read())
+
+
+class ImageRejected(ValueError):
+    """An upload that is not a supported image, or too large to decode."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def check_image(image):
+    """Reject an opened (not yet decoded) PIL image by format and pixel count."""
+    if image.format not in UPLOAD_FORMATS:
+        raise ImageRejected(f"Unsupported image format {image.format}; use one of {', '.join(UPLOAD_FORMATS)}.")
+    width, height = image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ImageRejected(f"Image is {width}x{height} pixels; the limit is {MAX_IMAGE_PIXELS // 1_000_000} megapixels.", 413)
+
+
+def probe_image(head, complete=True):
+    """(format, (width, height)) from the first bytes of an upload, read from its header only.
+
+    Raises ImageRejected for non-images and oversized images. If ``head`` is
+    only a prefix of the file (``complete=False``) and the header does not fit
+    in it, returns None: decode the whole upload to find out."""
+    try:
+        image = Image.open(io.BytesIO(head))
+    except Exception:
+        if not complete:
+            return None
+        raise ImageRejected("Not an image, or a corrupt one.")
+    with image:
+        check_image(image)
+        return image.format, image.size
+
+
+def decode_upload(image_bytes, size=IMAGE_SIZE):
+    """Upload bytes -> float64 grayscale, decoded at reduced size for a resize to ``size``."""
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+    except Exception:
+        raise ImageRejected("Not an image, or a corrupt one.")
+    with image:
+        check_image(image)
+        target = (size[1] * DECODE_OVERSAMPLE, size[0] * DECODE_OVERSAMPLE)
+        try:
+            if image.format == "JPEG":
+                # libjpeg scales by 1/2, 1/4 or 1/8 while decoding, keeping at least ``target``
+                image.draft("RGB", target)
+            image.load()
+        except Exception:
+            raise ImageRejected("Corrupt or truncated image.")
+        factor = min(image.width // target[0], image.height // target[1])
+        if factor > 1:
+            image = image.reduce(factor)
+        if image.mode not in ("L", "RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        pixels = np.asarray(image)
+    return to_gray(pixels)
+
+
+def extract_hog_features(images):
+    """List of decoded images (any size, gray/RGB/RGBA) -> (N, 512) HOG matrix."""
+    if len(images) == 0:
+        return np.empty((0, N_FEATURES))
+    resized = np.empty((len(images),) + IMAGE_SIZE)
+    for i, image in enumerate(images):
+        resized[i] = resize(to_gray(image))
+    return hog(resized)
+
+
+def hog_features_from_files(paths):
+    """Image paths -> (N, 512) HOG matrix (training; see services/feature_cache.py)."""
+    return extract_hog_features([load_image(path) for path in paths])
+
@@ -0,0 +1,158 @@
+"""Memoized model outputs for endpoints that are pure functions of small inputs.
+
+A route opts in with one memo per route; the key is a canonical hash of the
+validated input (a content hash for uploads), and the cache is scoped to the
+model version, so a reload never serves a stale prediction:
+
+    memo = get_memo("letter_tracing")
+    proba = await memo.cached(models, input_key(req.duration, req.accuracy),
+                              lambda: batcher.predict(features, context=models))
+
+Entries are bounded by count (least recently used goes first) and by age.
+When the registry swaps a task's models, its entries are dropped, and results
+still in flight for the old snapshot are not stored.
+Limits can be overridden with ``MEMO_MAX_ENTRIES_<NAME>`` and
+``MEMO_TTL_S_<NAME>``; ``MEMO_MAX_ENTRIES_<NAME>=0`` turns a memo off.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from services.registry import registry
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL_S = 3600.0
+
+MISS = object()
+
+
+def _canonical(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "sha256:" + hashlib.sha256(value).hexdigest()
+    if isinstance(value, np.ndarray):
+        return {"dtype": value.dtype.str, "shape": value.shape, "sha256": hashlib.sha256(np.ascontiguousarray(value)).hexdigest()}
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    raise TypeError(f"Cannot build a memo key from {type(value).__name__}")
+
+
+def input_key(*parts):
+    """Canonical hash of the inputs a prediction depends on (JSON values, bytes, arrays, pydantic models)."""
+    text = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=_canonical)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _frozen(value):
+    # Callers share cached arrays; make sure none of them can change one in place
+    if isinstance(value, np.ndarray):
+        value = value.copy()
+        value.setflags(write=False)
+    return value
+
+
+class PredictionMemo:
+    def __init__(self, name, max_entries=DEFAULT_MAX_ENTRIES, ttl_s=DEFAULT_TTL_S):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        # (task, version, key) -> (expires_at, value), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+        self.invalidated = 0
+
+    def get(self, models, key):
+        """The cached value for ``key`` under this model version, or ``MISS``."""
+        if self.max_entries <= 0:
+            self.misses += 1
+            return MISS
+        full_key = (models.task, models.version, key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[full_key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end(full_key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, models, key, value):
+        if self.max_entries <= 0 or registry.get(models.task) is not models:
+            return value
+        value = _frozen(value)
+        with self._lock:
+            self._entries[(models.task, models.version, key)] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end((models.task, models.version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+        return value
+
+    async def cached(self, models, key, compute):
+        """``await compute()`` on a miss, stored for later calls with the same key."""
+        value = self.get(models, key)
+        if value is MISS:
+            value = self.put(models, key, await compute())
+        return value
+
+    def invalidate(self, task, version=None):
+        """Drop entries for ``task`` (only ``version``'s, if given)."""
+        with self._lock:
+            stale = [k for k in self._entries if k[0] == task and (version is None or k[1] == version)]
+            for k in stale:
+                del self._entries[k]
+            self.invalidated += len(stale)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+        }
+
+
+_memos = {}
+
+
+def get_memo(name):
+    memo = _memos.get(name)
+    if memo is None:
+        max_entries = int(os.environ.get(f"MEMO_MAX_ENTRIES_{name.upper()}", DEFAULT_MAX_ENTRIES))
+        ttl_s = float(os.environ.get(f"MEMO_TTL_S_{name.upper()}", DEFAULT_TTL_S))
+        memo = _memos[name] = PredictionMemo(name, max_entries, ttl_s)
+    return memo
+
+
+def memo_stats():
+    return {name: memo.stats() for name, memo in _memos.items()}
+
+
+def _drop_swapped_task(task, old, new):
+    # Also covers a reload that changed artifacts but kept the version string
+    for memo in list(_memos.values()):
+        memo.invalidate(task)
+
+
+registry.on_swap(_drop_swapped_task)
@@ -0,0 +1,183 @@
+"""MFCC + deltas for the spelling model in NumPy/SciPy, without librosa.
+
+The spelling model was trained on
+
+    y, sr = librosa.load(path, sr=16000)
+    mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=20)
+    librosa.feature.delta(mfcc), librosa.feature.delta(mfcc, order=2)
+
+and this module reproduces exactly that with librosa's defaults (n_fft=2048,
+hop 512, periodic Hann window, zero-padded centred frames, 128 Slaney mel
+bands, power_to_db with top_db=80, orthonormal DCT-II, 9-frame Savitzky-Golay
+deltas), including its float32 intermediates. Importing librosa pulls in
+numba, audioread and friends and its first MFCC compiles numba kernels; this
+needs only numpy and scipy, which sklearn loads anyway.
+
+WAV files are read with the standard library (PCM, any channel count) and
+averaged to mono like ``librosa.load``. Resampling uses the ``soxr``
+package, librosa's own default resampler (``res_type="soxr_hq"``), so the
+samples are bit-identical. Without soxr it falls back to scipy's polyphase
+filter: on ``audio/`` the labels stay the same but probabilities move by up
+to 0.18, so keep soxr installed wherever the model serves. The window, mel filterbank and DCT matrix are built once per
+configuration and cached; scipy and soxr are imported on first use, so
+importing this module costs no more than numpy.
+
+``benchmarks/mfcc_parity.py`` checks every stage against librosa on the
+clips under ``audio/``.
+"""
+import wave
+from functools import lru_cache
+
+import numpy as np
+
+# === librosa defaults used by training-spelling.py ===
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+AMIN = 1e-10
+TOP_DB = 80.0
+DELTA_WIDTH = 9
+
+
+# === Loading ===
+def read_wav(path):
+    """(float32 samples, shape (channels, n) or (n,) for mono, sample rate) like soundfile."""
+    try:
+        with wave.open(path if isinstance(path, str) else str(path), "rb") as f:
+            channels, width, sr = f.getnchannels(), f.getsampwidth(), f.getframerate()
+            raw = f.readframes(f.getnframes())
+    except wave.Error:
+        # Float or WAVE_FORMAT_EXTENSIBLE files, which the wave module cannot read
+        import soundfile as sf
+
+        y, sr = sf.read(path, dtype="float32", always_2d=True)
+        return (y[:, 0] if y.shape[1] == 1 else y.T).copy(), sr
+    if width == 1:
+        y = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        y = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 3:
+        # Little-endian 24-bit -> the top three bytes of an int32
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        y = ((b[:, 0] << 8 | b[:, 1] << 16 | b[:, 2] << 24).astype(np.float64) / 2**31).astype(np.float32)
+    elif width == 4:
+        y = (np.frombuffer(raw, dtype="<i4").astype(np.float64) / 2**31).astype(np.float32)
+    else:
+        raise ValueError(f"{path}: unsupported sample width {width} bytes")
+    if channels > 1:
+        y = y.reshape(-1, channels).T
+    return y, sr
+
+
+def resampler():
+    """"soxr" when the soxr package is installed, else "polyphase" (scipy)."""
+    try:
+        import soxr  # noqa: F401
+    except ImportError:
+        return "polyphase"
+    return "soxr"
+
+
+def resample(y, orig_sr, target_sr):
+    if orig_sr == target_sr:
+        return y
+    if resampler() == "soxr":
+        import soxr
+
+        y_hat = soxr.resample(y, orig_sr, target_sr, quality="HQ")
+    else:
+        import scipy.signal
+
+        gcd = np.gcd(int(orig_sr), int(target_sr))
+        y_hat = scipy.signal.resample_poly(y, target_sr // gcd, orig_sr // gcd)
+    # librosa pads or trims the result to exactly ceil(n * ratio) samples
+    n_samples = int(np.ceil(len(y) * float(target_sr) / orig_sr))
+    y_hat = np.pad(y_hat[:n_samples], (0, max(0, n_samples - len(y_hat))))
+    return y_hat.astype(np.float32, copy=False)
+
+
+def load(path, sr):
+    """Mono float32 samples at ``sr``, as ``librosa.load(path, sr=sr)``."""
+    y, native_sr = read_wav(path)
+    if y.ndim == 2:
+        y = np.mean(y, axis=0)
+    return resample(y, native_sr, sr), sr
+
+
+# === Cached matrices ===
+@lru_cache(maxsize=None)
+def hann_window(n_fft):
+    # Periodic ("fftbins") Hann, as scipy.signal.get_window("hann", n_fft)
+    return 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)
+
+
+def hz_to_mel(hz):
+    # Slaney: linear below 1 kHz, logarithmic above
+    hz = np.asarray(hz, dtype=np.float64)
+    mel = hz / (200.0 / 3)
+    log_region = hz >= 1000.0
+    return np.where(log_region, 15.0 + np.log(np.maximum(hz, 1000.0) / 1000.0) / (np.log(6.4) / 27.0), mel)
+
+
+def mel_to_hz(mel):
+    mel = np.asarray(mel, dtype=np.float64)
+    hz = mel * (200.0 / 3)
+    return np.where(mel >= 15.0, 1000.0 * np.exp((np.log(6.4) / 27.0) * (mel - 15.0)), hz)
+
+
+@lru_cache(maxsize=None)
+def mel_filterbank(sr, n_fft=N_FFT, n_mels=N_MELS):
+    """(n_mels, 1 + n_fft // 2) float32 Slaney-normalised triangles, as librosa.filters.mel."""
+    fft_freqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+    mel_freqs = mel_to_hz(np.linspace(hz_to_mel(0.0), hz_to_mel(sr / 2.0), n_mels + 2))
+    widths = np.diff(mel_freqs)
+    ramps = mel_freqs[:, None] - fft_freqs[None, :]
+    weights = np.zeros((n_mels, len(fft_freqs)), dtype=np.float32)
+    for i in range(n_mels):
+        lower = -ramps[i] / widths[i]
+        upper = ramps[i + 2] / widths[i + 1]
+        weights[i] = np.maximum(0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_freqs[2:n_mels + 2] - mel_freqs[:n_mels]))[:, None]
+    weights.flags.writeable = False
+    return weights
+
+
+@lru_cache(maxsize=None)
+def dct_matrix(n_mfcc, n_mels=N_MELS):
+    """The first ``n_mfcc`` rows of the orthonormal DCT-II over ``n_mels`` bands."""
+    import scipy.fft
+
+    basis = scipy.fft.dct(np.eye(n_mels), type=2, norm="ortho", axis=0)[:n_mfcc]
+    basis.flags.writeable = False
+    return basis
+
+
+# === Features ===
+def power_spectrogram(y, n_fft=N_FFT, hop_length=HOP_LENGTH):
+    """|STFT|^2 (1 + n_fft // 2, frames) float32 of zero-padded, centred frames."""
+    y = np.pad(y, n_fft // 2)
+    if len(y) < n_fft:
+        raise ValueError(f"Audio too short: {len(y) - 2 * (n_fft // 2)} samples")
+    frames = np.lib.stride_tricks.sliding_window_view(y, n_fft)[::hop_length]
+    spectrum = np.fft.rfft(frames * hann_window(n_fft), axis=-1).astype(np.complex64)
+    return (np.abs(spectrum) ** 2).T
+
+
+def power_to_db(S, amin=AMIN, top_db=TOP_DB):
+    log_spec = 10.0 * np.log10(np.maximum(amin, S))
+    return np.maximum(log_spec, log_spec.max() - top_db)
+
+
+def mfcc(y, sr, n_mfcc):
+    """(n_mfcc, frames) float32, as ``librosa.feature.mfcc(y=y, sr=sr, n_mfcc=n_mfcc)``."""
+    mel = mel_filterbank(sr) @ power_spectrogram(y)
+    return (dct_matrix(n_mfcc) @ power_to_db(mel)).astype(np.float32)
+
+
+def delta(data, order=1, width=DELTA_WIDTH):
+    """Savitzky-Golay derivative along time, as ``librosa.feature.delta``."""
+    import scipy.signal
+
+    if data.shape[-1] < width:
+        raise ValueError(f"Need at least {width} frames for deltas, got {data.shape[-1]}")
+    return scipy.signal.savgol_filter(data, width, deriv=order, polyorder=order, axis=-1, mode="interp")
@@ -0,0 +1,222 @@
+"""Memory-mapped model store shared by every worker on a host.
+
+Each artifact in ``models/`` (``*.joblib`` / ``*.pkl``) is compiled with
+``compile_model`` and written to ``models/store/<path under models/>/`` as:
+
+* ``object.pkl`` - the pickled object with its large numeric arrays replaced
+  by references,
+* ``array_NNN.npy`` - those arrays, opened with ``mmap_mode='r'`` on load so N
+  workers share the same page-cache pages instead of N private copies,
+* ``meta.json`` - source file size/mtime/sha256 and the array inventory.
+
+From ``backend/``:
+
+    python -m services.model_store build     # (re)build the store
+    python -m services.model_store report    # per-model RSS, pickled vs. store
+"""
+import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+
+from services.forest import compile_model
+from services.hashing import file_sha256
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+STORE_DIR = os.path.join(MODEL_DIR, "store")
+
+ARTIFACT_EXTENSIONS = (".joblib", ".pkl")
+# Arrays smaller than this stay inside object.pkl
+MIN_MMAP_BYTES = 4096
+
+
+class _StorePickler(pickle.Pickler):
+    def __init__(self, file, array_dir):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.array_dir = array_dir
+        self.arrays = {}
+        self._saved = {}
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, np.ndarray) or obj.dtype.hasobject or obj.nbytes < MIN_MMAP_BYTES:
+            return None
+        name = self._saved.get(id(obj))
+        if name is None:
+            name = f"array_{len(self.arrays):03d}.npy"
+            np.save(os.path.join(self.array_dir, name), obj)
+            self.arrays[name] = {"shape": list(obj.shape), "dtype": str(obj.dtype), "nbytes": int(obj.nbytes)}
+            self._saved[id(obj)] = name
+        return ("npy", name)
+
+
+class _StoreUnpickler(pickle.Unpickler):
+    def __init__(self, file, array_dir, mmap_mode):
+        super().__init__(file)
+        self.array_dir = array_dir
+        self.mmap_mode = mmap_mode
+        self.loaded = []
+
+    def persistent_load(self, pid):
+        kind, name = pid
+        if kind != "npy":
+            raise pickle.UnpicklingError(f"Unknown persistent id: {pid}")
+        array = np.asarray(np.load(os.path.join(self.array_dir, name), mmap_mode=self.mmap_mode))
+        self.loaded.append(array)
+        return array
+
+
+def store_path(source_path, store_dir=STORE_DIR):
+    # Mirror the layout under models/ so versioned copies of one file don't collide
+    relative = os.path.relpath(os.path.abspath(source_path), MODEL_DIR)
+    if relative.startswith(os.pardir):
+        relative = os.path.basename(source_path)
+    return os.path.join(store_dir, relative)
+
+
+def write_artifact(source_path, store_dir=STORE_DIR):
+    """Compile one artifact and write it to the store; returns its meta dict."""
+    target = store_path(source_path, store_dir)
+    tmp = target + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    obj = compile_model(joblib.load(source_path))
+    with open(os.path.join(tmp, "object.pkl"), "wb") as f:
+        pickler = _StorePickler(f, tmp)
+        pickler.dump(obj)
+
+    st = os.stat(source_path)
+    meta = {
+        "source": os.path.basename(source_path),
+        "source_size": st.st_size,
+        "source_mtime_ns": st.st_mtime_ns,
+        "source_sha256": file_sha256(source_path),
+        "arrays": pickler.arrays,
+    }
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    # Swap the directory in as a whole so readers never see a half-written artifact
+    shutil.rmtree(target, ignore_errors=True)
+    os.rename(tmp, target)
+    return meta
+
+
+def _is_current(meta, source_path):
+    st = os.stat(source_path)
+    if st.st_size != meta["source_size"]:
+        return False
+    if st.st_mtime_ns == meta["source_mtime_ns"]:
+        return True
+    return file_sha256(source_path) == meta["source_sha256"]
+
+
+def read_artifact(path, mmap_mode="r"):
+    """Load a stored artifact directory; returns (object, list of mapped arrays)."""
+    with open(os.path.join(path, "object.pkl"), "rb") as f:
+        unpickler = _StoreUnpickler(f, path, mmap_mode)
+        obj = unpickler.load()
+    return obj, unpickler.loaded
+
+
+def load_artifact(source_path, store_dir=STORE_DIR):
+    """Load ``source_path`` from the store if it is built and current, else from the pickle.
+
+    Either way the result has its forests compiled, so callers get the same
+    object type regardless of whether the store has been built.
+    """
+    target = store_path(source_path, store_dir)
+    meta_path = os.path.join(target, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if _is_current(meta, source_path):
+            return read_artifact(target)[0]
+        print(f"Model store entry for {os.path.basename(source_path)} is stale; loading the pickle.")
+    return compile_model(joblib.load(source_path))
+
+
+def artifact_files(model_dir=MODEL_DIR):
+    return sorted(
+        os.path.join(model_dir, name) for name in os.listdir(model_dir)
+        if name.endswith(ARTIFACT_EXTENSIONS)
+    )
+
+
+def build(model_dir=MODEL_DIR, store_dir=STORE_DIR):
+    os.makedirs(store_dir, exist_ok=True)
+    for source_path in artifact_files(model_dir):
+        meta = write_artifact(source_path, store_dir)
+        mapped = sum(a["nbytes"] for a in meta["arrays"].values())
+        print(f"{meta['source']:<45} {len(meta['arrays']):>3} arrays  {mapped / 2**20:8.2f} MiB mapped")
+
+
+# === Resident memory report ===
+
+def _rss_kib():
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                fields[key] = int(value.split()[0])
+    return fields
+
+
+def _measure(source_path, mode):
+    # Runs in a fresh interpreter so every measurement starts from the same baseline
+    import sklearn.ensemble  # noqa: F401  (import cost is not part of the model's footprint)
+    before = _rss_kib()
+    if mode == "pickle":
+        compile_model(joblib.load(source_path))
+    else:
+        _, arrays = read_artifact(store_path(source_path))
+        # Fault in every page, as serving eventually does
+        for array in arrays:
+            if array.size:
+                array.reshape(-1).view(np.uint8)[::4096].sum()
+    after = _rss_kib()
+    print(json.dumps({key: after[key] - before[key] for key in after}))
+
+
+def report(model_dir=MODEL_DIR):
+    print(f"{'artifact':<45}{'pickle private MiB':>20}{'store private MiB':>19}{'store shared MiB':>18}")
+    totals = [0.0, 0.0, 0.0]
+    for source_path in artifact_files(model_dir):
+        row = []
+        for mode in ("pickle", "store"):
+            if mode == "store" and not os.path.exists(os.path.join(store_path(source_path), "meta.json")):
+                row.append(None)
+                continue
+            out = subprocess.run(
+                [sys.executable, "-m", "services.model_store", "measure", source_path, mode],
+                cwd=BASE_DIR, capture_output=True, text=True, check=True,
+            )
+            row.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        pickled, stored = row
+        if stored is None:
+            print(f"{os.path.basename(source_path):<45}{pickled['RssAnon'] / 1024:>20.2f}{'(not built)':>19}")
+            continue
+        values = [pickled["RssAnon"] / 1024, stored["RssAnon"] / 1024, stored["RssFile"] / 1024]
+        totals = [t + v for t, v in zip(totals, values)]
+        print(f"{os.path.basename(source_path):<45}{values[0]:>20.2f}{values[1]:>19.2f}{values[2]:>18.2f}")
+    print(f"{'total per worker':<45}{totals[0]:>20.2f}{totals[1]:>19.2f}{totals[2]:>18.2f}")
+    print("\nPrivate memory is paid by every worker; shared (file-backed) pages are paid once per host.")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "build":
+        build()
+    elif command == "report":
+        report()
+    elif command == "measure":
+        _measure(sys.argv[2], sys.argv[3])
+    else:
+        sys.exit(f"Unknown command: {command} (expected build or report)")
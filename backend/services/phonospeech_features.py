@@ -0,0 +1,143 @@
+"""Sparse phonospeech features with the question side precomputed.
+
+The phonospeech model sees one row per (question, child_response) pair:
+
+    [ TF-IDF(question + ' ' + child_response) | scaled phoneme features of both ]
+
+Word n-grams of the joined text are the n-grams of the question, those of the
+response, and the few that straddle the boundary. So for every known question
+the featurizer keeps its in-vocabulary n-gram counts, its last ``max_n - 1``
+tokens and its scaled phoneme features; a request only tokenizes the response.
+Rows come out as CSR, bit-identical to ``vectorizer.transform`` + ``hstack``,
+and go straight into ``CompiledForest.predict_proba`` without densifying.
+"""
+import math
+import re
+from collections import Counter
+
+import numpy as np
+import scipy.sparse as sp
+
+from services.catalog import load_table
+
+QUESTIONS_CSV = "dyslexia_training_dataset.csv"
+# extract_phoneme_features() values per text; the model gets question's then response's
+N_PHONEME_FEATURES = 5
+
+
+def extract_phoneme_features(text):
+    text = str(text)
+    vowels = len(re.findall(r'[aeiou]', text.lower()))
+    consonants = len(re.findall(r'[bcdfghjklmnpqrstvwxyz]', text.lower()))
+    total_chars = len(text)
+    vowel_ratio = vowels / total_chars if total_chars > 0 else 0
+    consonant_ratio = consonants / total_chars if total_chars > 0 else 0
+    return [vowels, consonants, vowel_ratio, consonant_ratio, total_chars]
+
+
+def load_questions():
+    try:
+        questions = load_table(QUESTIONS_CSV).unique('Question')
+    except FileNotFoundError:
+        return []
+    return [question for question in questions if isinstance(question, str)]
+
+
+def _fast_path_supported(vectorizer, scaler):
+    return (
+        vectorizer.analyzer == 'word' and vectorizer.tokenizer is None and not vectorizer.binary
+        and vectorizer.use_idf and not vectorizer.sublinear_tf and vectorizer.norm == 'l2'
+        and getattr(scaler, 'mean_', None) is not None and getattr(scaler, 'scale_', None) is not None
+    )
+
+
+class PhonoSpeechFeaturizer:
+    def __init__(self, vectorizer, scaler, questions=()):
+        self.vectorizer = vectorizer
+        self.scaler = scaler
+        self.n_text = len(vectorizer.vocabulary_)
+        self.n_features = self.n_text + 2 * N_PHONEME_FEATURES
+        self.fast = _fast_path_supported(vectorizer, scaler)
+        self._questions = {}
+        if not self.fast:
+            print("Phonospeech vectorizer/scaler config has no fast path; using vectorizer.transform.")
+            return
+        self.preprocess = vectorizer.build_preprocessor()
+        self.tokenize = vectorizer.build_tokenizer()
+        self.stop_words = vectorizer.get_stop_words() or frozenset()
+        self.min_n, self.max_n = vectorizer.ngram_range
+        self.vocabulary = vectorizer.vocabulary_
+        self.idf = vectorizer.idf_.tolist()
+        self._questions = {question: self._question_side(question) for question in questions}
+
+    def _tokens(self, text):
+        return [token for token in self.tokenize(self.preprocess(text)) if token not in self.stop_words]
+
+    def _count(self, counts, tokens, first=0, last_start=None):
+        # Add in-vocabulary n-grams of tokens to counts; only windows that start
+        # before last_start and end after first are counted (used for the boundary)
+        for n in range(self.min_n, self.max_n + 1):
+            start_max = len(tokens) - n + 1 if last_start is None else min(last_start, len(tokens) - n + 1)
+            for i in range(max(0, first - n + 1), start_max):
+                column = self.vocabulary.get(" ".join(tokens[i:i + n]))
+                if column is not None:
+                    counts[column] += 1
+
+    def _scale(self, values, offset):
+        mean, scale = self.scaler.mean_, self.scaler.scale_
+        return [(value - mean[offset + k]) / scale[offset + k] for k, value in enumerate(values)]
+
+    def _question_side(self, question):
+        tokens = self._tokens(question)
+        counts = Counter()
+        self._count(counts, tokens)
+        tail = tokens[len(tokens) - min(len(tokens), self.max_n - 1):]
+        return counts, tail, self._scale(extract_phoneme_features(question), 0)
+
+    def _row(self, question, child_response):
+        question_side = self._questions.get(question)
+        if question_side is None:
+            question_side = self._question_side(question)
+        question_counts, tail, question_numeric = question_side
+
+        tokens = self._tokens(child_response)
+        counts = question_counts.copy()
+        self._count(counts, tokens)
+        # n-grams straddling "question response": start in the tail, end in the response
+        if tail and tokens and self.max_n > 1:
+            self._count(counts, tail + tokens, first=len(tail), last_start=len(tail))
+
+        columns = sorted(column for column, count in counts.items() if count)
+        values = [counts[column] * self.idf[column] for column in columns]
+        # Same accumulation order as sklearn's l2 normalize, which sums the row as
+        # stored by scipy's ``counts @ idf_diag``: columns in descending order
+        norm = 0.0
+        for value in reversed(values):
+            norm += value * value
+        if norm != 0.0:
+            norm = math.sqrt(norm)
+            values = [value / norm for value in values]
+
+        numeric = question_numeric + self._scale(extract_phoneme_features(child_response), N_PHONEME_FEATURES)
+        return columns + list(range(self.n_text, self.n_features)), values + numeric
+
+    def transform(self, pairs):
+        """[(question, child_response), ...] -> CSR matrix of model inputs."""
+        if not self.fast:
+            text = self.vectorizer.transform([question + ' ' + child_response for question, child_response in pairs])
+            numeric = self.scaler.transform([
+                extract_phoneme_features(question) + extract_phoneme_features(child_response)
+                for question, child_response in pairs
+            ])
+            return sp.hstack([text, sp.csr_matrix(numeric)], format="csr")
+
+        indptr, indices, data = [0], [], []
+        for question, child_response in pairs:
+            columns, values = self._row(question, child_response)
+            indices += columns
+            data += values
+            indptr.append(len(indices))
+        return sp.csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+            shape=(len(pairs), self.n_features),
+        )
@@ -0,0 +1,96 @@
+"""Prometheus text exposition (format 0.0.4) of the serving metrics, for ``/metrics``.
+
+Everything here is read from counters the services keep anyway; nothing is
+computed until a scrape asks for it. Like the other stats endpoints,
+``/metrics`` needs ``MODEL_ADMIN_TOKEN``; point the scrape config's
+``authorization`` (bearer) credentials at it.
+"""
+from services.batching import batcher_stats
+from services.executor import pool_stats
+from services.memo import memo_stats
+from services.timing import in_flight, stage_histograms
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "earlyedge_"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Exposition:
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, kind, help_text):
+        self.lines.append(f"# HELP {PREFIX}{name} {help_text}")
+        self.lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+    def sample(self, name, labels, value):
+        self.lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+
+    def histogram(self, name, labels, snapshot):
+        # Histogram.snapshot() buckets are already cumulative, keyed by bound
+        for bound, count in snapshot["buckets"].items():
+            self.sample(f"{name}_bucket", {**labels, "le": bound}, count)
+        self.sample(f"{name}_sum", labels, snapshot["sum"])
+        self.sample(f"{name}_count", labels, snapshot["count"])
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
+
+
+def render():
+    out = _Exposition()
+
+    out.family("http_requests_in_flight", "gauge", "HTTP requests currently being served.")
+    out.sample("http_requests_in_flight", {}, in_flight())
+
+    out.family("stage_duration_ms", "histogram", "Time spent in named request stages, per route (stage=\"total\" is the whole request).")
+    for (route, stage), snapshot in stage_histograms().items():
+        out.histogram("stage_duration_ms", {"route": route, "stage": stage}, snapshot)
+
+    pools = pool_stats()
+    for name, kind, help_text, field in (
+        ("executor_workers", "gauge", "Worker threads/processes per inference pool.", "workers"),
+        ("executor_max_pending", "gauge", "Jobs a pool admits (running + queued) before rejecting.", "max_pending"),
+        ("executor_pending", "gauge", "Jobs submitted and not yet finished (running + queued).", "pending"),
+        ("executor_running", "gauge", "Jobs currently running in a worker.", "running"),
+        ("executor_rejected_total", "counter", "Jobs rejected with 503 because the pool was full.", "rejected"),
+        ("executor_cancelled_total", "counter", "Queued jobs cancelled before they started.", "cancelled"),
+    ):
+        out.family(name, kind, help_text)
+        for pool, stats in pools.items():
+            out.sample(name, {"pool": pool}, stats[field])
+    out.family("executor_queued", "gauge", "Jobs waiting for a worker.")
+    for pool, stats in pools.items():
+        out.sample("executor_queued", {"pool": pool}, max(stats["pending"] - stats["running"], 0))
+
+    batchers = batcher_stats()
+    out.family("batch_size", "histogram", "Inputs scored per micro-batch call.")
+    for name, stats in batchers.items():
+        out.histogram("batch_size", {"batcher": name}, stats["batch_size"])
+    out.family("batch_queue_wait_ms", "histogram", "Time an input waited for its micro-batch to start.")
+    for name, stats in batchers.items():
+        out.histogram("batch_queue_wait_ms", {"batcher": name}, stats["queue_wait_ms"])
+
+    memos = memo_stats()
+    for name, kind, help_text, field in (
+        ("memo_entries", "gauge", "Cached predictions held.", "entries"),
+        ("memo_hits_total", "counter", "Prediction memo hits.", "hits"),
+        ("memo_misses_total", "counter", "Prediction memo misses.", "misses"),
+        ("memo_evicted_total", "counter", "Entries evicted for space.", "evicted"),
+        ("memo_expired_total", "counter", "Entries dropped after their TTL.", "expired"),
+        ("memo_invalidated_total", "counter", "Entries dropped on a model swap.", "invalidated"),
+    ):
+        out.family(name, kind, help_text)
+        for memo, stats in memos.items():
+            out.sample(name, {"memo": memo}, stats[field])
+
+    return out.text()
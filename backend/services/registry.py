@@ -0,0 +1,182 @@
+"""Versioned model registry driven by ``models/manifest.json``.
+
+The manifest maps each task to a version, its artifact files (relative to
+``models/``) with sha256 checksums, and the feature schema the model expects.
+Routers take one immutable snapshot per request:
+
+    models = registry.get("arithmetic")
+    X = models["scaler"].transform(...)
+    proba = models["model"].predict_proba(X)
+
+``registry.reload()`` re-reads the manifest, loads every task whose entry
+changed next to the live one, verifies checksums and feature counts, and
+only then swaps the snapshot reference. Requests that already hold the old
+snapshot finish on it; nothing is restarted and worker caches stay warm.
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+
+from services.hashing import file_sha256
+from services.model_store import load_artifact
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+MANIFEST_PATH = os.path.join(MODEL_DIR, "manifest.json")
+
+
+class ModelLoadError(RuntimeError):
+    pass
+
+
+def read_manifest(path=MANIFEST_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+class TaskModels:
+    """One loaded version of a task's artifacts. Never mutated after load."""
+
+    def __init__(self, task, version, artifacts, paths, features):
+        self.task = task
+        self.version = version
+        self.features = features
+        self._artifacts = artifacts
+        self._paths = paths
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, role):
+        return self._artifacts[role]
+
+    def path(self, role):
+        return self._paths[role]
+
+    def derived(self, key, factory):
+        """Per-version state built from these artifacts (e.g. feature stores), created once."""
+        value = self._derived.get(key)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(key)
+                if value is None:
+                    value = self._derived[key] = factory(self)
+        return value
+
+    def describe(self):
+        return {"version": self.version, "artifacts": {role: os.path.relpath(path, MODEL_DIR) for role, path in self._paths.items()}}
+
+
+def load_task(task, entry, model_dir=MODEL_DIR):
+    artifacts, paths = {}, {}
+    for role, spec in entry["artifacts"].items():
+        path = os.path.join(model_dir, spec["file"])
+        if not os.path.exists(path):
+            raise ModelLoadError(f"{task} v{entry['version']}: missing artifact {spec['file']}")
+        expected = spec.get("sha256")
+        if expected is None:
+            print(f"Warning: {task} v{entry['version']} artifact {spec['file']} has no checksum in the manifest.")
+        elif file_sha256(path) != expected:
+            raise ModelLoadError(f"{task} v{entry['version']}: checksum mismatch for {spec['file']}")
+        artifacts[role] = load_artifact(path)
+        paths[role] = path
+
+    n_features = entry.get("features", {}).get("n_features")
+    model = artifacts.get("model")
+    if isinstance(model, dict):
+        model = model.get("model")
+    if n_features is not None and getattr(model, "n_features_in_", n_features) != n_features:
+        raise ModelLoadError(
+            f"{task} v{entry['version']}: model expects {model.n_features_in_} features, manifest declares {n_features}"
+        )
+    return TaskModels(task, entry["version"], artifacts, paths, entry.get("features"))
+
+
+class ModelRegistry:
+    def __init__(self, manifest_path=MANIFEST_PATH, model_dir=MODEL_DIR):
+        self.manifest_path = manifest_path
+        self.model_dir = model_dir
+        self._manifest = read_manifest(manifest_path)
+        self._snapshots = {}
+        self._entries = {}
+        self._load_lock = threading.Lock()
+        self._listeners = []
+
+    def get(self, task):
+        snapshot = self._snapshots.get(task)
+        if snapshot is None:
+            with self._load_lock:
+                snapshot = self._snapshots.get(task)
+                if snapshot is None:
+                    entry = self._manifest["tasks"][task]
+                    snapshot = load_task(task, entry, self.model_dir)
+                    self._entries[task] = entry
+                    self._snapshots[task] = snapshot
+        return snapshot
+
+    def on_swap(self, callback):
+        """Call ``callback(task, old, new)`` after a task switches versions."""
+        self._listeners.append(callback)
+
+    def reload(self, tasks=None):
+        """Load changed manifest entries and swap them in; returns {task: status}."""
+        manifest = read_manifest(self.manifest_path)
+        results = {}
+        with self._load_lock:
+            self._manifest = manifest
+            for task, entry in manifest["tasks"].items():
+                if tasks is not None and task not in tasks:
+                    continue
+                if task not in self._snapshots:
+                    results[task] = "not loaded"
+                    continue
+                if entry == self._entries.get(task):
+                    results[task] = f"unchanged (v{entry['version']})"
+                    continue
+                try:
+                    snapshot = load_task(task, entry, self.model_dir)
+                except Exception as e:
+                    results[task] = f"failed, keeping v{self._snapshots[task].version}: {e}"
+                    continue
+                old = self._snapshots[task]
+                # A single reference assignment: new requests see the new version,
+                # in-flight ones keep using the snapshot they already hold
+                self._snapshots[task] = snapshot
+                self._entries[task] = entry
+                for callback in self._listeners:
+                    callback(task, old, snapshot)
+                results[task] = f"v{old.version} -> v{snapshot.version}"
+        return results
+
+    async def reload_async(self, tasks=None):
+        # Loading artifacts is blocking I/O + unpickling; keep it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, self.reload, tasks)
+
+    def versions(self):
+        return {task: snapshot.describe() for task, snapshot in self._snapshots.items()}
+
+
+def update_checksums(manifest_path=MANIFEST_PATH, model_dir=MODEL_DIR):
+    manifest = read_manifest(manifest_path)
+    for task, entry in manifest["tasks"].items():
+        for role, spec in entry["artifacts"].items():
+            path = os.path.join(model_dir, spec["file"])
+            if os.path.exists(path):
+                spec["sha256"] = file_sha256(path)
+            else:
+                print(f"{task}: {spec['file']} not found, checksum left unchanged")
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+
+registry = ModelRegistry()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "update-checksums":
+        update_checksums()
+    else:
+        sys.exit("Usage: python -m services.registry update-checksums")
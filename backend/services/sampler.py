@@ -0,0 +1,110 @@
+"""O(1) random row draws for question/audio endpoints, non-repeating per session.
+
+Each sampler holds one shuffled permutation of its table's row indices. A
+session walks that permutation with its own random offset and a stride coprime
+with the table size, so it visits every row exactly once per cycle:
+
+    row = order[(offset + k * stride) % n]        k = 0, 1, ..., n - 1
+
+Per-session state is three integers plus the last few rows drawn (used to avoid
+immediate repeats when a new cycle starts), so many sessions fit in a small
+LRU. Without a session id every call is independent: a single draw is a
+uniform pick, as before, and a batch still has no duplicates. A batch can
+hold at most one cycle, so ``n`` may not exceed the table size.
+"""
+import math
+import random
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+
+# Rows a session will not see again right after a cycle wraps around
+RECENT_WINDOW = 5
+MAX_SESSIONS = 10000
+
+
+class _Session:
+    __slots__ = ("offset", "stride", "position", "recent")
+
+    def __init__(self, recent):
+        self.position = 0
+        self.recent = deque(maxlen=recent) if recent else None
+
+
+class SessionSampler:
+    def __init__(self, n_rows, recent=RECENT_WINDOW, max_sessions=MAX_SESSIONS, seed=None):
+        if n_rows < 1:
+            raise ValueError("Cannot sample from an empty table")
+        self.n_rows = n_rows
+        self.order = np.random.default_rng(seed).permutation(n_rows)
+        self.recent = min(recent, n_rows - 1)
+        self.max_sessions = max_sessions
+        self._rng = random.Random(seed)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _new_cycle(self, session):
+        n = self.n_rows
+        session.offset = self._rng.randrange(n)
+        session.stride = 1
+        if n > 2:
+            session.stride = self._rng.randrange(1, n)
+            while math.gcd(session.stride, n) != 1:
+                session.stride = self._rng.randrange(1, n)
+        session.position = 0
+
+    def _session(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session(self.recent)
+            self._new_cycle(session)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def _next(self, session):
+        while True:
+            if session.position >= self.n_rows:
+                self._new_cycle(session)
+            row = int(self.order[(session.offset + session.position * session.stride) % self.n_rows])
+            session.position += 1
+            # Within a cycle rows never repeat; this only skips rows at the start of a new one
+            if session.recent is None or row not in session.recent:
+                break
+        if session.recent is not None:
+            session.recent.append(row)
+        return row
+
+    def draw(self, session_id=None, n=1):
+        """``n`` row indices (at most the table size); distinct within a session until every row has been drawn."""
+        if n > self.n_rows:
+            raise ValueError(f"Cannot draw {n} distinct rows from a table of {self.n_rows}")
+        with self._lock:
+            if session_id is None:
+                # One-off walk: a random start, and still no duplicates inside a batch
+                session = _Session(0)
+                self._new_cycle(session)
+            else:
+                session = self._session(session_id)
+            return [self._next(session) for _ in range(n)]
+
+    def stats(self):
+        return {"rows": self.n_rows, "sessions": len(self._sessions)}
+
+
+_samplers = {}
+_samplers_lock = threading.Lock()
+
+
+def table_sampler(table):
+    """The process-wide SessionSampler over a catalog Table's rows, created on first use."""
+    sampler = _samplers.get(table.name)
+    if sampler is None:
+        with _samplers_lock:
+            sampler = _samplers.get(table.name)
+            if sampler is None:
+                sampler = _samplers[table.name] = SessionSampler(len(table))
+    return sampler
@@ -0,0 +1,7 @@
+"""Names shared by serve.py (the supervisor) and main.py (each worker).
+
+Kept free of heavy imports: serve.py loads it before capping numpy's threads.
+"""
+
+# Set in every worker to the parent's pid; main.py forwards model reloads there
+PARENT_PID_ENV = "SERVE_PARENT_PID"
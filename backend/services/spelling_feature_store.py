@@ -0,0 +1,169 @@
+"""Precomputed MFCC features and spelling probabilities for the reference audio.
+
+``features.npy`` holds one flattened feature row per audio file (opened with
+``mmap_mode='r'``) and ``index.json`` maps each audio path to its row, file
+size/mtime/sha256 and build-time ``spelling_prob``. Build it from ``backend/``
+with ``python -m services.spelling_feature_store``.
+"""
+import asyncio
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+
+from services.audio_features import extract_spelling_features, FEATURE_CONFIG, N_MFCC, MAX_FRAMES
+from services.hashing import file_sha256, file_signature
+from services.timing import stage
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.path.join(BASE_DIR, "models", "spelling_feature_store")
+DATASET_PATH = os.path.join(BASE_DIR, "data", "spelling_audio_dataset.csv")
+MODEL_PATH = os.path.join(BASE_DIR, "models", "dyslexia_spelling_audio_model.joblib")
+
+
+def score_spelling_features(model, scaler, X):
+    """Probability of the 'incorrect' class for a batch of raw feature rows."""
+    X = scaler.transform(np.asarray(X).reshape(len(X), -1))
+    if hasattr(model, "predict_proba"):
+        return model.predict_proba(X)[:, 1]
+    return (model.predict(X) == 1).astype(float)
+
+
+def build_store(csv_path=DATASET_PATH, model_path=MODEL_PATH, store_dir=STORE_DIR, base_dir=BASE_DIR):
+    """Featurize every audio file in the dataset and score it in one batch."""
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    audio_files = list(dict.fromkeys(df["audio_file"]))
+
+    bundle = joblib.load(model_path)
+    rows = []
+    entries = {}
+    for audio_file in audio_files:
+        path = os.path.join(base_dir, audio_file)
+        try:
+            rows.append(extract_spelling_features(path))
+        except Exception as e:
+            print(f"Skipping {audio_file}: {e}")
+            continue
+        entries[audio_file] = dict(row=len(rows) - 1, sha256=file_sha256(path), **file_signature(path))
+
+    features = np.vstack(rows) if rows else np.empty((0, 3 * N_MFCC * MAX_FRAMES))
+    probs = score_spelling_features(bundle["model"], bundle["scaler"], features) if rows else []
+    for entry in entries.values():
+        entry["spelling_prob"] = float(probs[entry["row"]])
+
+    os.makedirs(store_dir, exist_ok=True)
+    np.save(os.path.join(store_dir, "features.npy"), features)
+    index = {
+        "feature_config": FEATURE_CONFIG,
+        "model_sha256": file_sha256(model_path),
+        "entries": entries,
+    }
+    with open(os.path.join(store_dir, "index.json"), "w") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+class SpellingFeatureStore:
+    """Audio path -> spelling probability, backed by the prebuilt store.
+
+    ``scorer`` maps a 2D array of raw feature rows to probabilities and is
+    used both for lazy fills and to rescore stored features when the model
+    changed after the store was built. Lazy fills run in ``pool`` (an
+    ``InferencePool``) when one is given.
+    """
+
+    def __init__(self, scorer, base_dir=BASE_DIR, model_sha256=None, pool=None):
+        self.scorer = scorer
+        self.pool = pool
+        self.base_dir = base_dir
+        self.model_sha256 = model_sha256
+        self.features = None
+        self._rows = {}
+        self._probs = {}
+        self._inflight = {}
+
+    @classmethod
+    def open(cls, scorer, store_dir=STORE_DIR, base_dir=BASE_DIR, model_path=MODEL_PATH, pool=None):
+        model_sha256 = file_sha256(model_path) if os.path.exists(model_path) else None
+        store = cls(scorer, base_dir=base_dir, model_sha256=model_sha256, pool=pool)
+        index_path = os.path.join(store_dir, "index.json")
+        if not os.path.exists(index_path):
+            print(f"Spelling feature store not built at {store_dir}; features will be computed on demand.")
+            return store
+        with open(index_path) as f:
+            index = json.load(f)
+        if index.get("feature_config") != FEATURE_CONFIG:
+            print("Spelling feature store was built with a different feature config; ignoring it.")
+            return store
+        store.features = np.load(os.path.join(store_dir, "features.npy"), mmap_mode="r")
+        store._load_entries(index["entries"], rescore=index.get("model_sha256") != model_sha256)
+        return store
+
+    def _is_fresh(self, audio_file, entry):
+        path = os.path.join(self.base_dir, audio_file)
+        try:
+            signature = file_signature(path)
+        except OSError:
+            return False
+        if signature["size"] == entry["size"] and signature["mtime_ns"] == entry["mtime_ns"]:
+            return True
+        # Touched but possibly unchanged (e.g. a fresh checkout): fall back to the hash
+        return signature["size"] == entry["size"] and file_sha256(path) == entry["sha256"]
+
+    def _load_entries(self, entries, rescore):
+        fresh = {k: v for k, v in entries.items() if self._is_fresh(k, v)}
+        stale = len(entries) - len(fresh)
+        if stale:
+            print(f"Spelling feature store: {stale} stale entries will be recomputed on demand.")
+        self._rows = {k: v["row"] for k, v in fresh.items()}
+        if rescore and fresh:
+            # Features are still valid, only the model changed: rescore in one batch
+            keys = list(fresh)
+            probs = self.scorer(self.features[[self._rows[k] for k in keys]])
+            self._probs = {k: float(p) for k, p in zip(keys, probs)}
+        else:
+            self._probs = {k: v["spelling_prob"] for k, v in fresh.items()}
+
+    def _compute(self, audio_file):
+        features = extract_spelling_features(os.path.join(self.base_dir, audio_file))
+        with stage("forest"):
+            return float(self.scorer(features.reshape(1, -1))[0])
+
+    async def get_prob(self, audio_file):
+        prob = self._probs.get(audio_file)
+        if prob is not None:
+            return prob
+
+        # Concurrent misses for the same file share one computation
+        pending = self._inflight.get(audio_file)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        if self.pool is not None:
+            pending = self.pool.submit(self._compute, audio_file)
+        else:
+            pending = asyncio.get_running_loop().run_in_executor(None, self._compute, audio_file)
+        self._inflight[audio_file] = pending
+        pending.add_done_callback(lambda fut: self._fill(audio_file, fut))
+        return await asyncio.shield(pending)
+
+    def _fill(self, audio_file, fut):
+        self._inflight.pop(audio_file, None)
+        if not fut.cancelled() and fut.exception() is None:
+            self._probs[audio_file] = fut.result()
+
+    def __contains__(self, audio_file):
+        return audio_file in self._probs
+
+    def __len__(self):
+        return len(self._probs)
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DATASET_PATH
+    index = build_store(csv_path)
+    print(f"Stored features for {len(index['entries'])} audio files in {STORE_DIR}")
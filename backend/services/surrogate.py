@@ -0,0 +1,239 @@
+"""Grid lookup surrogates for forests over a few low-dimensional inputs.
+
+A tree ensemble is constant between consecutive split thresholds of each
+feature, so evaluating it once per cell of the threshold grid gives a table
+that reproduces ``predict_proba`` exactly:
+
+    cell_j = searchsorted(thresholds_j, x_j)    # x_j <= t goes left, as in the trees
+    proba  = palette[index[cell_0, ..., cell_n]]
+
+Distinct probability rows are few (dozens), so the dense table stores a small
+integer index into a palette of them. If the full grid would exceed
+``max_cells``, the feature with the most thresholds keeps only every other one
+until it fits; the table is then an approximation, and the fidelity report
+says how close it is.
+
+Rows with non-finite values or outside the input range seen in the training
+CSV (the grid's domain) are scored by the real model. Tables are compiled
+offline, from ``backend/``:
+
+    python -m services.surrogate build [--max-cells N]
+
+which writes ``models/surrogates/<task>.npz`` plus ``<task>.report.json``
+(cells, table bytes, max probability error, label agreement, latency). At
+serving time ``open_surrogate`` returns the table-backed model only if it was
+built from the exact model file in use, and the plain model otherwise.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from services.forest import CompiledForest, compile_model
+from services.hashing import file_sha256
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SURROGATE_DIR = os.path.join(BASE_DIR, "models", "surrogates")
+
+# Task -> model input columns; the inputs the tables are built over
+SURROGATE_TASKS = {
+    "letter_tracing": ["duration_seconds", "accuracy"],
+    "numberunderstanding": ["left_number", "right_number", "response_time_sec", "user_correct"],
+}
+DEFAULT_MAX_CELLS = 4_000_000
+
+
+def _split_thresholds(forest, n_features):
+    split = ~forest.is_leaf
+    return [np.unique(forest.threshold[split & (forest.feature == j)]) for j in range(n_features)]
+
+
+def _representatives(thresholds):
+    # One float32 point per cell (t[k-1], t[k]]: the largest float32 <= t[k], plus
+    # the smallest float32 above the last threshold. Inputs are float32, so a cell
+    # with no float32 in it can never be looked up and its entry does not matter.
+    points = thresholds.astype(np.float32)
+    points = np.where(points > thresholds, np.nextafter(points, np.float32(-np.inf)), points)
+    last = np.float32(thresholds[-1]) if len(thresholds) else np.float32(0)
+    if len(thresholds) and last <= thresholds[-1]:
+        last = np.nextafter(last, np.float32(np.inf))
+    return np.append(points, last).astype(np.float32)
+
+
+class GridSurrogate:
+    def __init__(self, thresholds, index, palette, classes, low, high, exact):
+        self.thresholds = thresholds
+        self.index = index
+        self.palette = palette
+        self.classes_ = classes
+        self.low = low
+        self.high = high
+        self.exact = bool(exact)
+        self.n_features_in_ = len(thresholds)
+        self.shape = tuple(len(t) + 1 for t in thresholds)
+
+    @classmethod
+    def compile(cls, forest, low, high, max_cells=DEFAULT_MAX_CELLS):
+        """Evaluate ``forest`` (a CompiledForest) once per grid cell; ``low``/``high`` bound the domain."""
+        thresholds = _split_thresholds(forest, forest.n_features_in_)
+        exact = True
+        while np.prod([len(t) + 1 for t in thresholds], dtype=np.float64) > max_cells:
+            j = int(np.argmax([len(t) for t in thresholds]))
+            if len(thresholds[j]) <= 1:
+                raise ValueError(f"Cannot fit a grid into {max_cells} cells")
+            thresholds[j] = thresholds[j][1::2]
+            exact = False
+        axes = [_representatives(t) for t in thresholds]
+        grid = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(axes))
+        proba = forest.predict_proba(grid)
+        palette, inverse = np.unique(proba, axis=0, return_inverse=True)
+        dtype = np.uint8 if len(palette) <= 1 << 8 else np.uint16 if len(palette) <= 1 << 16 else np.uint32
+        index = inverse.reshape(-1).astype(dtype).reshape([len(a) for a in axes])
+        return cls(thresholds, index, palette, forest.classes_,
+                   np.asarray(low, dtype=np.float32), np.asarray(high, dtype=np.float32), exact)
+
+    def inside(self, X):
+        """Rows the table answers: finite and within the domain seen in training."""
+        return np.all(np.isfinite(X) & (X >= self.low) & (X <= self.high), axis=1)
+
+    def lookup(self, X):
+        """Probabilities for rows that are ``inside``."""
+        cells = tuple(np.searchsorted(t, X[:, j]) for j, t in enumerate(self.thresholds))
+        return self.palette[self.index[cells]]
+
+    @property
+    def nbytes(self):
+        return self.index.nbytes + self.palette.nbytes + sum(t.nbytes for t in self.thresholds)
+
+    def save(self, path, source_sha256):
+        arrays = {f"thresholds_{j}": t for j, t in enumerate(self.thresholds)}
+        meta = {"source_sha256": source_sha256, "exact": self.exact, "n_features": self.n_features_in_}
+        np.savez(path, index=self.index, palette=self.palette, classes=self.classes_, low=self.low, high=self.high,
+                 meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            thresholds = [data[f"thresholds_{j}"] for j in range(meta["n_features"])]
+            surrogate = cls(thresholds, data["index"], data["palette"], data["classes"], data["low"], data["high"], meta["exact"])
+        return surrogate, meta
+
+
+class SurrogateModel:
+    """``predict_proba`` from the table where it applies, from ``model`` elsewhere."""
+
+    def __init__(self, surrogate, model):
+        self.surrogate = surrogate
+        self.model = model
+        self.classes_ = model.classes_
+        self.n_features_in_ = model.n_features_in_
+
+    def predict_proba(self, X):
+        # float32 like the forest itself, so thresholds compare the same way
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.n_features_in_)
+        inside = self.surrogate.inside(X)
+        if inside.all():
+            return self.surrogate.lookup(X)
+        proba = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        if inside.any():
+            proba[inside] = self.surrogate.lookup(X[inside])
+        proba[~inside] = self.model.predict_proba(X[~inside])
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def surrogate_path(task, surrogate_dir=SURROGATE_DIR):
+    return os.path.join(surrogate_dir, f"{task}.npz")
+
+
+def open_surrogate(task, model, model_path, surrogate_dir=SURROGATE_DIR):
+    """SurrogateModel if a table built from ``model_path`` exists, else ``model``."""
+    path = surrogate_path(task, surrogate_dir)
+    if not os.path.exists(path):
+        return model
+    try:
+        surrogate, meta = GridSurrogate.load(path)
+    except Exception as e:
+        print(f"Ignoring unreadable surrogate {path}: {e}")
+        return model
+    if meta["source_sha256"] != file_sha256(model_path):
+        print(f"Surrogate {path} was built from a different {task} model; using the model. Rebuild with: python -m services.surrogate build")
+        return model
+    if not surrogate.exact:
+        print(f"Using approximate {task} surrogate; see {task}.report.json for its error.")
+    return SurrogateModel(surrogate, model)
+
+
+# === Offline build + fidelity report ===
+def _latency_us(fn, X, n=300):
+    timings = []
+    for row in X[:n]:
+        start = time.perf_counter()
+        fn(row[None, :])
+        timings.append((time.perf_counter() - start) * 1e6)
+    return round(float(np.percentile(timings, 50)), 1)
+
+
+def fidelity_report(surrogate, model, X, n_probe=20000, seed=0):
+    """Compare surrogate and model on rows X (model inputs, e.g. every row of the
+    training CSV) and on points drawn uniformly from the grid's domain."""
+    served = SurrogateModel(surrogate, model)
+    probe = np.random.default_rng(seed).uniform(surrogate.low, surrogate.high, size=(n_probe, len(surrogate.low)))
+    report = {
+        "exact_grid": surrogate.exact,
+        "cells_per_feature": list(surrogate.shape),
+        "cells": int(np.prod(surrogate.shape)),
+        "palette_rows": len(surrogate.palette),
+        "table_bytes": int(surrogate.nbytes),
+        "rows_in_grid": float(surrogate.inside(np.asarray(X, dtype=np.float32)).mean()),
+    }
+    for name, rows in (("csv", X), ("uniform_probe", probe)):
+        expected, actual = model.predict_proba(rows), served.predict_proba(rows)
+        report[name] = {
+            "rows": len(rows),
+            "max_abs_proba_error": float(np.max(np.abs(expected - actual))),
+            "label_agreement": float(np.mean(np.argmax(expected, axis=1) == np.argmax(actual, axis=1))),
+        }
+    report["p50_latency_us"] = {"model": _latency_us(model.predict_proba, X), "surrogate": _latency_us(served.predict_proba, X)}
+    return report
+
+
+def build(tasks=None, max_cells=DEFAULT_MAX_CELLS, surrogate_dir=SURROGATE_DIR):
+    # Model inputs for every CSV row, assembled like the serving path
+    from benchmarks.datasets import TASKS
+    from services.registry import registry
+
+    os.makedirs(surrogate_dir, exist_ok=True)
+    reports = {}
+    for task in tasks or SURROGATE_TASKS:
+        models = registry.get(task)
+        model = compile_model(models["model"])
+        if not isinstance(model, CompiledForest):
+            raise TypeError(f"{task}: grid surrogates need a random forest, got {type(model).__name__}")
+        X, _ = TASKS[task][1]()
+        X = np.asarray(X, dtype=np.float32)
+        started = time.perf_counter()
+        surrogate = GridSurrogate.compile(model, X.min(axis=0), X.max(axis=0), max_cells=max_cells)
+        surrogate.save(surrogate_path(task, surrogate_dir), file_sha256(models.path("model")))
+        report = {"task": task, "version": models.version, "compile_s": round(time.perf_counter() - started, 1),
+                  "features": SURROGATE_TASKS[task]}
+        report.update(fidelity_report(surrogate, model, X))
+        with open(os.path.join(surrogate_dir, f"{task}.report.json"), "w") as f:
+            json.dump(report, f, indent=2)
+        reports[task] = report
+        print(json.dumps(report, indent=2))
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile grid lookup surrogates for low-dimensional models.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--task", action="append", choices=sorted(SURROGATE_TASKS), help="default: all")
+    parser.add_argument("--max-cells", type=int, default=DEFAULT_MAX_CELLS)
+    args = parser.parse_args()
+    build(args.task, args.max_cells)
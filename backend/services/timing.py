@@ -0,0 +1,187 @@
+"""Named stage timings per request, for Server-Timing headers and /metrics.
+
+Code on a request's path marks the stages worth seeing:
+
+    with stage("decode"):
+        images = [decode_image(b) for b in uploads]
+
+Each response then carries the request's stages plus its total time:
+
+    Server-Timing: read;dur=0.4, queue;dur=0.1, decode;dur=6.2, hog;dur=3.9, forest;dur=1.1, total;dur=12.3
+
+and every timed call is also observed in a per-route, per-stage histogram
+that ``/metrics`` exposes. A stage that runs more than once in a request (e.g.
+one decode per pool worker) shows up in the header as its summed time. Work submitted to
+thread pools is attributed to the submitting request; work done by a
+micro-batcher for many requests at once is counted under ``batch:<name>``
+only, as each caller already sees the whole batch as its ``batch`` stage.
+
+Recording is a clock read and a histogram increment, whether or not anything
+scrapes ``/metrics``; ``STAGE_TIMING=0`` turns stage recording and the header
+off altogether.
+"""
+import contextvars
+import os
+import threading
+import time
+
+from services.metrics import Histogram, LATENCY_MS_BUCKETS
+
+ENABLED = os.environ.get("STAGE_TIMING", "1") != "0"
+
+# Label for stages recorded outside any request or background scope
+UNSCOPED = "-"
+
+_current = contextvars.ContextVar("stage_timings", default=None)
+
+# (route, stage) -> Histogram
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+def route_label(scope):
+    # The matched route's template keeps label values bounded (no ids or file names)
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class RequestTimings:
+    __slots__ = ("scope", "stages")
+
+    def __init__(self, scope):
+        self.scope = scope
+        # (name, ms); appended from pool threads too, and list.append is atomic
+        self.stages = []
+
+    @property
+    def label(self):
+        return route_label(self.scope)
+
+    def add(self, name, ms):
+        self.stages.append((name, ms))
+
+    def header(self, total_ms):
+        totals = {}
+        for name, ms in self.stages:
+            totals[name] = totals.get(name, 0.0) + ms
+        totals["total"] = total_ms
+        return ", ".join(f"{name};dur={ms:.1f}" for name, ms in totals.items())
+
+
+class BackgroundScope:
+    """Stages recorded for no single request (e.g. a micro-batch): histograms only."""
+    __slots__ = ("label",)
+
+    def __init__(self, label):
+        self.label = label
+
+    def add(self, name, ms):
+        pass
+
+
+def background_context(label):
+    """A fresh contextvars.Context whose stages are counted under ``label``."""
+    context = contextvars.Context()
+    context.run(_current.set, BackgroundScope(label))
+    return context
+
+
+def _histogram(route, name):
+    key = (route, name)
+    histogram = _histograms.get(key)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(key, Histogram(LATENCY_MS_BUCKETS))
+    return histogram
+
+
+def record(name, ms):
+    """Add ``ms`` milliseconds under stage ``name`` for the current request."""
+    if not ENABLED:
+        return
+    timings = _current.get()
+    if timings is None:
+        label = UNSCOPED
+    else:
+        timings.add(name, ms)
+        label = timings.label
+    _histogram(label, name).observe(ms)
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, (time.perf_counter() - self.started) * 1000.0)
+        return False
+
+
+class _NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name):
+    return _Stage(name) if ENABLED else _NO_STAGE
+
+
+class StageTimingMiddleware:
+    """Pure ASGI middleware: per-request timings, the Server-Timing header, request totals."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _in_flight
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings(scope)
+        token = _current.set(timings)
+        started = time.perf_counter()
+        with _in_flight_lock:
+            _in_flight += 1
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000.0
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header(total_ms).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            with _in_flight_lock:
+                _in_flight -= 1
+            _histogram(timings.label, "total").observe((time.perf_counter() - started) * 1000.0)
+
+
+def in_flight():
+    return _in_flight
+
+
+def stage_histograms():
+    """{(route, stage): Histogram.snapshot()}"""
+    with _histograms_lock:
+        items = list(_histograms.items())
+    return {key: histogram.snapshot() for key, histogram in sorted(items)}
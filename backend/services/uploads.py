@@ -0,0 +1,72 @@
+"""Upload limits that apply before a request body is read.
+
+FastAPI parses multipart forms before the endpoint runs, so a size check in
+the handler comes after the whole body has been received and spooled. Routers
+that take uploads use a route class that checks first:
+
+    router = APIRouter(route_class=upload_limit_route(MAX_REQUEST_BYTES))
+
+A Content-Length over the limit is answered with 413 without reading the
+body; a chunked body is cut off with 413 as soon as it passes the limit.
+Per-file checks (format, pixel count) then run on each file's first bytes,
+see ``read_image_upload``.
+"""
+from fastapi import HTTPException, Request
+from fastapi.routing import APIRoute
+
+from services.image_features import ImageRejected, probe_image
+
+# Enough for the header of PNG/GIF/BMP/WebP and of JPEGs with a typical EXIF block
+IMAGE_HEADER_BYTES = 64 * 1024
+
+
+def _too_large(max_bytes):
+    return HTTPException(status_code=413, detail=f"Upload too large; the limit is {max_bytes // (1024 * 1024)} MB per request.")
+
+
+def upload_limit_route(max_bytes):
+    """An APIRoute class whose requests may carry at most ``max_bytes`` of body."""
+
+    class UploadLimitRoute(APIRoute):
+        def get_route_handler(self):
+            handler = super().get_route_handler()
+
+            async def limited_handler(request: Request):
+                length = request.headers.get("content-length")
+                if length is not None and length.isdigit() and int(length) > max_bytes:
+                    raise _too_large(max_bytes)
+
+                received = 0
+                receive = request.receive
+
+                async def counting_receive():
+                    nonlocal received
+                    message = await receive()
+                    received += len(message.get("body", b""))
+                    if received > max_bytes:
+                        # Raised from inside form parsing; FastAPI passes HTTPExceptions through as they are
+                        raise _too_large(max_bytes)
+                    return message
+
+                return await handler(Request(request.scope, counting_receive))
+
+            return limited_handler
+
+    return UploadLimitRoute
+
+
+async def read_image_upload(file, max_bytes):
+    """All bytes of one uploaded image, after its size and header have been checked.
+
+    Raises HTTPException 413 for files over ``max_bytes`` or with too many
+    pixels and 400 for anything that is not a supported image; the header
+    check only needs the file's first ``IMAGE_HEADER_BYTES``."""
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"{file.filename}: file too large; the limit is {max_bytes // (1024 * 1024)} MB.")
+    head = await file.read(IMAGE_HEADER_BYTES)
+    complete = len(head) < IMAGE_HEADER_BYTES
+    try:
+        probe_image(head, complete=complete)
+    except ImageRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=f"{file.filename}: {e}")
+    return head if complete else head + await file.read()
@@ -0,0 +1,71 @@
+"""Background warm-up of models, datasets and DSP paths after startup.
+
+Importing ``main`` only defines routes; models, CSVs and audio are loaded on
+first use. Each router registers a step that loads what it needs and runs one
+prediction end to end, so the first real request pays neither the loading nor
+one-off costs such as building the MFCC filterbanks:
+
+    warmup.add_step("letter_tracing", warm_up)
+
+``warmup.start()`` (on application startup) runs the steps one after another
+in a daemon thread while the server already answers; ``/readyz`` turns 200
+once every step has succeeded. Requests that arrive earlier still work, they
+just load what they need themselves. Stages timed during warm-up are counted
+under ``warmup`` in ``/metrics``, not under a route.
+"""
+import threading
+import time
+import traceback
+
+from services.timing import background_context
+
+
+class Warmup:
+    def __init__(self):
+        # name -> fn, run in registration (import) order
+        self._steps = {}
+        self._status = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add_step(self, name, fn):
+        self._steps[name] = fn
+        self._status[name] = {"status": "pending", "seconds": None, "error": None}
+
+    def _run_step(self, name, fn):
+        self._status[name] = {"status": "running", "seconds": None, "error": None}
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            traceback.print_exc()
+            status, error = "failed", f"{type(e).__name__}: {e}"
+        else:
+            status, error = "ready", None
+        self._status[name] = {"status": status, "seconds": round(time.perf_counter() - started, 3), "error": error}
+
+    def run(self):
+        """Run every step in this thread; returns the report."""
+        context = background_context("warmup")
+        for name, fn in list(self._steps.items()):
+            context.run(self._run_step, name, fn)
+        failed = [name for name, status in self._status.items() if status["status"] == "failed"]
+        print(f"Warm-up finished: {len(self._steps) - len(failed)}/{len(self._steps)} ready" + (f", failed: {failed}" if failed else ""))
+        return self.report()
+
+    def start(self):
+        """Start ``run`` in a daemon thread (once; not at all if already warm, e.g. forked by serve.py)."""
+        with self._lock:
+            if self._thread is None and not (self._steps and self.ready):
+                self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+                self._thread.start()
+
+    @property
+    def ready(self):
+        return all(status["status"] == "ready" for status in self._status.values())
+
+    def report(self):
+        return {"ready": self.ready, "steps": {name: dict(status) for name, status in self._status.items()}}
+
+
+warmup = Warmup()
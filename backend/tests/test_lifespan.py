@@ -0,0 +1,37 @@
+"""The app survives more than one startup/shutdown cycle in the same process.
+
+Run from ``backend/``: ``python -m pytest tests``.
+"""
+import io
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+
+
+def blank_png():
+    image = io.BytesIO()
+    Image.new("L", (64, 64), color=255).save(image, format="PNG")
+    return image.getvalue()
+
+
+def test_routes_work_after_a_previous_lifespan():
+    # Shutdown closes the inference pools' executors; routers hold the same pools across cycles.
+    # Inputs change per cycle so memoized routes miss and go through the pools and batchers again.
+    for cycle in range(2):
+        with TestClient(main.app) as client:
+            responses = {
+                "arithmetic": client.post("/arithmetic_test/api/arithmetic/summary", json={"attempts": [
+                    {"op1": 2 + cycle, "op2": 3, "operation": "+", "user_choice": 0, "response_time": 2.0}]}),
+                "letterconfusion": client.post("/letterconfusion_test/dyslexia/submit_answer/", json=[
+                    {"question_type": "matching", "shown_letters": ["b", "d"], "correct": 1, "response_time_ms": 900.0 + cycle}]),
+                "handwritten": client.post("/handwritten_test/dysgraphia/predict",
+                                           files=[("files", (f"blank{cycle}.png", blank_png(), "image/png"))]),
+                "letter_tracing": client.post("/letter_tracing/trace", json={
+                    "letter": "B", "drawing": "", "duration": 3.3 + cycle, "accuracy": 0.8}),
+                "numberunderstanding": client.post("/numberunderstanding_test/predict", json={
+                    "left_number": 5, "right_number": 9 + cycle, "response_time_sec": 2.5, "user_correct": 1}),
+            }
+            failed = {name: (r.status_code, r.text) for name, r in responses.items() if r.status_code != 200}
+            assert not failed, f"cycle {cycle}: {failed}"
@@ -0,0 +1,412 @@
+"""Train every model from one config, several tasks at a time.
+
+From ``backend/``:
+
+    python training_script/train_all.py [--tasks arithmetic spelling] [--cpus N]
+                                        [--config training_script/training.json]
+                                        [--run-id ID] [--promote] [--serial]
+
+``training.json`` declares, per task, the dataset (relative to ``backend/``),
+the feature builder and its settings, the split, the estimator class and
+parameters, a CPU budget and the artifact file for each role the router loads
+(the roles of ``models/manifest.json``); ``defaults`` fills in what a task
+leaves out. The feature builders below do what the per-task scripts in this
+directory do, through the same shared code as the API.
+
+Independent tasks run in separate processes, largest CPU budget first, as
+long as their budgets fit in ``--cpus`` (default: all usable CPUs); each fit
+gets ``n_jobs`` equal to its task's budget, and BLAS threads are capped to
+match. Nothing in ``models/`` is overwritten: every run writes its artifacts
+to ``models/runs/<run id>/<task>/`` next to a ``summary.json`` with per-task
+accuracy, macro F1, timings, sizes and checksums, and prints the same as a
+table. ``--promote`` then points the manifest entries of the tasks that
+trained at the new files (version = run id, fresh checksums); a running
+server picks them up on ``POST /models/reload`` or SIGHUP to serve.py.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+RUNS_DIR = os.path.join(MODEL_DIR, "runs")
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "training.json")
+
+ESTIMATORS = {
+    "RandomForestClassifier": "sklearn.ensemble",
+    "ExtraTreesClassifier": "sklearn.ensemble",
+    "GradientBoostingClassifier": "sklearn.ensemble",
+    "HistGradientBoostingClassifier": "sklearn.ensemble",
+    "DecisionTreeClassifier": "sklearn.tree",
+    "LogisticRegression": "sklearn.linear_model",
+}
+
+
+def usable_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def load_config(path=CONFIG_PATH):
+    with open(path) as f:
+        config = json.load(f)
+    defaults = config.get("defaults", {})
+    return {task: {**defaults, **spec} for task, spec in config["tasks"].items()}
+
+
+def make_estimator(spec, cpus):
+    module = importlib.import_module(ESTIMATORS[spec["class"]])
+    estimator = getattr(module, spec["class"])(**spec.get("params", {}))
+    if "n_jobs" in estimator.get_params():
+        estimator.set_params(n_jobs=cpus)
+    return estimator
+
+
+def split(spec, *arrays, y):
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(*arrays, test_size=spec["test_size"], random_state=spec["random_state"],
+                            stratify=y if spec.get("stratify") else None)
+
+
+class Prepared:
+    """A task's train/test matrices plus how to turn the fitted estimator into artifacts."""
+
+    def __init__(self, X_train, X_test, y_train, y_test, artifacts=None, wrap=None, package=None, notes=None):
+        self.X_train, self.X_test, self.y_train, self.y_test = X_train, X_test, y_train, y_test
+        # Fitted preprocessing objects by manifest role
+        self.artifacts = artifacts or {}
+        # estimator -> what is actually fitted (e.g. a Pipeline around it)
+        self.wrap = wrap or (lambda estimator: estimator)
+        # fitted -> {role: object}; by default the fitted object is the "model" artifact
+        self.package = package or (lambda fitted: {"model": fitted, **self.artifacts})
+        self.notes = notes or {}
+
+
+# === Feature builders (same steps as the per-task scripts) ===
+def build_arithmetic(dataset, features, split_spec, cpus):
+    import pandas as pd
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    from services.feature_transforms import ARITHMETIC_COLUMNS, ArithmeticFeatures
+
+    df = pd.read_csv(dataset)
+    df['op1'] = df['question'].str.extract(r'(\d+)').astype(int)
+    df['op2'] = df['question'].str.extract(r'[\+\-\*/] (\d+)').astype(int)
+    df['operation'] = df['question'].str.extract(r'(\+|\-|\*|\/)')
+    op_encoder = LabelEncoder().fit(df['operation'])
+    df['user_choice'] = df['user_choice'].apply(lambda x: 0 if x == 'choice_1' else 1)
+    df['response_time'] = df['response_time'].astype(float)
+    X = df[ARITHMETIC_COLUMNS].assign(operation=op_encoder.transform(df['operation']))
+    y = df['is_correct'].astype(int)
+    scaler = StandardScaler().fit(X)
+    X_scaled = ArithmeticFeatures(op_encoder, scaler).matrix(
+        df['op1'], df['op2'], df['operation'], df['user_choice'], df['response_time']
+    )
+    X_train, X_test, y_train, y_test = split(split_spec, X_scaled, y, y=y)
+    return Prepared(X_train, X_test, y_train, y_test, artifacts={"scaler": scaler, "op_encoder": op_encoder})
+
+
+def build_numberunderstanding(dataset, features, split_spec, cpus):
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+
+    data = pd.read_csv(dataset)
+    data['user_correct'] = (data['user_answer'] == data['correct_answer']).astype(int)
+    X = data[['left_number', 'right_number', 'response_time_sec', 'user_correct']]
+    y = data['at_risk']
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    X_train, X_test, y_train, y_test = split(split_spec, X_scaled, y, y=y)
+    return Prepared(X_train, X_test, y_train, y_test, artifacts={"scaler": scaler})
+
+
+def build_letter_tracing(dataset, features, split_spec, cpus):
+    import pandas as pd
+    from sklearn.preprocessing import LabelEncoder
+
+    data = pd.read_csv(dataset)
+    label_encoder = LabelEncoder()
+    y = label_encoder.fit_transform(data['label'])
+    X = data[['duration_seconds', 'accuracy']].values
+    X_train, X_test, y_train, y_test = split(split_spec, X, y, y=y)
+    return Prepared(X_train, X_test, y_train, y_test, artifacts={"label_encoder": label_encoder})
+
+
+def build_letterconfusion(dataset, features, split_spec, cpus):
+    import pandas as pd
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    from services.feature_transforms import LETTERCONFUSION_COLUMNS, LETTERS, letters_multihot
+
+    df = pd.read_csv(dataset)
+    df['target'] = df['group'].apply(lambda x: 1 if x == 'dyslexic' else 0)
+    le_question_type = LabelEncoder()
+    df['question_type_enc'] = le_question_type.fit_transform(df['question_type'])
+    df = df.join(pd.DataFrame(letters_multihot(df['shown_letters'].str.split(',')), columns=LETTERS, index=df.index))
+    X_train, X_test, y_train, y_test = split(split_spec, df[LETTERCONFUSION_COLUMNS], df['target'], y=df['target'])
+    # Only response_time_ms is scaled, fitted on the training rows
+    scaler = StandardScaler()
+    X_train, X_test = X_train.copy(), X_test.copy()
+    X_train['response_time_ms'] = scaler.fit_transform(X_train[['response_time_ms']])
+    X_test['response_time_ms'] = scaler.transform(X_test[['response_time_ms']])
+    return Prepared(X_train, X_test, y_train, y_test,
+                    artifacts={"question_type_encoder": le_question_type, "scaler": scaler})
+
+
+def build_phonospeech(dataset, features, split_spec, cpus):
+    import pandas as pd
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.preprocessing import StandardScaler
+
+    from services.phonospeech_features import extract_phoneme_features
+
+    df = pd.read_csv(dataset)
+    for col in ['Question', 'Child_Response']:
+        df[col] = df[col].fillna('').astype(str)
+    text = df['Question'] + ' ' + df['Child_Response']
+    names = ['vowels', 'consonants', 'vowel_ratio', 'consonant_ratio', 'total_chars']
+    numeric = pd.concat([
+        pd.DataFrame(df['Question'].apply(extract_phoneme_features).tolist(), columns=[f'q_{x}' for x in names]),
+        pd.DataFrame(df['Child_Response'].apply(extract_phoneme_features).tolist(), columns=[f'c_{x}' for x in names]),
+    ], axis=1)
+    y = df['Risk_Level'].map({'Minimal': 0, 'Emerging': 1, 'Strong_Indicators': 2})
+    text_train, text_test, numeric_train, numeric_test, y_train, y_test = split(split_spec, text, numeric, y, y=y)
+
+    tfidf = dict(features.get("tfidf", {}))
+    if "ngram_range" in tfidf:
+        tfidf["ngram_range"] = tuple(tfidf["ngram_range"])
+    vectorizer = TfidfVectorizer(**tfidf)
+    scaler = StandardScaler()
+    X_train = np.hstack([vectorizer.fit_transform(text_train).toarray(), scaler.fit_transform(numeric_train)])
+    X_test = np.hstack([vectorizer.transform(text_test).toarray(), scaler.transform(numeric_test)])
+    return Prepared(X_train, X_test, y_train, y_test, artifacts={"vectorizer": vectorizer, "scaler": scaler})
+
+
+def build_handwritten(dataset, features, split_spec, cpus):
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    from services.feature_cache import FeatureCache
+    from services.image_features import HOG_CONFIG, hog_features_from_files
+
+    paths, labels = [], []
+    for class_idx, class_name in enumerate(sorted(os.listdir(dataset))):
+        class_dir = os.path.join(dataset, class_name)
+        if not os.path.isdir(class_dir):
+            continue
+        for img_name in sorted(os.listdir(class_dir)):
+            if img_name.lower().endswith(('.png', '.jpg', '.jpeg')):
+                paths.append(os.path.join(class_dir, img_name))
+                labels.append(class_idx)
+    cache = FeatureCache("hog", hog_features_from_files, HOG_CONFIG, workers=cpus)
+    X, ok = cache.features(paths)
+    y = np.array(labels)[ok]
+    paths = [path for path, good in zip(paths, ok) if good]
+    X_train, X_test, y_train, y_test, train_index, test_index = split(split_spec, X, y, np.arange(len(y)), y=y)
+    leaks = cache.duplicate_report(paths, y, train_index, test_index)
+    return Prepared(X_train, X_test, y_train, y_test,
+                    wrap=lambda estimator: Pipeline([('scaler', StandardScaler()), ('classifier', estimator)]),
+                    notes={"test_rows_with_train_copy": leaks["test_rows_with_train_copy"]})
+
+
+def build_spelling(dataset, features, split_spec, cpus):
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+
+    from services.audio_features import FEATURE_CONFIG, spelling_features_from_files
+    from services.feature_cache import FeatureCache
+
+    df = pd.read_csv(dataset)
+    paths = [os.path.join(BASE_DIR, audio_file) for audio_file in df['audio_file']]
+    cache = FeatureCache("spelling", spelling_features_from_files, FEATURE_CONFIG, workers=cpus)
+    X, ok = cache.features(paths)
+    y = df['is_incorrect'].to_numpy(dtype=int)[ok]
+    paths = [path for path, good in zip(paths, ok) if good]
+    scaler = StandardScaler()
+    X = scaler.fit_transform(X)
+    X_train, X_test, y_train, y_test, train_index, test_index = split(split_spec, X, y, np.arange(len(y)), y=y)
+    leaks = cache.duplicate_report(paths, y, train_index, test_index)
+    return Prepared(X_train, X_test, y_train, y_test,
+                    package=lambda fitted: {"model": {"model": fitted, "scaler": scaler}},
+                    notes={"test_rows_with_train_copy": leaks["test_rows_with_train_copy"]})
+
+
+BUILDERS = {
+    "arithmetic": build_arithmetic,
+    "handwritten": build_handwritten,
+    "numberunderstanding": build_numberunderstanding,
+    "letter_tracing": build_letter_tracing,
+    "letterconfusion": build_letterconfusion,
+    "phonospeech": build_phonospeech,
+    "spelling": build_spelling,
+}
+
+
+# === One task (runs in a worker process) ===
+def train_task(task, spec, cpus, run_dir):
+    import joblib
+    from sklearn.metrics import accuracy_score, f1_score
+    from threadpoolctl import threadpool_limits
+
+    from services.hashing import file_sha256
+
+    timings = {}
+    started = time.perf_counter()
+    with threadpool_limits(cpus):
+        prepared = BUILDERS[spec["features"]["builder"]](
+            os.path.join(BASE_DIR, spec["dataset"]), spec["features"], spec["split"], cpus)
+        timings["features_s"] = time.perf_counter() - started
+
+        fit_started = time.perf_counter()
+        fitted = prepared.wrap(make_estimator(spec["estimator"], cpus)).fit(prepared.X_train, prepared.y_train)
+        timings["fit_s"] = time.perf_counter() - fit_started
+
+        y_pred = fitted.predict(prepared.X_test)
+
+    task_dir = os.path.join(run_dir, task)
+    os.makedirs(task_dir, exist_ok=True)
+    artifacts = {}
+    for role, obj in prepared.package(fitted).items():
+        path = os.path.join(task_dir, spec["artifacts"][role])
+        joblib.dump(obj, path)
+        artifacts[role] = {"file": os.path.relpath(path, MODEL_DIR), "sha256": file_sha256(path), "bytes": os.path.getsize(path)}
+    timings["total_s"] = time.perf_counter() - started
+    return {
+        "status": "trained",
+        "cpus": cpus,
+        "accuracy": float(accuracy_score(prepared.y_test, y_pred)),
+        "macro_f1": float(f1_score(prepared.y_test, y_pred, average="macro")),
+        "n_train": len(prepared.y_train),
+        "n_test": len(prepared.y_test),
+        "n_features": int(getattr(fitted, "n_features_in_", np.shape(prepared.X_train)[1])),
+        "artifacts": artifacts,
+        **{key: round(value, 3) for key, value in timings.items()},
+        **prepared.notes,
+    }
+
+
+def run_task(task, spec, cpus, run_dir):
+    """train_task, with failures reported in the summary instead of raised."""
+    try:
+        return train_task(task, spec, cpus, run_dir)
+    except Exception as e:
+        traceback.print_exc()
+        return {"status": "failed", "cpus": cpus, "error": f"{type(e).__name__}: {e}"}
+
+
+# === Scheduling ===
+def run_all(config, total_cpus, run_dir, serial=False):
+    """{task: result}. Tasks start largest budget first whenever their CPUs are free."""
+    budgets = {task: max(1, min(int(spec.get("cpus", 1)), total_cpus)) for task, spec in config.items()}
+    pending = sorted(config, key=lambda task: -budgets[task])
+    results = {}
+    if serial or total_cpus == 1 or len(config) == 1:
+        for task in pending:
+            print(f"[{task}] training with {budgets[task]} CPU(s)")
+            results[task] = run_task(task, config[task], budgets[task], run_dir)
+        return results
+
+    free = total_cpus
+    running = {}
+    with ProcessPoolExecutor(max_workers=min(total_cpus, len(config))) as pool:
+        while pending or running:
+            for task in list(pending):
+                if budgets[task] <= free:
+                    print(f"[{task}] training with {budgets[task]} CPU(s)")
+                    running[pool.submit(run_task, task, config[task], budgets[task], run_dir)] = task
+                    free -= budgets[task]
+                    pending.remove(task)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                free += budgets[task]
+                results[task] = future.result()
+                print(f"[{task}] {results[task]['status']}")
+    return results
+
+
+def print_summary(results, wall_s):
+    print()
+    print(f"{'task':<20} {'status':<8} {'accuracy':>8} {'macro F1':>8} {'train/test':>11} {'features':>8} "
+          f"{'feat s':>7} {'fit s':>7} {'total s':>8} {'cpus':>4} {'size':>9}")
+    for task, result in results.items():
+        if result["status"] != "trained":
+            print(f"{task:<20} {result['status']:<8} {result.get('error', '')}")
+            continue
+        size = sum(artifact["bytes"] for artifact in result["artifacts"].values())
+        print(f"{task:<20} {result['status']:<8} {result['accuracy']:>8.2%} {result['macro_f1']:>8.3f} "
+              f"{result['n_train']:>5}/{result['n_test']:<5} {result['n_features']:>8} {result['features_s']:>7.2f} "
+              f"{result['fit_s']:>7.2f} {result['total_s']:>8.2f} {result['cpus']:>4} {size / 1e6:>7.2f}MB")
+    print(f"\nWall time {wall_s:.1f}s")
+
+
+def promote(results, run_id):
+    """Point the manifest at this run's artifacts for every task that trained."""
+    from services.registry import MANIFEST_PATH, read_manifest
+
+    manifest = read_manifest()
+    for task, result in results.items():
+        if result["status"] != "trained" or task not in manifest["tasks"]:
+            continue
+        entry = manifest["tasks"][task]
+        entry["version"] = run_id
+        entry["artifacts"] = {role: {"file": artifact["file"], "sha256": artifact["sha256"]}
+                              for role, artifact in result["artifacts"].items()}
+        entry.setdefault("features", {})["n_features"] = result["n_features"]
+    tmp = f"{MANIFEST_PATH}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, MANIFEST_PATH)
+    print(f"Promoted {[task for task, result in results.items() if result['status'] == 'trained']} to v{run_id} "
+          f"in {os.path.relpath(MANIFEST_PATH, BASE_DIR)}; reload with POST /models/reload or SIGHUP to serve.py")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train every model from training.json, several tasks at a time.")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--tasks", nargs="+", help="default: every task in the config")
+    parser.add_argument("--cpus", type=int, default=usable_cpus(), help="total CPU budget (default: all usable CPUs)")
+    parser.add_argument("--run-id", default=time.strftime("%Y%m%d-%H%M%S"))
+    parser.add_argument("--promote", action="store_true", help="point models/manifest.json at the new artifacts")
+    parser.add_argument("--serial", action="store_true", help="run tasks one after another in this process")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if args.tasks:
+        unknown = set(args.tasks) - set(config)
+        if unknown:
+            parser.error(f"unknown task(s) {sorted(unknown)}; the config has {sorted(config)}")
+        config = {task: config[task] for task in args.tasks}
+    run_dir = os.path.join(RUNS_DIR, args.run_id)
+    os.makedirs(run_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    results = run_all(config, max(1, args.cpus), run_dir, serial=args.serial)
+    results = {task: results[task] for task in config}
+    wall_s = time.perf_counter() - started
+    print_summary(results, wall_s)
+
+    with open(os.path.join(run_dir, "summary.json"), "w") as f:
+        json.dump({"run_id": args.run_id, "cpus": args.cpus, "wall_s": round(wall_s, 3), "tasks": results}, f, indent=2)
+    print(f"Artifacts and summary.json in {os.path.relpath(run_dir, BASE_DIR)}")
+    if args.promote:
+        promote(results, args.run_id)
+    if any(result["status"] != "trained" for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
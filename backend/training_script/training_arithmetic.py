@@ -1,4 +1,5 @@
 import os
+import sys
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, StandardScaler
@@ -6,6 +7,10 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
 import joblib
 
+# Share the feature assembly with the API (backend/services/feature_transforms.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.feature_transforms import ARITHMETIC_COLUMNS, ArithmeticFeatures
+
 # ======= Setup paths =======
 base_dir = os.path.dirname(os.path.abspath(__file__))
 data_path = os.path.join(base_dir, '../data/arithmetic_data_1k.csv')
@@ -23,7 +28,7 @@ df['operation'] = df['question'].str.extract(r'(\+|\-|\*|\/)')
 
 # Encode operations
 op_encoder = LabelEncoder()
-df['operation'] = op_encoder.fit_transform(df['operation'])
+op_encoder.fit(df['operation'])
 
 # Encode choices
 df['user_choice'] = df['user_choice'].apply(lambda x: 0 if x == 'choice_1' else 1)
@@ -33,12 +38,16 @@ df['correct_choice'] = df['correct_choice'].apply(lambda x: 0 if x == 'choice_1'
 df['response_time'] = df['response_time'].astype(float)
 
 # ======= Prepare Data =======
-X = df[['op1', 'op2', 'operation', 'user_choice', 'response_time']]
+X = df[ARITHMETIC_COLUMNS].assign(operation=op_encoder.transform(df['operation']))
 y = df['is_correct'].astype(int)
 
 # ======= Normalize =======
 scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+scaler.fit(X)
+# Same assembly the API runs on each summary request
+X_scaled = ArithmeticFeatures(op_encoder, scaler).matrix(
+    df['op1'], df['op2'], df['operation'], df['user_choice'], df['response_time']
+)
 
 # Save the scaler and encoder for backend inference
 joblib.dump(scaler, scaler_path)
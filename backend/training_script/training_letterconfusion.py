@@ -6,9 +6,14 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
 import joblib
 import os
+import sys
+
+# Share the feature encoding with the API (backend/services/feature_transforms.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.feature_transforms import LETTERCONFUSION_COLUMNS, LETTERS, letters_multihot
 
 # 1. Load dataset
-csv_path = r'C:\Users\omlan\OneDrive\Documents\GitHub\early_edge\backend\data\dyslexia_letter_dataset_10k.csv'
+csv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'dyslexia_letter_dataset_10k.csv')
 df = pd.read_csv(csv_path)
 
 # 2. Encode target label
@@ -18,16 +23,10 @@ df['target'] = df['group'].apply(lambda x: 1 if x == 'dyslexic' else 0)
 le_question_type = LabelEncoder()
 df['question_type_enc'] = le_question_type.fit_transform(df['question_type'])
 
-all_letters = ['b', 'd', 'p', 'q', 'm', 'n', 'u', 't', 'f', 'c', 'o', 'h', 'k', 'v', 'w', 'x', 'z', 'y', 'a', 'e', 'i', 'l', 'j']
-
-def letters_to_multihot(shown_letters_list):
-    return [1 if letter in shown_letters_list else 0 for letter in all_letters]
-
-df['shown_letters_enc'] = df['shown_letters'].apply(lambda x: letters_to_multihot(x.split(',')))
+df = df.join(pd.DataFrame(letters_multihot(df['shown_letters'].str.split(',')), columns=LETTERS, index=df.index))
 
 # Features and target
-features = df[['correct', 'response_time_ms', 'question_type_enc']]
-features = features.join(pd.DataFrame(df['shown_letters_enc'].tolist(), columns=all_letters))
+features = df[LETTERCONFUSION_COLUMNS]
 target = df['target']
 
 # 4. Train/test split
@@ -57,5 +56,6 @@ os.makedirs(models_dir, exist_ok=True)
 
 joblib.dump(clf, os.path.join(models_dir, 'dyslexia_letter_confusion_model.joblib'))
 joblib.dump(le_question_type, os.path.join(models_dir, 'le_question_type.joblib'))
-joblib.dump(scaler, os.path.join(models_dir, 'scaler.joblib'))
+# Own file name: models/scaler.joblib belongs to the phonospeech model (see models/manifest.json)
+joblib.dump(scaler, os.path.join(models_dir, 'letterconfusion_scaler.joblib'))
 print("✅ Saved model, encoder, and scaler to ../models/")
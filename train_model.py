@@ -1,23 +1,27 @@
 import os
+import sys
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report
-from skimage import io, transform, feature
-from skimage.color import rgb2gray
 import joblib
 
 # Get base directory dynamically
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "data"))  # points to ../data
+DATA_DIR = os.path.join(BASE_DIR, "backend", "data")
 MODEL_DIR = os.path.join(BASE_DIR, "models")
 os.makedirs(MODEL_DIR, exist_ok=True)
 
-def load_and_preprocess_images(data_dir):
-    """Load and preprocess images from the data directory."""
-    images = []
+# Share the feature code with the API (backend/services/image_features.py)
+sys.path.insert(0, os.path.join(BASE_DIR, "backend"))
+from services.feature_cache import FeatureCache
+from services.image_features import HOG_CONFIG, hog_features_from_files
+
+def load_and_preprocess_images(data_dir, cache):
+    """HOG features, labels and paths of the images under data_dir (cached by content)."""
+    paths = []
     labels = []
     
     # Walk through the data directory
@@ -30,34 +34,25 @@ def load_and_preprocess_images(data_dir):
             if not img_name.lower().endswith(('.png', '.jpg', '.jpeg')):
                 continue
                 
-            img_path = os.path.join(class_dir, img_name)
-            try:
-                # Load and preprocess image
-                img = io.imread(img_path)
-                if len(img.shape) == 3:  # Convert to grayscale if RGB
-                    img = rgb2gray(img)
-                
-                # Resize to 128x128
-                img = transform.resize(img, (128, 128))
-                
-                # Extract HOG features
-                hog_features = feature.hog(img, orientations=8, pixels_per_cell=(16, 16),
-                                         cells_per_block=(1, 1), visualize=False)
-                
-                images.append(hog_features)
-                labels.append(class_idx)
-            except Exception as e:
-                print(f"Error processing {img_path}: {str(e)}")
+            paths.append(os.path.join(class_dir, img_name))
+            labels.append(class_idx)
     
-    return np.array(images), np.array(labels)
+    # PIL decode -> grayscale -> 128x128 -> HOG, same code as serving; only new or
+    # changed files are featurized, in parallel (backend/services/feature_cache.py)
+    X, ok = cache.features(paths)
+    return X, np.array(labels)[ok], [path for path, good in zip(paths, ok) if good]
 
 def train_model():
     """Train the model using scikit-learn pipeline."""
     print("Loading and preprocessing images...")
-    X, y = load_and_preprocess_images(DATA_DIR)
+    cache = FeatureCache("hog", hog_features_from_files, HOG_CONFIG)
+    X, y, paths = load_and_preprocess_images(DATA_DIR, cache)
     
     # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_test, y_train, y_test, train_index, test_index = train_test_split(
+        X, y, np.arange(len(y)), test_size=0.2, random_state=42)
+    # Identical images on both sides of the split inflate the test score
+    cache.duplicate_report(paths, y, train_index, test_index)
     
     # Create and train the pipeline
     pipeline = Pipeline([